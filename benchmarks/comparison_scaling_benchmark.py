@@ -0,0 +1,262 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It measures how the comparison stage of
+# DuplicateFinder scales, using generated hash sets instead of image files, and can fail a
+# CI build when an engine becomes slower than its expected growth or compares more pairs than
+# its blocking allows. The gate leaves out the nested loop (the quadratic reference, about 20s
+# at 4000 hashes) unless --engines names it; the CI example below takes about a minute on one core.
+#
+# Usage (from the project root):
+#   python benchmarks/comparison_scaling_benchmark.py                       # 2k .. 100k, sizes over the time budget are skipped
+#   python benchmarks/comparison_scaling_benchmark.py --calibration-size 1000 --sizes 2000,4000 --gate   # CI gate
+
+import os
+import io
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import configparser
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import imagehash
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config_manager import ConfigManager
+from core.duplicate_finder import DuplicateFinder
+
+SYNTHETIC_ROOT = '/synthetic'
+NEW_IMAGES_DIR = SYNTHETIC_ROOT + '/new'
+# (width, height) choices for synthetic images, spread over common aspect ratios
+SYNTHETIC_DIMENSIONS = [(1920, 1080), (1080, 1920), (1600, 1200), (1200, 1600), (1500, 1500), (2560, 1080),
+                        (1440, 900), (1280, 1024), (2048, 1365), (1024, 1536), (3440, 1440), (1200, 1500)]
+
+# Timings on a shared machine wobble by tens of percent even as best-of-repeats, so the time
+# growth only has to stay within this much of the (deterministic) compared-pairs growth allowance
+TIME_EXPONENT_SLACK = 0.3
+
+class Engine(NamedTuple):
+    name: str
+    options: Dict[str, str]             # [DuplicateFinder] settings that select this engine
+    max_exponent: float                 # Gate: allowed growth exponent of compared pairs vs. size (time gets TIME_EXPONENT_SLACK more)
+    in_scope: Callable[[str, str], bool] # Whether this engine is expected to compare a pair
+    max_compared_fraction: Optional[float] = None # Gate: allowed share of all n(n-1)/2 pairs actually compared
+
+def _is_new(filepath: str) -> bool:
+    return filepath.startswith(NEW_IMAGES_DIR + '/')
+
+ENGINES = [
+    Engine('nested_loop', {}, 2.05, lambda p1, p2: True), # Reference only; not part of the default gate
+    # Blocking is quadratic within an aspect ratio, so growth alone cannot tell it from the nested loop;
+    # the synthetic dimensions give 11 ratio blocks, so about 1/12 of all pairs are compared
+    Engine('aspect_ratio_blocked', {'enable_aspect_ratio_blocking': 'yes'}, 2.05, lambda p1, p2: True, 0.1),
+    Engine('per_directory', {'comparison_scope': 'per_directory'}, 1.3,
+           lambda p1, p2: os.path.dirname(p1) == os.path.dirname(p2)),
+    Engine('new_vs_existing', {'comparison_scope': 'new_vs_existing'}, 1.3,
+           lambda p1, p2: _is_new(p1) != _is_new(p2)),
+]
+
+class SyntheticHashSet(NamedTuple):
+    hashes: Dict[str, imagehash.ImageHash]
+    dimensions: Dict[str, Tuple[int, int]]
+    planted_pairs: List[Tuple[str, str]]
+
+def generate_hash_set(size: int, density: float, threshold: int, seed: int,
+                      directory_size: int, new_batch: int) -> SyntheticHashSet:
+    """
+    Generates size random 64-bit hashes. A fraction (density) of them are near-duplicates:
+    copies of a nearby earlier hash (same directory) with up to threshold bits flipped.
+    The last new_batch entries live in the new images directory and copy from anywhere.
+    """
+    rng = np.random.default_rng(seed)
+    bits = rng.integers(0, 2, size=(size, 64), dtype=np.uint8).astype(bool)
+    dimension_choice = rng.integers(0, len(SYNTHETIC_DIMENSIONS), size=size)
+    new_start = size - min(new_batch, size // 2)
+    paths = [f"{SYNTHETIC_ROOT}/d{i // directory_size:06d}/img{i:08d}.jpg" if i < new_start else
+             f"{NEW_IMAGES_DIR}/img{i:08d}.jpg" for i in range(size)]
+
+    planted_pairs: List[Tuple[str, str]] = []
+    for i in np.flatnonzero(rng.random(size) < density).tolist():
+        if i >= new_start:
+            source = int(rng.integers(0, new_start))
+        else:
+            directory_start = (i // directory_size) * directory_size
+            if i == directory_start:
+                continue
+            source = int(rng.integers(max(directory_start, i - 50), i))
+        bits[i] = bits[source]
+        flipped = rng.choice(64, size=int(rng.integers(0, threshold + 1)), replace=False)
+        bits[i, flipped] = ~bits[i, flipped]
+        dimension_choice[i] = dimension_choice[source]
+        planted_pairs.append((paths[source], paths[i]))
+
+    hashes = {paths[i]: imagehash.ImageHash(bits[i].reshape(8, 8)) for i in range(size)}
+    dimensions = {paths[i]: SYNTHETIC_DIMENSIONS[dimension_choice[i]] for i in range(size)}
+    return SyntheticHashSet(hashes, dimensions, planted_pairs)
+
+def _make_finder(engine: Engine, work_dir: str, threshold: int) -> DuplicateFinder:
+    """Creates a DuplicateFinder configured for one engine, with every file it touches in work_dir."""
+    config = configparser.ConfigParser()
+    config['Paths'] = {
+        'input_directory': SYNTHETIC_ROOT,
+        'new_images_directory': NEW_IMAGES_DIR,
+        'image_hashes_cache_file': os.path.join(work_dir, 'hashes.txt'),
+        'duplicate_report_file': os.path.join(work_dir, 'duplicate_report.txt'),
+        'duplicate_action_directory': os.path.join(work_dir, 'actions'),
+        'pair_decisions_file': os.path.join(work_dir, 'pair_decisions.txt'),
+    }
+    config['DuplicateFinder'] = {'hash_type': 'dhash', 'hash_threshold': str(threshold), **engine.options}
+    config_path = os.path.join(work_dir, 'config.ini')
+    with open(config_path, 'w') as f:
+        config.write(f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DuplicateFinder(ConfigManager(config_path, os.path.join(work_dir, 'image_settings.ini')))
+
+def measure(finder: DuplicateFinder, hash_set: SyntheticHashSet, threshold: int,
+            repeats: int) -> Tuple[float, List[Tuple[str, str, int]], int]:
+    """
+    Runs the comparison stage and returns (seconds, scored pairs, pairs compared).
+    The run is repeated repeats times and the fastest is kept: interference from other processes
+    only ever adds time, so the minimum is the most stable estimate.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        seconds = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            pairs = finder._score_pairs(hash_set.hashes, hash_set.dimensions, threshold)
+            seconds = min(seconds, time.perf_counter() - start)
+    compared = [int(line.split()[1]) for line in output.getvalue().splitlines() if line.startswith('Compared ')]
+    return seconds, pairs, compared[-1] if compared else 0
+
+def measure_peak_memory(finder: DuplicateFinder, hash_set: SyntheticHashSet, threshold: int) -> float:
+    """Peak traced memory (MB) of one comparison run; separate from the timed runs, which tracing would slow."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracemalloc.start()
+        finder._score_pairs(hash_set.hashes, hash_set.dimensions, threshold)
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    return peak_mb
+
+def planted_recall(engine: Engine, hash_set: SyntheticHashSet, pairs: List[Tuple[str, str, int]]) -> float:
+    """Fraction of the planted near-duplicate pairs (that this engine should compare) which were found."""
+    expected = {frozenset(pair) for pair in hash_set.planted_pairs if engine.in_scope(*pair)}
+    if not expected:
+        return 1.0
+    found = {frozenset((filepath1, filepath2)) for filepath1, filepath2, _ in pairs}
+    return len(expected & found) / len(expected)
+
+def growth_exponent(points: List[Tuple[int, float]]) -> Optional[float]:
+    """Growth exponent k in value ~ size^k, fitted (least squares, log-log) over all measured sizes."""
+    points = [(size, value) for size, value in points if value > 0]
+    if len(points) < 2:
+        return None
+    log_sizes = np.log([size for size, _ in points])
+    log_values = np.log([value for _, value in points])
+    return float(np.polyfit(log_sizes, log_values, 1)[0])
+
+def run_benchmark(sizes: List[int], calibration_size: int, density: float, threshold: int, seed: int,
+                  directory_size: int, new_batch: int, time_budget: float, trace_memory: bool,
+                  engine_names: List[str], repeats: int) -> bool:
+    """
+    Measures every engine at the calibration size and then at each size whose estimated time
+    (extrapolated from the previous measurements) fits the time budget; larger sizes are
+    skipped, not reported. Peak memory is measured at each engine's largest measured size
+    (at every size with trace_memory). Returns True if every engine found all planted pairs
+    in scope, compared no more pairs than its blocking allows and grew no faster than its
+    allowed exponent.
+    """
+    engines = [engine for engine in ENGINES if engine.name in engine_names]
+    hash_sets: Dict[int, SyntheticHashSet] = {}
+    def get_hash_set(size: int) -> SyntheticHashSet:
+        if size not in hash_sets:
+            hash_sets.clear() # Keep only one (possibly very large) hash set in memory
+            hash_sets[size] = generate_hash_set(size, density, threshold, seed, directory_size, new_batch)
+        return hash_sets[size]
+
+    passed = True
+    print(f"{'engine':<22}{'size':>10}{'seconds':>12}{'peak MB':>9}{'compared':>10}{'pairs':>9}{'recall':>8}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for engine in engines:
+            finder = _make_finder(engine, work_dir, threshold)
+            points: List[Tuple[int, float]] = []
+            compared_points: List[Tuple[int, float]] = []
+            skipped: List[int] = []
+            for size in [calibration_size] + sorted(s for s in sizes if s > calibration_size):
+                if points:
+                    exponent = growth_exponent(points) or 2.0
+                    last_size, last_seconds = points[-1]
+                    if last_seconds * (size / last_size) ** exponent * repeats > time_budget:
+                        skipped.append(size)
+                        continue
+                hash_set = get_hash_set(size)
+                seconds, pairs, compared = measure(finder, hash_set, threshold, repeats)
+                peak_mb = measure_peak_memory(finder, hash_set, threshold) if trace_memory else None
+                recall = planted_recall(engine, hash_set, pairs)
+                points.append((size, seconds))
+                compared_points.append((size, compared))
+                peak = f"{peak_mb:.1f}" if peak_mb is not None else '-'
+                print(f"{engine.name:<22}{size:>10}{seconds:>12.3f}{peak:>9}{compared:>10}{len(pairs):>9}{recall:>8.3f}")
+                if recall < 1.0:
+                    print(f"  FAIL: {engine.name} missed planted near-duplicate pairs at size {size}.")
+                    passed = False
+                if engine.max_compared_fraction is not None and compared > engine.max_compared_fraction * size * (size - 1) / 2:
+                    print(f"  FAIL: {engine.name} compared {compared / (size * (size - 1) / 2):.1%} of all pairs at size {size} "
+                          f"(allowed {engine.max_compared_fraction:.0%}).")
+                    passed = False
+            if points and not trace_memory:
+                largest_size = points[-1][0]
+                print(f"  {engine.name}: peak traced memory {measure_peak_memory(finder, get_hash_set(largest_size), threshold):.1f} MB at size {largest_size}")
+            if skipped:
+                print(f"  {engine.name}: not run at {', '.join(str(size) for size in skipped)} (over the {time_budget:.0f}s budget)")
+            for label, growth_points, allowed in (('compared pairs grow', compared_points, engine.max_exponent),
+                                                  ('time grows', points, engine.max_exponent + TIME_EXPONENT_SLACK)):
+                exponent = growth_exponent(growth_points)
+                if exponent is not None:
+                    verdict = 'ok' if exponent <= allowed else 'FAIL'
+                    print(f"  {engine.name}: {label} as size^{exponent:.2f} (allowed {allowed:.2f}) {verdict}")
+                    if exponent > allowed:
+                        passed = False
+    return passed
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmark for the DuplicateFinder comparison stage on synthetic hashes.")
+    parser.add_argument('--sizes', default='4000,8000,16000,32000,100000')
+    parser.add_argument('--calibration-size', type=int, default=2000, help="always measured; the time of larger sizes is estimated from it")
+    parser.add_argument('--density', type=float, default=0.05, help="fraction of hashes that are near-duplicates of another")
+    parser.add_argument('--threshold', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--directory-size', type=int, default=200, help="images per synthetic folder (per_directory engine)")
+    parser.add_argument('--new-batch', type=int, default=200, help="images in the new folder (new_vs_existing engine)")
+    parser.add_argument('--time-budget', type=float, default=60.0, help="seconds per size (all repeats); sizes estimated to take longer are not run")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per size; the fastest is kept")
+    parser.add_argument('--engines', default=None, help="comma separated; default all, or all but nested_loop with --gate")
+    parser.add_argument('--memory', action='store_true', help="report peak traced memory at every size, not only the largest")
+    parser.add_argument('--gate', action='store_true', help="exit with status 1 on a recall, compared-pairs or growth failure")
+    args = parser.parse_args(argv)
+    if args.engines is None:
+        args.engines = ','.join(engine.name for engine in ENGINES if not (args.gate and engine.name == 'nested_loop'))
+
+    passed = run_benchmark([int(size) for size in args.sizes.split(',')], args.calibration_size, args.density,
+                           args.threshold, args.seed, args.directory_size, args.new_batch, args.time_budget,
+                           args.memory, [name.strip() for name in args.engines.split(',')], args.repeats)
+    print("Scaling benchmark passed." if passed else "Scaling benchmark FAILED.")
+    return 1 if (args.gate and not passed) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
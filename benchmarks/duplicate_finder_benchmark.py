@@ -0,0 +1,269 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It benchmarks DuplicateFinder settings
+# (hash type x hash size x decode mode) on a generated corpus of originals and known
+# variants, reporting speed, memory and how many of the known duplicates were found.
+#
+# Usage (from the project root):
+#   python -m benchmarks.duplicate_finder_benchmark --originals 40 --csv results.csv
+
+import os
+import io
+import sys
+import time
+import struct
+import random
+import argparse
+import configparser
+import contextlib
+import multiprocessing
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+from PIL import Image, ImageDraw, ImageEnhance, ImageOps
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config_manager import ConfigManager
+from core.duplicate_finder import DuplicateFinder
+
+try:
+    import resource # Not available on Windows; peak RSS is then reported as n/a
+except ImportError:
+    resource = None
+
+VARIANTS = ('reencode', 'resize', 'crop', 'colour', 'flip')
+ORIGINAL_SIZES = ((1600, 1200), (1200, 1600), (1500, 1500), (1920, 1080))
+GROUND_TRUTH_FILE = 'ground_truth.txt'
+
+def _exif_with_thumbnail(img: Image.Image) -> bytes:
+    """Builds a minimal EXIF block whose IFD1 holds a JPEG thumbnail, like camera files have."""
+    thumbnail = img.copy()
+    thumbnail.thumbnail((160, 160))
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, 'JPEG', quality=85)
+    thumbnail_bytes = buffer.getvalue()
+    tiff_header = b'II*\x00' + struct.pack('<I', 8)
+    ifd0 = struct.pack('<H', 0) + struct.pack('<I', 14) # No entries, next IFD (IFD1) at offset 14
+    data_offset = 14 + 2 + 2 * 12 + 4
+    ifd1 = struct.pack('<H', 2) + \
+           struct.pack('<HHII', 0x0201, 4, 1, data_offset) + \
+           struct.pack('<HHII', 0x0202, 4, 1, len(thumbnail_bytes)) + struct.pack('<I', 0)
+    return b'Exif\x00\x00' + tiff_header + ifd0 + ifd1 + thumbnail_bytes
+
+def _draw_original(rnd: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Draws a random scene: a two-colour gradient with overlapping shapes."""
+    width, height = size
+    start = [rnd.randrange(256) for _ in range(3)]
+    end = [rnd.randrange(256) for _ in range(3)]
+    gradient = Image.linear_gradient('L').resize(size)
+    img = Image.composite(Image.new('RGB', size, tuple(end)), Image.new('RGB', size, tuple(start)), gradient)
+    draw = ImageDraw.Draw(img)
+    for _ in range(rnd.randrange(15, 40)):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        box = [x, y, x + rnd.randrange(width // 20, width // 3), y + rnd.randrange(height // 20, height // 3)]
+        colour = tuple(rnd.randrange(256) for _ in range(3))
+        (draw.ellipse if rnd.random() < 0.5 else draw.rectangle)(box, fill=colour)
+    return img
+
+def _make_variant(img: Image.Image, variant: str) -> Image.Image:
+    """Applies one of the controlled edits to an original."""
+    width, height = img.size
+    if variant == 'resize':
+        return img.resize((width // 2, height // 2), Image.LANCZOS)
+    if variant == 'crop':
+        return img.crop((width // 10, height // 10, width - width // 10, height - height // 10))
+    if variant == 'colour':
+        return ImageEnhance.Brightness(ImageEnhance.Color(img).enhance(1.3)).enhance(1.1)
+    if variant == 'flip':
+        return ImageOps.mirror(img)
+    return img # 'reencode': same pixels, saved at a lower quality below
+
+def generate_corpus(corpus_dir: str, originals: int, seed: int) -> Dict[str, int]:
+    """
+    Writes originals plus one file per variant into corpus_dir and returns {path: group}.
+    The corpus is deterministic for a given (originals, seed) and is reused if already present.
+    """
+    truth_path = os.path.join(corpus_dir, GROUND_TRUTH_FILE)
+    header = f"originals\t{originals}\tseed\t{seed}\n"
+    if os.path.exists(truth_path):
+        with open(truth_path, 'r', encoding='utf-8') as f:
+            if f.readline() == header:
+                groups = {}
+                for line in f:
+                    group, path = line.rstrip('\n').split('\t', 1)
+                    groups[path] = int(group)
+                print(f"Reusing benchmark corpus with {len(groups)} images in: {os.path.abspath(corpus_dir)}")
+                return groups
+
+    print(f"Generating benchmark corpus ({originals} originals x {len(VARIANTS)} variants) in: {os.path.abspath(corpus_dir)}")
+    os.makedirs(corpus_dir, exist_ok=True)
+    rnd = random.Random(seed)
+    groups: Dict[str, int] = {}
+    for group in range(originals):
+        original = _draw_original(rnd, ORIGINAL_SIZES[group % len(ORIGINAL_SIZES)])
+        path = os.path.join(corpus_dir, f"{group:04d}_original.jpg")
+        original.save(path, 'JPEG', quality=92, exif=_exif_with_thumbnail(original))
+        groups[path] = group
+        for variant in VARIANTS:
+            img = _make_variant(original, variant)
+            path = os.path.join(corpus_dir, f"{group:04d}_{variant}.jpg")
+            img.save(path, 'JPEG', quality=55 if variant == 'reencode' else 88, exif=_exif_with_thumbnail(img))
+            groups[path] = group
+    with open(truth_path, 'w', encoding='utf-8') as f:
+        f.write(header)
+        for path, group in groups.items():
+            f.write(f"{group}\t{path}\n")
+    return groups
+
+def _write_run_config(work_dir: str, corpus_dir: str, hash_type: str, hash_size: int,
+                      decode_mode: str, threshold: int) -> str:
+    """Writes a config.ini for one benchmark run, with every cache pointed into work_dir."""
+    config = configparser.ConfigParser()
+    config['Paths'] = {
+        'input_directory': corpus_dir,
+        'image_hashes_cache_file': os.path.join(work_dir, 'hashes.txt'),
+        'duplicate_report_file': os.path.join(work_dir, 'duplicate_report.txt'),
+        'duplicate_action_directory': os.path.join(work_dir, 'actions'),
+        'pair_distance_store_file': os.path.join(work_dir, 'pair_distances.txt'),
+        'pair_decisions_file': os.path.join(work_dir, 'pair_decisions.txt'),
+        'action_plan_file': os.path.join(work_dir, 'action_plan.txt'),
+    }
+    config['DuplicateFinder'] = {
+        'hash_type': hash_type,
+        'hash_size': str(hash_size),
+        'hash_threshold': str(threshold),
+        'rebuild_hash_cache': 'yes',
+        'enable_exif_thumbnail_hashing': 'yes' if decode_mode == 'exif_thumbnail' else 'no',
+    }
+    config_path = os.path.join(work_dir, 'config.ini')
+    with open(config_path, 'w') as f:
+        config.write(f)
+    return config_path
+
+def _run_configuration(config_path: str, image_settings_path: str, result_queue) -> None:
+    """Runs one configuration (in a child process, so peak RSS is per configuration)."""
+    with contextlib.redirect_stdout(io.StringIO()): # DuplicateFinder logs every file
+        finder = DuplicateFinder(ConfigManager(config_path, image_settings_path))
+        hasher = finder._get_hasher()
+        start = time.perf_counter()
+        hashes, dimensions, thumbnail_hashed = finder._refresh_hash_cache(hasher)
+        hashing_seconds = time.perf_counter() - start
+        # Time the hash scoring on its own; thumbnail verification decodes, fingerprints and the
+        # report/action plan writing are counted separately as post-processing
+        score_pairs_untimed = finder._score_pairs
+        comparison_seconds = 0.0
+        def timed_score_pairs(*args, **kwargs):
+            nonlocal comparison_seconds
+            scoring_start = time.perf_counter()
+            try:
+                return score_pairs_untimed(*args, **kwargs)
+            finally:
+                comparison_seconds += time.perf_counter() - scoring_start
+        finder._score_pairs = timed_score_pairs
+        start = time.perf_counter()
+        pairs = finder._find_duplicates_in_hashes(hashes, dimensions, thumbnail_hashed, hasher)
+        postprocess_seconds = time.perf_counter() - start - comparison_seconds
+    peak_rss_mb = None
+    if resource is not None:
+        # ru_maxrss is in KiB on Linux and in bytes on macOS
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    result_queue.put((len(hashes), hashing_seconds, comparison_seconds, postprocess_seconds, peak_rss_mb, pairs))
+
+def score_pairs(pairs: List[Tuple[str, str]], groups: Dict[str, int]) -> Tuple[float, float]:
+    """Returns (precision, recall) of the found pairs against the corpus ground truth."""
+    truth: Set[frozenset] = set()
+    members: Dict[int, List[str]] = {}
+    for path, group in groups.items():
+        members.setdefault(group, []).append(path)
+    for paths in members.values():
+        truth.update(frozenset(pair) for pair in combinations(paths, 2))
+    found = {frozenset(pair) for pair in pairs}
+    true_positives = len(found & truth)
+    precision = true_positives / len(found) if found else 1.0
+    recall = true_positives / len(truth) if truth else 1.0
+    return precision, recall
+
+def run_benchmark(corpus_dir: str, work_dir: str, originals: int, seed: int, hash_types: List[str],
+                  hash_sizes: List[int], decode_modes: List[str], base_threshold: int) -> List[Dict[str, object]]:
+    """Runs every configuration in the matrix and returns one result row per configuration."""
+    groups = generate_corpus(corpus_dir, originals, seed)
+    os.makedirs(work_dir, exist_ok=True)
+    image_settings_path = os.path.join(work_dir, 'image_settings.ini')
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for hash_type in hash_types:
+        for hash_size in hash_sizes:
+            for decode_mode in decode_modes:
+                # Keep the threshold the same fraction of the hash length across sizes
+                threshold = max(1, round(base_threshold * hash_size * hash_size / 64))
+                config_path = _write_run_config(work_dir, corpus_dir, hash_type, hash_size, decode_mode, threshold)
+                result_queue = context.Queue()
+                process = context.Process(target=_run_configuration, args=(config_path, image_settings_path, result_queue))
+                process.start()
+                image_count, hashing_seconds, comparison_seconds, postprocess_seconds, peak_rss_mb, pairs = result_queue.get()
+                process.join()
+                precision, recall = score_pairs(pairs, groups)
+                row = {
+                    'hash_type': hash_type, 'hash_size': hash_size, 'decode_mode': decode_mode, 'threshold': threshold,
+                    'images_per_second': image_count / hashing_seconds if hashing_seconds else 0.0,
+                    'comparison_seconds': comparison_seconds, 'postprocess_seconds': postprocess_seconds, 'peak_rss_mb': peak_rss_mb,
+                    'pairs': len(pairs), 'precision': precision, 'recall': recall,
+                }
+                rows.append(row)
+                print(_format_row(row))
+    return rows
+
+TABLE_HEADER = f"{'hash_type':<15}{'size':>5}  {'decode':<15}{'thr':>4}{'img/s':>9}{'compare s':>11}{'post s':>9}{'peak MB':>9}{'pairs':>7}{'precision':>11}{'recall':>8}"
+
+def _format_row(row: Dict[str, object]) -> str:
+    peak = f"{row['peak_rss_mb']:.0f}" if row['peak_rss_mb'] is not None else 'n/a'
+    return (f"{row['hash_type']:<15}{row['hash_size']:>5}  {row['decode_mode']:<15}{row['threshold']:>4}"
+            f"{row['images_per_second']:>9.1f}{row['comparison_seconds']:>11.3f}{row['postprocess_seconds']:>9.3f}{peak:>9}{row['pairs']:>7}"
+            f"{row['precision']:>11.3f}{row['recall']:>8.3f}")
+
+def write_csv(rows: List[Dict[str, object]], csv_path: str) -> None:
+    """Writes the result rows as CSV."""
+    import csv
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Benchmark results written to: {os.path.abspath(csv_path)}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark DuplicateFinder settings on a synthetic corpus with known duplicates.")
+    parser.add_argument('--corpus-dir', default='./benchmark_data/corpus')
+    parser.add_argument('--work-dir', default='./benchmark_data/work')
+    parser.add_argument('--originals', type=int, default=40, help="number of originals; each gets one file per variant")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--hash-types', default='ahash,dhash,phash,whash,crop_resistant')
+    parser.add_argument('--hash-sizes', default='8,16')
+    parser.add_argument('--decode-modes', default='full,exif_thumbnail')
+    parser.add_argument('--threshold', type=int, default=10, help="threshold for 8x8 hashes; scaled for other sizes")
+    parser.add_argument('--csv', help="also write the results to this CSV file")
+    args = parser.parse_args(argv)
+
+    print(f"Variants per original: {', '.join(VARIANTS)}")
+    print(TABLE_HEADER)
+    rows = run_benchmark(args.corpus_dir, args.work_dir, args.originals, args.seed,
+                         [hash_type.strip() for hash_type in args.hash_types.split(',')],
+                         [int(size) for size in args.hash_sizes.split(',')],
+                         [mode.strip() for mode in args.decode_modes.split(',')], args.threshold)
+    if args.csv and rows:
+        write_csv(rows, args.csv)
+
+if __name__ == "__main__":
+    main()
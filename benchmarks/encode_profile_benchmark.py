@@ -0,0 +1,101 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It encodes a sample of the input images with
+# every encode profile in image_settings.ini and reports encode time and output bytes per
+# format and profile, so the active profile can be chosen knowing what it costs.
+#
+# Usage (from the project root):
+#   python benchmarks/encode_profile_benchmark.py --images 20 --size 1920x1080
+
+import io
+import os
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.config_manager import ConfigManager
+from core.image_processor import parse_encode_params
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
+FORMAT_MODES = {'JPEG': 'RGB', 'WEBP': 'RGBA', 'PNG': 'RGBA'} # Modes each format can store without conversion errors
+
+def load_sample(input_dir: str, image_count: int, max_size: Tuple[int, int]) -> List[Image.Image]:
+    """Decodes up to image_count input images (sorted by path), fitted inside max_size."""
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        paths.extend(os.path.join(root, filename) for filename in sorted(files) if filename.lower().endswith(IMAGE_EXTENSIONS))
+    sample = []
+    for path in paths[:image_count]:
+        try:
+            with Image.open(path) as img:
+                img.thumbnail(max_size, Image.LANCZOS)
+                sample.append(img.convert('RGBA') if img.mode in ('RGBA', 'LA', 'P') else img.convert('RGB'))
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+    return sample
+
+def benchmark_profiles(sample: List[Image.Image], profiles: Dict[str, Dict[str, str]]) -> None:
+    """Encodes every sample image in memory with each format's profiles and prints a table."""
+    print(f"{'format':<6} {'profile':<10} {'ms/image':>9} {'KB/image':>9}  options")
+    for save_format, format_profiles in sorted(profiles.items()):
+        for profile_name, encode_params in format_profiles.items():
+            params = parse_encode_params(encode_params)
+            total_seconds = 0.0
+            total_bytes = 0
+            for img in sample:
+                if save_format == 'JPEG' and img.mode != FORMAT_MODES['JPEG']:
+                    img = img.convert('RGB')
+                buffer = io.BytesIO()
+                start = time.perf_counter()
+                img.save(buffer, format=save_format, **params)
+                total_seconds += time.perf_counter() - start
+                total_bytes += buffer.tell()
+            print(f"{save_format:<6} {profile_name:<10} {total_seconds / len(sample) * 1000:>9.1f} "
+                  f"{total_bytes / len(sample) / 1024:>9.1f}  {encode_params}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare encode profiles ([EncodeProfiles] in image_settings.ini) on input images.")
+    parser.add_argument('--config', default='config.ini')
+    parser.add_argument('--image-settings', default='image_settings.ini')
+    parser.add_argument('--input-dir', help="images to sample (default: input_directory from config.ini)")
+    parser.add_argument('--images', type=int, default=20, help="number of images to sample")
+    parser.add_argument('--size', default='1920x1080', help="images are fitted inside this size before encoding")
+    args = parser.parse_args(argv)
+
+    config_manager = ConfigManager(args.config, args.image_settings)
+    input_dir = args.input_dir or config_manager.get('Paths', 'input_directory')
+    max_width, max_height = (int(part) for part in args.size.lower().split('x'))
+
+    # [EncodeProfiles] options are named <format>_<profile>
+    profiles: Dict[str, Dict[str, str]] = {}
+    for option, encode_params in config_manager.get_section_as_dict('EncodeProfiles').items():
+        save_format, _, profile_name = option.partition('_')
+        if profile_name and save_format.upper() in FORMAT_MODES:
+            profiles.setdefault(save_format.upper(), {})[profile_name] = encode_params
+
+    sample = load_sample(input_dir, args.images, (max_width, max_height))
+    if not sample or not profiles:
+        print(f"Nothing to benchmark: {len(sample)} images in '{input_dir}', {len(profiles)} formats with encode profiles.")
+        return
+    print(f"Encoding {len(sample)} images from '{input_dir}' (fitted inside {max_width}x{max_height}):")
+    benchmark_profiles(sample, profiles)
+
+if __name__ == "__main__":
+    main()
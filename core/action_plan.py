@@ -0,0 +1,127 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It persists what duplicate detection
+# decided should happen (which file of each duplicate cluster to keep, which to act on),
+# so the move/copy/delete step can run later, even after a restart, without a rescan.
+
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from core.image_utils import get_file_fingerprint
+
+class PlanEntry(NamedTuple):
+    path: str
+    fingerprint: str
+    size: int
+    mtime: float
+
+class PlanCluster(NamedTuple):
+    keeper: PlanEntry
+    victims: List[PlanEntry]
+
+class ActionPlan:
+    """
+    Duplicate clusters with one keeper and the files to act on.
+
+    File layout (plain text, tab separated; the path comes last so it may contain anything):
+        cluster<TAB><number>
+        keep<TAB><fingerprint><TAB><size><TAB><mtime><TAB><path>
+        remove<TAB><fingerprint><TAB><size><TAB><mtime><TAB><path>     - one line per victim
+    """
+    def __init__(self, clusters: List[PlanCluster]):
+        self.clusters = clusters
+
+    def victim_count(self) -> int:
+        return sum(len(cluster.victims) for cluster in self.clusters)
+
+    def save(self, plan_path: str) -> None:
+        """Writes the plan, or removes the plan file if nothing is left to do."""
+        try:
+            if not self.clusters:
+                if os.path.exists(plan_path):
+                    os.remove(plan_path)
+                print("Action plan is empty; no plan file kept.")
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(plan_path)), exist_ok=True)
+            with open(plan_path, 'w', encoding='utf-8') as f:
+                for number, cluster in enumerate(self.clusters, 1):
+                    f.write(f"cluster\t{number}\n")
+                    for kind, entries in (('keep', [cluster.keeper]), ('remove', cluster.victims)):
+                        for entry in entries:
+                            f.write(f"{kind}\t{entry.fingerprint}\t{entry.size}\t{entry.mtime}\t{entry.path}\n")
+            print(f"Saved action plan ({len(self.clusters)} clusters, {self.victim_count()} files to act on) to: {os.path.abspath(plan_path)}")
+        except (IOError, OSError) as e:
+            print(f"Error saving action plan '{plan_path}': {e}.")
+
+    @classmethod
+    def load(cls, plan_path: str) -> Optional['ActionPlan']:
+        """Reads a plan. Returns None if it is missing or unreadable."""
+        if not os.path.exists(plan_path):
+            return None
+        clusters: List[PlanCluster] = []
+        try:
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    kind, rest = line.rstrip('\n').split('\t', 1)
+                    if kind == 'cluster':
+                        continue
+                    fingerprint, size, mtime, path = rest.split('\t', 3)
+                    entry = PlanEntry(path, fingerprint, int(size), float(mtime))
+                    if kind == 'keep':
+                        clusters.append(PlanCluster(entry, []))
+                    elif kind == 'remove' and clusters:
+                        clusters[-1].victims.append(entry)
+                    else:
+                        raise ValueError(f"unexpected line '{line.strip()}'")
+            return cls(clusters)
+        except (IOError, ValueError) as e:
+            print(f"Warning: Could not read action plan '{plan_path}': {e}.")
+            return None
+
+def build_clusters(pairs: List[Tuple[str, str]]) -> List[List[str]]:
+    """Groups duplicate pairs into clusters of connected files (union-find). Each cluster is sorted."""
+    parent: Dict[str, str] = {}
+
+    def find(filepath: str) -> str:
+        while parent[filepath] != filepath:
+            parent[filepath] = parent[parent[filepath]] # Path halving
+            filepath = parent[filepath]
+        return filepath
+
+    for filepath1, filepath2 in pairs:
+        parent.setdefault(filepath1, filepath1)
+        parent.setdefault(filepath2, filepath2)
+        root1, root2 = find(filepath1), find(filepath2)
+        if root1 != root2:
+            parent[max(root1, root2)] = min(root1, root2)
+
+    clusters: Dict[str, List[str]] = {}
+    for filepath in parent:
+        clusters.setdefault(find(filepath), []).append(filepath)
+    return sorted(sorted(members) for members in clusters.values())
+
+def entry_is_unchanged(entry: PlanEntry) -> bool:
+    """
+    Checks a planned file still is what detection saw: a stat (exists, same size and modification
+    time, which catches same-length edits the fingerprint cannot see) and then the content
+    fingerprint, which only reads parts of the file.
+    """
+    try:
+        stat_result = os.stat(entry.path)
+        if stat_result.st_size != entry.size or stat_result.st_mtime != entry.mtime:
+            return False
+    except OSError:
+        return False
+    return get_file_fingerprint(entry.path) == entry.fingerprint
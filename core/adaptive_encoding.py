@@ -0,0 +1,141 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It searches the JPEG/WebP quality setting
+# per image so the output fits a byte budget, or keeps at least a given SSIM to the resized image.
+
+import io
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+from PIL import Image
+
+ADAPTIVE_FORMATS = ('JPEG', 'WEBP') # Formats with a quality setting to search
+SSIM_WINDOW = 8
+SSIM_SCALE_SIZE = 256 # Images are block-averaged towards this short side first, as the reference SSIM implementation does
+
+class AdaptiveTarget(NamedTuple):
+    kind: str # 'bytes': highest quality that fits max_bytes; 'ssim': lowest quality with SSIM >= min_ssim
+    max_bytes: int
+    min_ssim: float
+    min_quality: int
+    max_quality: int
+    max_iterations: int
+
+    def to_string(self) -> str:
+        """Compact form stored with each planned output (no ',' or '/')."""
+        return f"{self.kind}:{self.max_bytes}:{self.min_ssim}:{self.min_quality}:{self.max_quality}:{self.max_iterations}"
+
+    @classmethod
+    def from_string(cls, text: str) -> Optional['AdaptiveTarget']:
+        if not text:
+            return None
+        kind, max_bytes, min_ssim, min_quality, max_quality, max_iterations = text.split(':')
+        return cls(kind, int(max_bytes), float(min_ssim), int(min_quality), int(max_quality), int(max_iterations))
+
+class SearchResult(NamedTuple):
+    data: bytes # The encoded file
+    quality: int
+    iterations: int # Encodes performed
+    ssim: Optional[float] # Only computed for 'ssim' targets
+    target_met: bool
+
+def _luminance(img: Image.Image) -> np.ndarray:
+    return np.asarray(img.convert('L'), dtype=np.float64)
+
+def _box_means(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over every window x window block (valid positions only), via an integral image."""
+    integral = np.pad(values, ((1, 0), (1, 0))).cumsum(axis=0).cumsum(axis=1)
+    sums = (integral[window:, window:] - integral[:-window, window:]
+            - integral[window:, :-window] + integral[:-window, :-window])
+    return sums / (window * window)
+
+def _block_average(values: np.ndarray, factor: int) -> np.ndarray:
+    if factor <= 1:
+        return values
+    height, width = values.shape[0] // factor * factor, values.shape[1] // factor * factor
+    return values[:height, :width].reshape(height // factor, factor, width // factor, factor).mean(axis=(1, 3))
+
+def compute_ssim(reference: np.ndarray, candidate: np.ndarray, window: int = SSIM_WINDOW) -> float:
+    """
+    Mean structural similarity of two luminance arrays of the same shape, over a sliding box window.
+    Large images are block-averaged first (factor round(short side / 256)), which is what the
+    perceptual scale of SSIM assumes and keeps it cheap enough to run on every search step.
+    """
+    factor = max(1, round(min(reference.shape) / SSIM_SCALE_SIZE))
+    reference, candidate = _block_average(reference, factor), _block_average(candidate, factor)
+    window = min(window, reference.shape[0], reference.shape[1])
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mean_ref, mean_cand = _box_means(reference, window), _box_means(candidate, window)
+    var_ref = _box_means(reference * reference, window) - mean_ref ** 2
+    var_cand = _box_means(candidate * candidate, window) - mean_cand ** 2
+    covariance = _box_means(reference * candidate, window) - mean_ref * mean_cand
+    ssim_map = ((2 * mean_ref * mean_cand + c1) * (2 * covariance + c2)) / \
+               ((mean_ref ** 2 + mean_cand ** 2 + c1) * (var_ref + var_cand + c2))
+    return float(ssim_map.mean())
+
+def search_quality(img: Image.Image, save_format: str, encode_params: Dict[str, object], target: AdaptiveTarget) -> SearchResult:
+    """
+    Binary-searches the quality setting, encoding into memory each time; the resized pixels are
+    reused, only the encoder runs again. Stops after target.max_iterations encodes. If no encode
+    meets the target, the closest one tried (smallest file, or highest SSIM) is used and target_met
+    is False; the search heads for that end of the range, so no extra encode is spent on it.
+    """
+    reference = _luminance(img) if target.kind == 'ssim' else None
+    encodes: Dict[int, bytes] = {}
+
+    def encode(quality: int) -> bytes:
+        if quality not in encodes:
+            buffer = io.BytesIO()
+            img.save(buffer, format=save_format, **dict(encode_params, quality=quality))
+            encodes[quality] = buffer.getvalue()
+        return encodes[quality]
+
+    def similarity(data: bytes) -> float:
+        with Image.open(io.BytesIO(data)) as decoded:
+            return compute_ssim(reference, _luminance(decoded))
+
+    low, high = target.min_quality, target.max_quality
+    best: Optional[SearchResult] = None
+    closest: Optional[SearchResult] = None # Best encode that missed the target
+    while low <= high and len(encodes) < target.max_iterations:
+        quality = (low + high) // 2
+        data = encode(quality)
+        if target.kind == 'bytes':
+            if len(data) <= target.max_bytes:
+                best = SearchResult(data, quality, 0, None, True)
+                low = quality + 1 # Fits; try better quality
+            else:
+                if closest is None or len(data) < len(closest.data):
+                    closest = SearchResult(data, quality, 0, None, False)
+                high = quality - 1
+        else:
+            ssim = similarity(data)
+            if ssim >= target.min_ssim:
+                best = SearchResult(data, quality, 0, ssim, True)
+                high = quality - 1 # Good enough; try a smaller file
+            else:
+                if closest is None or ssim > closest.ssim:
+                    closest = SearchResult(data, quality, 0, ssim, False)
+                low = quality + 1
+
+    if best is None:
+        best = closest
+    if best is None: # Empty quality range: nothing was encoded yet
+        quality = target.min_quality if target.kind == 'bytes' else target.max_quality
+        data = encode(quality)
+        ssim = similarity(data) if target.kind == 'ssim' else None
+        met = len(data) <= target.max_bytes if target.kind == 'bytes' else ssim >= target.min_ssim
+        best = SearchResult(data, quality, 0, ssim, met)
+    return best._replace(iterations=len(encodes))
@@ -19,6 +19,9 @@ import configparser
 import os
 from typing import Optional, Dict, Any
 
+# Sections that live in image_settings.ini; every other section is saved to config.ini
+IMAGE_SETTINGS_SECTIONS = ('ImageSettings', 'Renditions', 'EncodeProfiles')
+
 class ConfigManager:
     """
     Manages loading and providing access to application configuration from config.ini.
@@ -76,10 +79,30 @@ class ConfigManager:
             'master_definitions_file': './core/resolution_definitions.py',
             'image_hashes_cache_file': './image_cache/hashes.txt',
             'duplicate_report_file': './scan_reports/duplicate_images.txt',
-            'duplicate_action_directory': './duplicate_actions_archive'
+            'duplicate_action_directory': './duplicate_actions_archive',
+            'new_images_directory': '',
+            'pair_distance_store_file': './image_cache/pair_distances.txt',
+            'pair_decisions_file': './image_cache/pair_decisions.txt',
+            'similarity_index_file': './image_cache/similarity_index.npz',
+            'shard_directory': './image_cache/shards',
+            'action_plan_file': './scan_reports/duplicate_action_plan.txt',
+            'processing_plan_file': './scan_reports/processing_plan.txt'
         }
         default_primary_parser['Renaming'] = {
-            'enable_random_rename': 'yes'
+            'enable_random_rename': 'yes',
+            'name_seed': ''
+        }
+        default_primary_parser['ImageProcessor'] = {
+            'workers': '0',
+            'worker_mode': 'thread',
+            'enable_reduce_on_load': 'no',
+            'reduce_on_load_guard': '2.0',
+            'enable_incremental_processing': 'no',
+            'enable_passthrough': 'no',
+            'passthrough_method': 'reflink',
+            'enable_content_dedup': 'no',
+            'output_layout': 'flat',
+            'plan_calibration_images': '8'
         }
         default_primary_parser['Scanner'] = {
             'enable_exclusion_reference': 'yes',
@@ -89,9 +112,23 @@ class ConfigManager:
             'enable_duplicate_detection': 'no',
             'hash_type': 'dhash',
             'hash_threshold': '8',
+            'hash_size': '8',
             'rebuild_hash_cache': 'no',
             'duplicate_action_type': 'none',
-            'enable_duplicate_actions': 'no'
+            'enable_duplicate_actions': 'no',
+            'enable_aspect_ratio_blocking': 'no',
+            'comparison_scope': 'global',
+            'enable_low_entropy_guard': 'no',
+            'low_entropy_threshold': '2',
+            'enable_exif_thumbnail_hashing': 'no',
+            'enable_pair_distance_store': 'no',
+            'pair_store_max_distance': '16',
+            'enable_flip_matching': 'no',
+            'crop_min_matching_segments': '2',
+            'enable_similarity_index': 'no',
+            'similarity_top_k': '10',
+            'shard_name': '',
+            'action_workers': '4'
         }
 
         with open(self.primary_config_path, 'w') as configfile:
@@ -117,6 +154,31 @@ class ConfigManager:
             'target_resolution_5_8': 'Common AI Gen Portrait',
             'target_resolution_13_19': 'Common AI Gen Portrait'
         }
+        default_image_settings_parser['Renditions'] = {
+            'enable_renditions': 'no',
+            '4k': '3840x2160 jpg webp',
+            '1080p': '1920x1080 jpg webp',
+            'thumb': '512x512 jpg webp'
+        }
+        # Quality stays the same across a format's profiles; they trade encoding time against output size
+        default_image_settings_parser['EncodeProfiles'] = {
+            'active_profile': 'balanced',
+            'jpeg_fast': 'quality=75',
+            'jpeg_balanced': 'quality=75 optimize=true',
+            'jpeg_smallest': 'quality=75 optimize=true progressive=true',
+            'webp_fast': 'quality=80 method=0',
+            'webp_balanced': 'quality=80 method=4',
+            'webp_smallest': 'quality=80 method=6',
+            'png_fast': 'compress_level=1',
+            'png_balanced': 'compress_level=6',
+            'png_smallest': 'compress_level=9 optimize=true',
+            'adaptive_target': 'none',
+            'adaptive_max_bytes': '500000',
+            'adaptive_min_ssim': '0.95',
+            'adaptive_min_quality': '30',
+            'adaptive_max_quality': '95',
+            'adaptive_max_iterations': '7'
+        }
 
         with open(self.image_settings_config_path, 'w') as configfile:
             default_image_settings_parser.write(configfile)
@@ -133,6 +195,11 @@ class ConfigManager:
         actual_fallback = fallback if fallback is not None else 0
         return self.config.getint(section, option, fallback=actual_fallback)
 
+    def getfloat(self, section: str, option: str, fallback: Optional[float] = None) -> float:
+        """Gets a float option from the merged config."""
+        actual_fallback = fallback if fallback is not None else 0.0
+        return self.config.getfloat(section, option, fallback=actual_fallback)
+
     def getboolean(self, section: str, option: str, fallback: Optional[bool] = None) -> bool:
         """Gets a boolean option from the merged config."""
         actual_fallback = fallback if fallback is not None else False
@@ -157,15 +224,16 @@ class ConfigManager:
         try:
             primary_parser = configparser.ConfigParser()
             for section in self.config.sections():
-                if section != 'ImageSettings':
+                if section not in IMAGE_SETTINGS_SECTIONS:
                     primary_parser[section] = self.config[section]
 
             with open(self.primary_config_path, 'w') as configfile:
                 primary_parser.write(configfile)
 
             image_settings_parser = configparser.ConfigParser()
-            if 'ImageSettings' in self.config:
-                image_settings_parser['ImageSettings'] = self.config['ImageSettings']
+            for section in IMAGE_SETTINGS_SECTIONS:
+                if section in self.config:
+                    image_settings_parser[section] = self.config[section]
 
             with open(self.image_settings_config_path, 'w') as configfile:
                 image_settings_parser.write(configfile)
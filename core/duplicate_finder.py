@@ -13,13 +13,37 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
-from PIL import Image
+import io
+import hashlib
+import socket
+from functools import partial
+from collections import Counter
+from PIL import Image, ExifTags
 import imagehash
-from typing import Dict, List, Tuple, Optional
+import numpy as np
+from typing import Dict, List, Tuple, Optional, Set
 import shutil # For file operations (move/copy)
+from concurrent.futures import ThreadPoolExecutor
 
 # Import ConfigManager for path and setting retrieval
 from core.config_manager import ConfigManager
+from core.image_utils import ASPECT_RATIO_TOLERANCE, get_file_fingerprint
+from core.pair_store import PairDistanceStore
+from core.pair_decisions import PairDecisionStore, DECISION_DUPLICATE, DECISION_NOT_DUPLICATE
+from core.similarity_index import SimilarityIndex
+from core.action_plan import ActionPlan, PlanCluster, PlanEntry, build_clusters, entry_is_unchanged
+from core.hash_shards import HashShard, ShardRecord, SHARD_EXTENSION, list_shard_files, merge_shards
+
+# Feature vectors are the low-frequency 8x8 DCT block phash thresholds, minus the DC term
+DCT_FEATURE_SIZE = 8
+DCT_FEATURE_DIMENSIONS = DCT_FEATURE_SIZE * DCT_FEATURE_SIZE - 1
+
+# Narrowest segment hash band worth indexing; below this nearly every image shares every band,
+# so crop-resistant comparison falls back to comparing all pairs
+CROP_MIN_BAND_BITS = 6
+
+# First line of the hash cache; names the hash type the cached hashes were computed with
+CACHE_HASH_TYPE_PREFIX = '#hash_type,'
 
 class DuplicateFinder:
     """
@@ -32,12 +56,48 @@ class DuplicateFinder:
         self.hashes_cache_file = self.config_manager.get('Paths', 'image_hashes_cache_file')
         self.duplicate_report_file = self.config_manager.get('Paths', 'duplicate_report_file')
         self.duplicate_action_directory = self.config_manager.get('Paths', 'duplicate_action_directory')
+        self.pair_distance_store_file = self.config_manager.get('Paths', 'pair_distance_store_file', fallback='./image_cache/pair_distances.txt')
+        self.pair_decisions_file = self.config_manager.get('Paths', 'pair_decisions_file', fallback='./image_cache/pair_decisions.txt')
+        self.similarity_index_file = self.config_manager.get('Paths', 'similarity_index_file', fallback='./image_cache/similarity_index.npz')
+        # Persisted keep/act-on plan written by detection, so actions can run later without a rescan
+        self.action_plan_file = self.config_manager.get('Paths', 'action_plan_file', fallback='./scan_reports/duplicate_action_plan.txt')
+        self.action_workers = max(1, self.config_manager.getint('DuplicateFinder', 'action_workers', fallback=4))
+        # Shard mode: each machine writes the hashes of its own input directory here; one merges them all
+        self.shard_directory = self.config_manager.get('Paths', 'shard_directory', fallback='./image_cache/shards')
+        self.shard_name = self.config_manager.get('DuplicateFinder', 'shard_name', fallback='').strip() or socket.gethostname()
 
         self.hash_type = self.config_manager.get('DuplicateFinder', 'hash_type', fallback='dhash').lower()
         self.hash_threshold = self.config_manager.getint('DuplicateFinder', 'hash_threshold', fallback=8)
+        # Hashes have hash_size x hash_size bits; thresholds scale with the bit count
+        self.hash_size = max(2, self.config_manager.getint('DuplicateFinder', 'hash_size', fallback=8))
         self.rebuild_hash_cache = self.config_manager.getboolean('DuplicateFinder', 'rebuild_hash_cache', fallback=False)
         self.duplicate_action_type = self.config_manager.get('DuplicateFinder', 'duplicate_action_type', fallback='none').lower()
         self.enable_duplicate_actions = self.config_manager.getboolean('DuplicateFinder', 'enable_duplicate_actions', fallback=False)
+        self.enable_aspect_ratio_blocking = self.config_manager.getboolean('DuplicateFinder', 'enable_aspect_ratio_blocking', fallback=False)
+        # Which pairs to compare: global, per_directory, cross_root or new_vs_existing
+        self.comparison_scope = self.config_manager.get('DuplicateFinder', 'comparison_scope', fallback='global').lower()
+        self.new_images_dir = self.config_manager.get('Paths', 'new_images_directory', fallback='')
+        # Blank/solid images hash to near-constant values and would all match each other,
+        # so they are matched by exact pixel content instead of Hamming distance.
+        self.enable_low_entropy_guard = self.config_manager.getboolean('DuplicateFinder', 'enable_low_entropy_guard', fallback=False)
+        self.low_entropy_threshold = self.config_manager.getint('DuplicateFinder', 'low_entropy_threshold', fallback=2)
+        self.low_information_images: List[str] = []
+        # Fast first pass: hash the embedded EXIF thumbnail, decoding the full image only to verify matches
+        self.enable_exif_thumbnail_hashing = self.config_manager.getboolean('DuplicateFinder', 'enable_exif_thumbnail_hashing', fallback=False)
+        # Record every pair up to pair_store_max_distance so later threshold changes are a range read
+        self.enable_pair_distance_store = self.config_manager.getboolean('DuplicateFinder', 'enable_pair_distance_store', fallback=False)
+        self.pair_store_max_distance = self.config_manager.getint('DuplicateFinder', 'pair_store_max_distance', fallback=16)
+        # Remembered review decisions, keyed by content fingerprints rather than paths
+        self.pair_decision_store = PairDecisionStore(self.pair_decisions_file)
+        self._fingerprints: Dict[str, Optional[str]] = {}
+        # Match mirrored/rotated copies by comparing bit-derived variants of each hash (ahash/dhash only)
+        self.enable_flip_matching = self.config_manager.getboolean('DuplicateFinder', 'enable_flip_matching', fallback=False)
+        self._hash_variants: Dict[str, List[imagehash.ImageHash]] = {}
+        # Crop-resistant mode: how many image segments must match for a pair to count as a duplicate
+        self.crop_min_matching_segments = max(1, self.config_manager.getint('DuplicateFinder', 'crop_min_matching_segments', fallback=2))
+        # Keep full-precision DCT feature vectors in an approximate nearest-neighbour index for "most similar" queries
+        self.enable_similarity_index = self.config_manager.getboolean('DuplicateFinder', 'enable_similarity_index', fallback=False)
+        self.similarity_top_k = self.config_manager.getint('DuplicateFinder', 'similarity_top_k', fallback=10)
 
         # Supported hash types and their corresponding hash functions from imagehash
         self._hash_functions = {
@@ -45,7 +105,8 @@ class DuplicateFinder:
             'phash': imagehash.phash,
             'dhash': imagehash.dhash,
             'whash': imagehash.whash,
-            # Add other hash types if needed, e.g., 'crop_resistant_hash': imagehash.crop_resistant_hash
+            # One dhash per image segment; compared through a segment index (see _compare_crop_resistant)
+            'crop_resistant': imagehash.crop_resistant_hash,
         }
         self.image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
 
@@ -58,39 +119,105 @@ class DuplicateFinder:
         print(f"  Input Directory: {os.path.abspath(self.input_dir)}")
         print(f"  Hash Type: {self.hash_type}")
         print(f"  Hash Threshold: {self.hash_threshold}")
+        print(f"  Hash Size: {self.hash_size} ({self.hash_size * self.hash_size} bits)")
         print(f"  Rebuild Cache: {self.rebuild_hash_cache}")
         print(f"  Cache File: {os.path.abspath(self.hashes_cache_file)}")
         print(f"  Report File: {os.path.abspath(self.duplicate_report_file)}")
         print(f"  Action Directory: {os.path.abspath(self.duplicate_action_directory)}")
         print(f"  Duplicate Action Type: {self.duplicate_action_type}")
         print(f"  Enable Duplicate Actions: {self.enable_duplicate_actions}")
+        print(f"  Aspect Ratio Blocking: {self.enable_aspect_ratio_blocking}")
+        print(f"  Comparison Scope: {self.comparison_scope}")
+        if self.comparison_scope == 'new_vs_existing':
+            print(f"  New Images Directory: {os.path.abspath(self.new_images_dir) if self.new_images_dir else '(not set)'}")
+        print(f"  Low Entropy Guard: {self.enable_low_entropy_guard} (Threshold: {self.low_entropy_threshold})")
+        print(f"  EXIF Thumbnail Hashing: {self.enable_exif_thumbnail_hashing}")
+        if self.enable_pair_distance_store:
+            print(f"  Pair Distance Store: {os.path.abspath(self.pair_distance_store_file)} (Max Distance: {self.pair_store_max_distance})")
+        print(f"  Action Plan File: {os.path.abspath(self.action_plan_file)} (Workers: {self.action_workers})")
+        print(f"  Pair Decisions File: {os.path.abspath(self.pair_decisions_file)}")
+        print(f"  Flip/Rotation Matching: {self.enable_flip_matching}")
+        if self.hash_type == 'crop_resistant':
+            print(f"  Crop-Resistant Minimum Matching Segments: {self.crop_min_matching_segments}")
+        print(f"  Shard Directory: {os.path.abspath(self.shard_directory)} (This Shard: {self.shard_name})")
+        if self.enable_similarity_index:
+            print(f"  Similarity Index: {os.path.abspath(self.similarity_index_file)} (Top K: {self.similarity_top_k})")
 
 
     def _get_hasher(self):
-        """Returns the selected hash function."""
+        """Returns the selected hash function, bound to the configured hash size."""
         hasher = self._hash_functions.get(self.hash_type)
         if hasher is None:
             print(f"Warning: Unknown hash type '{self.hash_type}'. Defaulting to 'dhash'.")
-            return imagehash.dhash
-        return hasher
+            hasher = imagehash.dhash
+        if hasher is imagehash.whash and self.hash_size & (self.hash_size - 1):
+            print(f"Warning: whash needs a power-of-two hash size, not {self.hash_size}. Using 8.")
+            self.hash_size = 8
+        if hasher is imagehash.crop_resistant_hash:
+            # Segments are hashed with dhash; the size applies to each segment hash
+            return partial(hasher, hash_func=partial(imagehash.dhash, hash_size=self.hash_size))
+        return partial(hasher, hash_size=self.hash_size)
+
+    def _is_current_hash_kind(self, img_hash) -> bool:
+        """
+        True if a cached hash has the configured shape: a multi-hash exactly when crop_resistant is configured,
+        with hash_size x hash_size bits. The hash type itself is checked from the cache header on load.
+        """
+        if isinstance(img_hash, imagehash.ImageMultiHash) != (self.hash_type == 'crop_resistant'):
+            return False
+        bits = img_hash.segment_hashes[0].hash if isinstance(img_hash, imagehash.ImageMultiHash) else img_hash.hash
+        return bits.size == self.hash_size * self.hash_size
 
-    def _load_hashes_from_cache(self) -> Dict[str, imagehash.ImageHash]:
-        """Loads image hashes from the cache file."""
+    def _load_hashes_from_cache(self) -> Tuple[Dict[str, imagehash.ImageHash], Dict[str, Tuple[int, int]], Set[str]]:
+        """
+        Loads image hashes (and image dimensions, when recorded) from the cache file.
+        The first line is '#hash_type,<type>'; the rest are 'filepath,hash,width,height', with a trailing
+        ',exif' when the hash was taken from the embedded EXIF thumbnail; older 'filepath,hash' lines are
+        still accepted. Hashes from a cache written for another hash type (or without the header line)
+        are dropped so those images are hashed again; their dimensions are kept.
+        Returns the hashes, the dimensions and the set of thumbnail-hashed paths.
+        """
         cached_hashes = {}
+        cached_dimensions = {}
+        thumbnail_hashed = set()
         if os.path.exists(self.hashes_cache_file) and not self.rebuild_hash_cache:
             print(f"Loading hashes from cache: {os.path.abspath(self.hashes_cache_file)}")
+            cache_hash_type = None
             try:
                 with open(self.hashes_cache_file, 'r') as f:
-                    for line in f:
-                        parts = line.strip().split(',', 1)
-                        if len(parts) == 2:
-                            filepath, hash_str = parts
-                            try:
-                                cached_hashes[filepath] = imagehash.hex_to_hash(hash_str)
-                            except ValueError as ve:
-                                print(f"Warning: Could not parse hash '{hash_str}' for file '{filepath}': {ve}. Skipping entry.")
+                    for line_number, line in enumerate(f):
+                        line = line.rstrip('\n')
+                        if line_number == 0 and line.startswith(CACHE_HASH_TYPE_PREFIX):
+                            cache_hash_type = line[len(CACHE_HASH_TYPE_PREFIX):]
+                            continue
+                        dimensions = None
+                        from_thumbnail = line.endswith(',exif')
+                        if from_thumbnail:
+                            line = line[:-len(',exif')]
+                        # Split from the right so file paths containing commas survive
+                        parts = line.rsplit(',', 3)
+                        if len(parts) == 4 and parts[2].isdigit() and parts[3].isdigit():
+                            filepath, hash_str = parts[0], parts[1]
+                            dimensions = (int(parts[2]), int(parts[3]))
                         else:
-                            print(f"Warning: Invalid line in cache file: '{line.strip()}'. Skipping.")
+                            parts = line.rsplit(',', 1)
+                            if len(parts) != 2:
+                                print(f"Warning: Invalid line in cache file: '{line.strip()}'. Skipping.")
+                                continue
+                            filepath, hash_str = parts
+                        try:
+                            cached_hashes[filepath] = self._string_to_hash(hash_str)
+                            if dimensions:
+                                cached_dimensions[filepath] = dimensions
+                            if from_thumbnail:
+                                thumbnail_hashed.add(filepath)
+                        except ValueError as ve:
+                            print(f"Warning: Could not parse hash '{hash_str}' for file '{filepath}': {ve}. Skipping entry.")
+                if cached_hashes and cache_hash_type != self.hash_type:
+                    print(f"Hash cache was written for hash type '{cache_hash_type or 'unknown'}', not '{self.hash_type}'. "
+                          f"Its {len(cached_hashes)} hashes will be recomputed.")
+                    cached_hashes.clear()
+                    thumbnail_hashed.clear()
                 print(f"Loaded {len(cached_hashes)} hashes from cache.")
             except IOError as e:
                 print(f"Error reading hash cache file '{self.hashes_cache_file}': {e}. Starting with empty cache.")
@@ -98,102 +225,892 @@ class DuplicateFinder:
                 print(f"Unexpected error during cache loading: {e}. Starting with empty cache.")
         else:
             print("No existing hash cache found or rebuild requested. Starting with empty cache.")
-        return cached_hashes
+        return cached_hashes, cached_dimensions, thumbnail_hashed
 
-    def _save_hashes_to_cache(self, hashes: Dict[str, imagehash.ImageHash]):
-        """Saves current image hashes to the cache file."""
+    @staticmethod
+    def _hash_to_string(img_hash) -> str:
+        """
+        Serialises a hash for the cache. Each segment hash of a multi-hash is followed by ':' (commas
+        separate fields), so a multi-hash with a single segment still reads back as a multi-hash.
+        """
+        if isinstance(img_hash, imagehash.ImageMultiHash):
+            return ''.join(f"{segment}:" for segment in img_hash.segment_hashes)
+        return str(img_hash)
+
+    @staticmethod
+    def _string_to_hash(hash_str: str):
+        """Parses a hash written by _hash_to_string (also older multi-hashes without the trailing ':')."""
+        if ':' in hash_str:
+            return imagehash.ImageMultiHash([imagehash.hex_to_hash(segment) for segment in hash_str.split(':') if segment])
+        return imagehash.hex_to_hash(hash_str)
+
+    def _save_hashes_to_cache(self, hashes: Dict[str, imagehash.ImageHash], dimensions: Dict[str, Tuple[int, int]],
+                              thumbnail_hashed: Optional[Set[str]] = None):
+        """Saves current image hashes (and known dimensions) to the cache file."""
         print(f"Saving {len(hashes)} hashes to cache: {os.path.abspath(self.hashes_cache_file)}")
+        thumbnail_hashed = thumbnail_hashed or set()
         try:
             with open(self.hashes_cache_file, 'w') as f:
+                f.write(f"{CACHE_HASH_TYPE_PREFIX}{self.hash_type}\n")
                 for filepath, img_hash in hashes.items():
-                    f.write(f"{filepath},{str(img_hash)}\n")
+                    if filepath in dimensions:
+                        width, height = dimensions[filepath]
+                        marker = ",exif" if filepath in thumbnail_hashed else ""
+                        f.write(f"{filepath},{self._hash_to_string(img_hash)},{width},{height}{marker}\n")
+                    else:
+                        f.write(f"{filepath},{self._hash_to_string(img_hash)}\n")
             print("Hash cache saved.")
         except IOError as e:
             print(f"Error saving hash cache file '{self.hashes_cache_file}': {e}.")
 
+    def _get_exif_thumbnail(self, img: Image.Image) -> Optional[Image.Image]:
+        """
+        Returns the JPEG thumbnail embedded in the EXIF data (IFD1), or None if there is none.
+        Only the small APP1 payload is touched; the main image is not decoded.
+        """
+        exif_bytes = img.info.get('exif')
+        if not exif_bytes:
+            return None
+        try:
+            ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+            offset = ifd1.get(0x0201) # JPEGInterchangeFormat
+            length = ifd1.get(0x0202) # JPEGInterchangeFormatLength
+            if not offset or not length:
+                return None
+            # IFD offsets are relative to the TIFF header that follows the 'Exif\0\0' prefix
+            tiff_data = exif_bytes[6:] if exif_bytes.startswith(b'Exif\x00\x00') else exif_bytes
+            thumbnail = Image.open(io.BytesIO(tiff_data[offset:offset + length]))
+            thumbnail.load()
+            return thumbnail
+        except Exception:
+            return None
+
+    def _hash_image(self, img: Image.Image, hasher) -> Tuple[imagehash.ImageHash, bool]:
+        """
+        Hashes an opened image. In EXIF thumbnail mode the embedded thumbnail is hashed instead,
+        provided its aspect ratio agrees with the main image (camera thumbnails of 16:9 or
+        cropped shots are often letterboxed 4:3). Returns the hash and whether the thumbnail was used.
+        """
+        if self.enable_exif_thumbnail_hashing and img.height:
+            thumbnail = self._get_exif_thumbnail(img)
+            if thumbnail is not None and thumbnail.height:
+                # Allow one pixel of rounding on the thumbnail's shorter side
+                tolerance = ASPECT_RATIO_TOLERANCE + 1.0 / min(thumbnail.size)
+                if abs(thumbnail.width / thumbnail.height - img.width / img.height) <= tolerance:
+                    return hasher(thumbnail), True
+        return hasher(img), False
+
+    def _verify_thumbnail_candidates(self, scored_pairs: List[Tuple[str, str, int]], hashes: Dict[str, imagehash.ImageHash],
+                                     thumbnail_hashed: Set[str], hasher, max_distance: int,
+                                     skip_pairs: Optional[Set[Tuple[str, str]]] = None) -> List[Tuple[str, str, int]]:
+        """
+        Re-checks pairs that involve a thumbnail-derived hash against full-image hashes.
+        Only candidate images are decoded; their full hashes replace the thumbnail hashes.
+        Pairs in skip_pairs are kept as they are.
+        """
+        verified: List[Tuple[str, str, int]] = []
+        rejected_count = 0
+        skip_pairs = skip_pairs or set()
+        # Every pair scored from a thumbnail hash needs its distance recomputed, even once that file's full hash
+        # is known; thumbnail_hashed itself only tracks which files still have to be decoded.
+        scored_from_thumbnail = frozenset(thumbnail_hashed)
+        for filepath1, filepath2, distance in scored_pairs:
+            if (filepath1 not in scored_from_thumbnail and filepath2 not in scored_from_thumbnail) or \
+               (filepath1, filepath2) in skip_pairs:
+                verified.append((filepath1, filepath2, distance))
+                continue
+            for filepath in (filepath1, filepath2):
+                if filepath in thumbnail_hashed:
+                    try:
+                        with Image.open(filepath) as img:
+                            hashes[filepath] = hasher(img)
+                        thumbnail_hashed.discard(filepath)
+                    except Exception as e:
+                        print(f"Error verifying {filepath}: {e}. Keeping thumbnail hash.")
+            # Pixel-identical low-information pairs keep distance 0 regardless of hash
+            full_distance = 0 if distance == 0 and filepath1 in self.low_information_images else self._hash_distance(hashes[filepath1], hashes[filepath2])
+            if full_distance <= max_distance:
+                verified.append((filepath1, filepath2, full_distance))
+            else:
+                rejected_count += 1
+        print(f"Verified thumbnail-hash candidates against full images: {rejected_count} pairs rejected.")
+        return verified
+
+    def _read_image_dimensions(self, filepath: str) -> Optional[Tuple[int, int]]:
+        """Reads (width, height) from the image header without decoding pixel data."""
+        try:
+            with Image.open(filepath) as img:
+                return img.size
+        except Exception as e:
+            print(f"Warning: Could not read dimensions of {filepath}: {e}.")
+            return None
+
     def find_duplicates(self) -> List[Tuple[str, str]]:
         """
         Main function to find duplicate images.
         Returns a list of tuples, where each tuple contains paths to duplicate images.
         """
         print(f"\nStarting duplicate image detection in: {os.path.abspath(self.input_dir)}")
-
-        current_hashes: Dict[str, imagehash.ImageHash] = self._load_hashes_from_cache()
         hasher = self._get_hasher()
+        current_hashes, current_dimensions, thumbnail_hashed = self._refresh_hash_cache(hasher)
+        return self._find_duplicates_in_hashes(current_hashes, current_dimensions, thumbnail_hashed, hasher)
+
+    def _refresh_hash_cache(self, hasher) -> Tuple[Dict[str, imagehash.ImageHash], Dict[str, Tuple[int, int]], Set[str]]:
+        """
+        Brings the hash cache up to date with the scan directories: hashes new or updated images,
+        drops deleted ones and saves the cache. Returns (hashes, dimensions, thumbnail_hashed).
+        """
+        current_hashes, current_dimensions, thumbnail_hashed = self._load_hashes_from_cache()
 
         files_to_hash: List[str] = []
         all_image_paths = []
 
         # Collect all image paths and identify new/modified files
-        for root, _, files in os.walk(self.input_dir):
-            for filename in files:
-                if filename.lower().endswith(self.image_extensions):
-                    filepath = os.path.join(root, filename)
-                    all_image_paths.append(filepath)
-                    # Check if file needs hashing (not in cache or cache rebuild requested)
-                    if self.rebuild_hash_cache or filepath not in current_hashes:
-                        files_to_hash.append(filepath)
+        for scan_dir in self._get_scan_directories():
+            for root, _, files in os.walk(scan_dir):
+                for filename in files:
+                    if filename.lower().endswith(self.image_extensions):
+                        filepath = os.path.join(root, filename)
+                        all_image_paths.append(filepath)
+                        # Check if file needs hashing (not in cache or cache rebuild requested).
+                        # Thumbnail hashes are replaced by full hashes once thumbnail mode is off,
+                        # and hashes left over from another hash size are redone (another hash type is
+                        # caught when the cache is loaded).
+                        if self.rebuild_hash_cache or filepath not in current_hashes or \
+                           (filepath in thumbnail_hashed and not self.enable_exif_thumbnail_hashing) or \
+                           not self._is_current_hash_kind(current_hashes[filepath]):
+                            files_to_hash.append(filepath)
 
         print(f"Found {len(all_image_paths)} image files in total.")
         print(f"Hashing {len(files_to_hash)} new or updated images (or rebuilding cache).")
 
+        similarity_index = self._load_similarity_index() if self.enable_similarity_index else None
+        new_features: List[Tuple[str, np.ndarray]] = []
+
         # Generate hashes for new/updated images
         for filepath in files_to_hash:
             try:
                 with Image.open(filepath) as img:
-                    img_hash = hasher(img)
+                    # The size comes from the header we have already parsed, so recording it is free
+                    current_dimensions[filepath] = img.size
+                    if similarity_index is not None:
+                        # Feature vectors come from the full image, so compute them before any thumbnail is used
+                        new_features.append((filepath, self._get_dct_features(img)))
+                    img_hash, from_thumbnail = self._hash_image(img, hasher)
                     current_hashes[filepath] = img_hash
+                    if from_thumbnail:
+                        thumbnail_hashed.add(filepath)
+                    else:
+                        thumbnail_hashed.discard(filepath)
             except Exception as e:
+                current_dimensions.pop(filepath, None)
                 print(f"Error hashing {filepath}: {e}. Skipping.")
 
         # Remove hashes for files that no longer exist in the input directory
         # (This handles cases where images were deleted)
-        keys_to_remove = [p for p in current_hashes if p not in all_image_paths]
+        existing_paths = set(all_image_paths)
+        keys_to_remove = [p for p in current_hashes if p not in existing_paths]
         for key in keys_to_remove:
             del current_hashes[key]
+            current_dimensions.pop(key, None)
+            thumbnail_hashed.discard(key)
             print(f"Removed hash for deleted file: {key}")
 
-        self._save_hashes_to_cache(current_hashes) # Save updated cache
+        if similarity_index is not None:
+            self._update_similarity_index(similarity_index, new_features, current_hashes, existing_paths)
 
-        # Now, compare hashes to find duplicates
-        found_duplicates: List[Tuple[str, str]] = []
+        # Entries cached before dimensions were recorded only need a header read
+        if self.enable_aspect_ratio_blocking:
+            for filepath in current_hashes:
+                if filepath not in current_dimensions:
+                    dimensions = self._read_image_dimensions(filepath)
+                    if dimensions:
+                        current_dimensions[filepath] = dimensions
 
-        # Convert the hash-to-filepaths map into a list of (filepath, hash) for comparison
-        all_file_hashes = [(fp, h) for fp, h in current_hashes.items()]
+        if thumbnail_hashed:
+            print(f"{len(thumbnail_hashed)} images are hashed from their embedded EXIF thumbnail.")
+        self._save_hashes_to_cache(current_hashes, current_dimensions, thumbnail_hashed) # Save updated cache
+        return current_hashes, current_dimensions, thumbnail_hashed
 
-        compared_pairs = set() # To avoid redundant comparisons (A,B is same as B,A)
+    def _find_duplicates_in_hashes(self, current_hashes: Dict[str, imagehash.ImageHash], current_dimensions: Dict[str, Tuple[int, int]],
+                                   thumbnail_hashed: Set[str], hasher, save_cache: bool = True) -> List[Tuple[str, str]]:
+        """
+        Compares the given hashes, applies remembered decisions and writes the report.
+        save_cache=False keeps thumbnail hashes upgraded during verification out of the local cache
+        (used when the hashes come from shard files rather than this machine's scan).
+        """
+        # Low-information images are listed in the report whether or not pairs come from the store
+        self.low_information_images = []
+        if self.enable_low_entropy_guard:
+            self.low_information_images = [fp for fp, h in current_hashes.items() if self._is_low_entropy_hash(h)]
+            if self.low_information_images:
+                print(f"Low entropy guard: {len(self.low_information_images)} low-information images excluded from the Hamming search.")
 
-        total_comparisons = len(all_file_hashes) * (len(all_file_hashes) - 1) // 2
-        print(f"Starting {len(all_file_hashes)} image hash comparisons ({total_comparisons} pairs expected).")
+        # Now, compare hashes to find duplicates, or read them from the pair distance store
+        scored_pairs = None
+        if self.enable_pair_distance_store:
+            scored_pairs = self._load_pairs_from_store(self._get_pair_store_signature(current_hashes, current_dimensions))
+        if scored_pairs is None:
+            max_distance = max(self.hash_threshold, self.pair_store_max_distance) if self.enable_pair_distance_store else self.hash_threshold
+            scored_pairs = self._score_pairs(current_hashes, current_dimensions, max_distance)
+            pair_decisions = self._lookup_pair_decisions(scored_pairs)
 
-        # Iterate through all unique pairs of hashes
-        for i in range(len(all_file_hashes)):
-            for j in range(i + 1, len(all_file_hashes)):
-                filepath1, hash1 = all_file_hashes[i]
-                filepath2, hash2 = all_file_hashes[j]
+            # Thumbnail hashes are only a first pass: confirm their matches on the full images
+            # (pairs with a remembered decision need no verification)
+            if thumbnail_hashed and scored_pairs:
+                thumbnail_count = len(thumbnail_hashed)
+                scored_pairs = self._verify_thumbnail_candidates(scored_pairs, current_hashes, thumbnail_hashed, hasher,
+                                                                 max_distance, set(pair_decisions))
+                if len(thumbnail_hashed) != thumbnail_count and save_cache:
+                    self._save_hashes_to_cache(current_hashes, current_dimensions, thumbnail_hashed)
 
-                # If hashes are identical, they are duplicates
-                if hash1 == hash2:
-                    if (filepath1, filepath2) not in compared_pairs and \
-                       (filepath2, filepath1) not in compared_pairs:
-                        found_duplicates.append((filepath1, filepath2))
-                        compared_pairs.add((filepath1, filepath2))
-                else:
-                    # If hashes are different, check Hamming distance for near-duplicates
-                    if hash1 - hash2 <= self.hash_threshold:
-                        if (filepath1, filepath2) not in compared_pairs and \
-                           (filepath2, filepath1) not in compared_pairs:
-                            found_duplicates.append((filepath1, filepath2))
-                            compared_pairs.add((filepath1, filepath2))
+            if self.enable_pair_distance_store:
+                # Signed after verification, since verified thumbnail hashes are upgraded in the cache
+                signature = self._get_pair_store_signature(current_hashes, current_dimensions)
+                PairDistanceStore(signature, max_distance, scored_pairs).save(self.pair_distance_store_file)
+        else:
+            pair_decisions = self._lookup_pair_decisions(scored_pairs)
 
-        # Write findings to a report file
-        self._write_duplicate_report(found_duplicates)
+        # Pairs remembered as duplicates are reported even when their distance is beyond what was scored
+        remembered_pairs = self._find_remembered_duplicate_pairs(current_hashes, scored_pairs)
+        pair_decisions.update({(filepath1, filepath2): DECISION_DUPLICATE for filepath1, filepath2, _ in remembered_pairs})
+        found_duplicates = self._apply_pair_decisions(scored_pairs + remembered_pairs, pair_decisions)
+
+        # Write findings to a report file, and the plan for acting on them
+        self._write_duplicate_report(found_duplicates, self.low_information_images)
+        self._write_action_plan(found_duplicates, current_dimensions)
 
         print(f"Duplicate detection complete. Found {len(found_duplicates)} duplicate/near-duplicate pairs.")
         return found_duplicates
 
-    def _write_duplicate_report(self, duplicates: List[Tuple[str, str]]):
-        """Writes the detected duplicate pairs to a report file."""
+    def write_hash_shard(self) -> int:
+        """
+        Shard mode, per machine: hashes this machine's input directory (through the normal hash
+        cache) and writes the hashes, by absolute path and tagged with the host name, to
+        '<shard_name>.shard' in the shard directory.
+        Returns the number of images in the shard.
+        """
+        print(f"\nWriting hash shard '{self.shard_name}' for: {os.path.abspath(self.input_dir)}")
+        current_hashes, current_dimensions, thumbnail_hashed = self._refresh_hash_cache(self._get_hasher())
+        records: Dict[str, ShardRecord] = {}
+        for filepath, img_hash in current_hashes.items():
+            try:
+                stat = os.stat(filepath)
+            except OSError as e:
+                print(f"Error reading {filepath}: {e}. Leaving it out of the shard.")
+                continue
+            width, height = current_dimensions.get(filepath, (0, 0))
+            records[os.path.abspath(filepath)] = ShardRecord(stat.st_size, stat.st_mtime, self._hash_to_string(img_hash),
+                                            width, height, filepath in thumbnail_hashed)
+        HashShard(self.shard_name, socket.gethostname(), self.hash_type, self.hash_size, records).save(os.path.join(self.shard_directory, self.shard_name + SHARD_EXTENSION))
+        return len(records)
+
+    def merge_hash_shards(self) -> List[Tuple[str, str]]:
+        """
+        Shard mode, on one machine: combines every shard in the shard directory and runs one global
+        comparison over the result. Files from other hosts are reported as '<host>:<path>'; a file in
+        several shards from the same host keeps its newer record. Shards written with another hash
+        type or hash size are skipped. Returns the duplicate pairs.
+        """
+        print(f"\nMerging hash shards from: {os.path.abspath(self.shard_directory)}")
+        hasher = self._get_hasher() # Settles the effective hash size (whash needs a power of two)
+        shards = []
+        for shard_path in list_shard_files(self.shard_directory):
+            shard = HashShard.load(shard_path)
+            if shard is None:
+                continue
+            if shard.hash_type != self.hash_type:
+                print(f"Warning: Shard '{shard.name}' was hashed with '{shard.hash_type}', not '{self.hash_type}'. Skipping it.")
+                continue
+            if shard.hash_size != self.hash_size:
+                print(f"Warning: Shard '{shard.name}' was hashed with hash size {shard.hash_size}, not {self.hash_size}. Skipping it.")
+                continue
+            print(f"  Shard '{shard.name}' (host {shard.host}): {len(shard.records)} images.")
+            shards.append(shard)
+        merged = merge_shards(shards)
+        print(f"Merged {len(shards)} shards into {len(merged)} images.")
+
+        current_hashes: Dict[str, imagehash.ImageHash] = {}
+        current_dimensions: Dict[str, Tuple[int, int]] = {}
+        thumbnail_hashed: Set[str] = set()
+        local_host = socket.gethostname()
+        for (host, path), record in merged.items():
+            # Local files keep their plain path, so reports and actions can use them
+            filepath = path if host == local_host else f"{host}:{path}"
+            try:
+                current_hashes[filepath] = self._string_to_hash(record.hash_str)
+            except ValueError as e:
+                print(f"Warning: Invalid hash for {filepath} in shards: {e}. Skipping.")
+                continue
+            if record.width and record.height:
+                current_dimensions[filepath] = (record.width, record.height)
+            if record.from_thumbnail:
+                thumbnail_hashed.add(filepath)
+        return self._find_duplicates_in_hashes(current_hashes, current_dimensions, thumbnail_hashed, hasher, save_cache=False)
+
+    def _get_dct_features(self, img: Image.Image) -> np.ndarray:
+        """
+        Returns the low-frequency DCT coefficients phash binarises, kept as an L2-normalised
+        float16 vector so similarity can be ranked instead of only thresholded.
+        """
+        import scipy.fftpack # Same DCT imagehash.phash uses; imported lazily like there
+        image_size = DCT_FEATURE_SIZE * 4
+        pixels = np.asarray(img.convert('L').resize((image_size, image_size), Image.LANCZOS), dtype=np.float64)
+        dct = scipy.fftpack.dct(scipy.fftpack.dct(pixels, axis=0), axis=1)
+        features = dct[:DCT_FEATURE_SIZE, :DCT_FEATURE_SIZE].flatten()[1:] # Drop the DC term (overall brightness)
+        norm = np.linalg.norm(features)
+        return (features / norm if norm else features).astype(np.float16)
+
+    def _load_similarity_index(self) -> SimilarityIndex:
+        """Loads the persisted similarity index, or starts an empty one."""
+        index = None if self.rebuild_hash_cache else SimilarityIndex.load(self.similarity_index_file, DCT_FEATURE_DIMENSIONS)
+        return index if index is not None else SimilarityIndex(DCT_FEATURE_DIMENSIONS)
+
+    def _update_similarity_index(self, similarity_index: SimilarityIndex, new_features: List[Tuple[str, np.ndarray]],
+                                 hashes: Dict[str, imagehash.ImageHash], existing_paths: Set[str]) -> None:
+        """
+        Brings the similarity index in line with the hash cache: adds the vectors computed while
+        hashing, computes vectors for cached images the index does not know yet, and drops deleted files.
+        Only changed images are added, so the index grows incrementally.
+        """
+        computed_paths = {filepath for filepath, _ in new_features}
+        for filepath in hashes:
+            if filepath not in similarity_index and filepath not in computed_paths:
+                try:
+                    with Image.open(filepath) as img:
+                        new_features.append((filepath, self._get_dct_features(img)))
+                except Exception as e:
+                    print(f"Error computing features for {filepath}: {e}. Skipping.")
+        removed_paths = [filepath for filepath in similarity_index.paths if filepath is not None and filepath not in existing_paths]
+        similarity_index.remove(removed_paths)
+        similarity_index.add(new_features)
+        if new_features or removed_paths or not os.path.exists(self.similarity_index_file):
+            print(f"Similarity index: {len(new_features)} images added or updated, {len(removed_paths)} removed.")
+            similarity_index.save(self.similarity_index_file)
+
+    def find_similar_images(self, filepath: str, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Returns the indexed images most similar to filepath as (path, similarity) pairs, most
+        similar first. Similarity is the cosine of the DCT feature vectors (1.0 = identical).
+        The query image does not need to be indexed. Requires a detection run with the index enabled.
+        """
+        if top_k is None:
+            top_k = self.similarity_top_k
+        similarity_index = SimilarityIndex.load(self.similarity_index_file, DCT_FEATURE_DIMENSIONS)
+        if similarity_index is None:
+            print("No similarity index found. Enable it and run duplicate detection first.")
+            return []
+        vector = similarity_index.get_vector(filepath)
+        if vector is None:
+            with Image.open(filepath) as img:
+                vector = self._get_dct_features(img)
+        similar_images = similarity_index.query(vector, top_k, exclude=filepath)
+        print(f"Found {len(similar_images)} similar images for {filepath}.")
+        return similar_images
+
+    def _get_hash_variants(self, img_hash: imagehash.ImageHash) -> List[imagehash.ImageHash]:
+        """
+        Derives the hashes of transformed copies of an image from its stored hash bits, without decoding it.
+        aHash cells map directly to image regions, so all flips and 90-degree rotations are bit permutations.
+        dHash bits compare horizontal neighbours: a vertical flip reverses the rows, while a horizontal flip
+        reverses each row and inverts it (the left/right comparison is swapped); 180 degrees is both.
+        The first variant is always the original hash.
+        """
+        bits = img_hash.hash
+        if self.hash_type == 'ahash':
+            grids = [np.rot90(grid, k) for grid in (bits, np.fliplr(bits)) for k in range(4)]
+        elif self.hash_type == 'dhash':
+            grids = [bits, ~np.fliplr(bits), np.flipud(bits), ~np.flipud(np.fliplr(bits))]
+        else:
+            grids = [bits]
+        return [imagehash.ImageHash(grid) for grid in grids]
+
+    def _hash_distance(self, hash1: imagehash.ImageHash, hash2: imagehash.ImageHash) -> int:
+        """Hamming distance between two hashes, taking the closest transformed variant when flip matching is on."""
+        if isinstance(hash1, imagehash.ImageMultiHash):
+            distance = self._segment_match_distance(self._segment_ints(hash1), self._segment_ints(hash2))
+            return distance if distance is not None else hash1.segment_hashes[0].hash.size
+        if self.enable_flip_matching and self.hash_type in ('ahash', 'dhash'):
+            return min(variant - hash2 for variant in self._get_hash_variants(hash1))
+        return hash1 - hash2
+
+    def _score_pairs(self, hashes: Dict[str, imagehash.ImageHash], dimensions: Dict[str, Tuple[int, int]],
+                     max_distance: int) -> List[Tuple[str, str, int]]:
+        """
+        Runs the comparison stage and returns (filepath1, filepath2, distance) for every pair
+        within max_distance. Low-information images are matched by exact pixel content (distance 0).
+        """
+        scored_pairs: List[Tuple[str, str, int]] = []
+        low_information_paths = set(self.low_information_images)
+        if low_information_paths:
+            scored_pairs.extend((fp1, fp2, 0) for fp1, fp2 in self._find_exact_pixel_duplicates(self.low_information_images))
+        all_file_hashes = [(fp, h) for fp, h in hashes.items() if fp not in low_information_paths]
+
+        self._hash_variants = {}
+        if self.enable_flip_matching:
+            if self.hash_type in ('ahash', 'dhash'):
+                self._hash_variants = {fp: self._get_hash_variants(h) for fp, h in all_file_hashes}
+                print(f"Flip matching: comparing mirrored/rotated variants of each '{self.hash_type}' hash.")
+            else:
+                print(f"Warning: Flip matching is only supported for 'ahash' and 'dhash', not '{self.hash_type}'. Skipping.")
+
+        comparison_jobs = self._build_comparison_jobs(all_file_hashes)
+        expected_pairs = sum(len(a) * (len(a) - 1) // 2 if b is None else len(a) * len(b) for a, b in comparison_jobs)
+        print(f"Comparison scope '{self.comparison_scope}': {len(comparison_jobs)} comparison groups, {expected_pairs} pairs expected.")
+        total_compared = 0
+        for file_hashes, other_hashes in comparison_jobs:
+            job_pairs, compared_count = self._compare_file_hashes(file_hashes, dimensions, other_hashes, max_distance)
+            scored_pairs.extend(job_pairs)
+            total_compared += compared_count
+        print(f"Compared {total_compared} image pairs.")
+        return scored_pairs
+
+    def _get_pair_store_signature(self, hashes: Dict[str, imagehash.ImageHash], dimensions: Dict[str, Tuple[int, int]]) -> str:
+        """
+        Fingerprints everything the scored pairs depend on: the hashes and dimensions of every
+        image plus the comparison settings. A stored pair list is only reused if this matches.
+        """
+        signature = hashlib.sha1()
+        signature.update(f"{self.hash_type}|{self.hash_size}|{self.comparison_scope}|{os.path.abspath(self.new_images_dir) if self.new_images_dir else ''}|"
+                         f"{self.enable_aspect_ratio_blocking}|{self.enable_low_entropy_guard}|{self.low_entropy_threshold}|"
+                         f"{self.enable_flip_matching}|{self.crop_min_matching_segments}\n".encode('utf-8'))
+        for filepath in sorted(hashes):
+            width, height = dimensions.get(filepath, (0, 0))
+            signature.update(f"{filepath}\t{hashes[filepath]}\t{width}x{height}\n".encode('utf-8'))
+        return signature.hexdigest()
+
+    def _load_pairs_from_store(self, signature: str) -> Optional[List[Tuple[str, str, int]]]:
+        """Returns the stored pairs within hash_threshold, or None if the store cannot answer this run."""
+        store = PairDistanceStore.load(self.pair_distance_store_file)
+        if store is None:
+            return None
+        if store.signature != signature:
+            print("Pair distance store is out of date (images or settings changed). Comparing hashes.")
+            return None
+        if self.hash_threshold > store.max_distance:
+            print(f"Hash threshold {self.hash_threshold} exceeds the stored maximum distance {store.max_distance}. Comparing hashes.")
+            return None
+        print(f"Answered threshold {self.hash_threshold} from the pair distance store without comparing hashes.")
+        return store.pairs_within(self.hash_threshold)
+
+    def _get_fingerprint(self, filepath: str) -> Optional[str]:
+        """Returns the content fingerprint of a file, computed at most once per run."""
+        if filepath not in self._fingerprints:
+            self._fingerprints[filepath] = get_file_fingerprint(filepath)
+        return self._fingerprints[filepath]
+
+    def _lookup_pair_decisions(self, scored_pairs: List[Tuple[str, str, int]]) -> Dict[Tuple[str, str], str]:
+        """
+        Looks up remembered decisions for the given pairs. Only files that appear in a pair
+        are fingerprinted, and only when any decisions have been recorded.
+        """
+        pair_decisions: Dict[Tuple[str, str], str] = {}
+        if not self.pair_decision_store.decisions:
+            return pair_decisions
+        for filepath1, filepath2, _ in scored_pairs:
+            fingerprint1 = self._get_fingerprint(filepath1)
+            fingerprint2 = self._get_fingerprint(filepath2)
+            if fingerprint1 and fingerprint2:
+                decision = self.pair_decision_store.get(fingerprint1, fingerprint2)
+                if decision:
+                    pair_decisions[(filepath1, filepath2)] = decision
+        return pair_decisions
+
+    def _find_remembered_duplicate_pairs(self, hashes: Dict[str, imagehash.ImageHash],
+                                         scored_pairs: List[Tuple[str, str, int]]) -> List[Tuple[str, str, int]]:
+        """
+        Returns (filepath1, filepath2, distance) for pairs remembered as duplicates that the comparison
+        did not score (their distance is beyond it). They are found by the paths recorded with the
+        decision and only used while both files still have the remembered content.
+        """
+        scored = {frozenset((filepath1, filepath2)) for filepath1, filepath2, _ in scored_pairs}
+        remembered_pairs: List[Tuple[str, str, int]] = []
+        for (fingerprint1, fingerprint2), (decision, path1, path2) in self.pair_decision_store.decisions.items():
+            if decision != DECISION_DUPLICATE or path1 not in hashes or path2 not in hashes or \
+               path1 == path2 or frozenset((path1, path2)) in scored:
+                continue
+            current_fingerprints = (self._get_fingerprint(path1), self._get_fingerprint(path2))
+            if None in current_fingerprints or sorted(current_fingerprints) != sorted((fingerprint1, fingerprint2)):
+                continue # Changed since the decision
+            remembered_pairs.append((path1, path2, self._hash_distance(hashes[path1], hashes[path2])))
+        if remembered_pairs:
+            print(f"Added {len(remembered_pairs)} pairs remembered as duplicates that are beyond the hash threshold.")
+        return remembered_pairs
+
+    def _apply_pair_decisions(self, scored_pairs: List[Tuple[str, str, int]],
+                              pair_decisions: Dict[Tuple[str, str], str]) -> List[Tuple[str, str]]:
+        """
+        Returns the pairs to report: pairs within the hash threshold, minus pairs remembered as
+        not duplicates, plus pairs remembered as duplicates even if their distance is above it.
+        """
+        found_duplicates: List[Tuple[str, str]] = []
+        suppressed_count = 0
+        for filepath1, filepath2, distance in scored_pairs:
+            decision = pair_decisions.get((filepath1, filepath2))
+            if decision == DECISION_NOT_DUPLICATE:
+                suppressed_count += 1
+            elif decision == DECISION_DUPLICATE or distance <= self.hash_threshold:
+                found_duplicates.append((filepath1, filepath2))
+        if pair_decisions:
+            print(f"Applied {len(pair_decisions)} remembered pair decisions ({suppressed_count} known non-duplicate pairs suppressed).")
+        return found_duplicates
+
+    def remember_pair_decisions(self, pairs: List[Tuple[str, str]], decision: str) -> int:
+        """
+        Records a review decision ('duplicate' or 'not_duplicate') for each pair, keyed by the
+        files' content fingerprints, and saves it. Returns the number of pairs recorded.
+        """
+        recorded_count = 0
+        for filepath1, filepath2 in pairs:
+            fingerprint1 = self._get_fingerprint(filepath1)
+            fingerprint2 = self._get_fingerprint(filepath2)
+            if fingerprint1 and fingerprint2:
+                self.pair_decision_store.set(fingerprint1, fingerprint2, decision, filepath1, filepath2)
+                recorded_count += 1
+        self.pair_decision_store.save()
+        print(f"Remembered {recorded_count} pairs as '{decision}'.")
+        return recorded_count
+
+    def get_threshold_pair_counts(self) -> Optional[Dict[int, int]]:
+        """
+        Returns how many pairs each threshold up to the stored maximum distance yields,
+        as recorded by the last detection run, or None if no pair distance store exists.
+        """
+        store = PairDistanceStore.load(self.pair_distance_store_file)
+        return store.threshold_counts() if store else None
+
+    def _is_low_entropy_hash(self, img_hash: imagehash.ImageHash) -> bool:
+        """
+        Returns True if a hash carries too little information to compare meaningfully:
+        either almost all bits share the same value (bit population), or the bits barely
+        change between neighbouring cells of the hash grid (spatial variance).
+        """
+        if isinstance(img_hash, imagehash.ImageMultiHash):
+            return False # Segmentation already discards featureless regions
+        bits = np.atleast_2d(img_hash.hash)
+        set_bits = int(np.count_nonzero(bits))
+        minority_bits = min(set_bits, bits.size - set_bits)
+        transitions = int(np.count_nonzero(bits[:, 1:] != bits[:, :-1]) + np.count_nonzero(bits[1:, :] != bits[:-1, :]))
+        return minority_bits <= self.low_entropy_threshold or transitions <= self.low_entropy_threshold
+
+    def _get_pixel_digest(self, filepath: str) -> Optional[str]:
+        """Returns a digest of the decoded pixel data (and size), so identical images match regardless of file format."""
+        try:
+            with Image.open(filepath) as img:
+                rgb_img = img.convert('RGB')
+                digest = hashlib.sha1(f"{rgb_img.width}x{rgb_img.height}".encode())
+                digest.update(rgb_img.tobytes())
+                return digest.hexdigest()
+        except Exception as e:
+            print(f"Warning: Could not read pixels of {filepath}: {e}. Skipping exact check.")
+            return None
+
+    def _find_exact_pixel_duplicates(self, filepaths: List[str]) -> List[Tuple[str, str]]:
+        """
+        Pairs up low-information images whose pixels are identical, honouring comparison_scope.
+        Each image is paired with the first matching image only, so a large group of identical
+        frames yields one pair per copy rather than every combination.
+        """
+        digest_entries = []
+        for filepath in filepaths:
+            digest = self._get_pixel_digest(filepath)
+            if digest:
+                digest_entries.append((filepath, digest))
+
+        exact_duplicates: List[Tuple[str, str]] = []
+        for entries, other_entries in self._build_comparison_jobs(digest_entries):
+            first_by_digest: Dict[str, str] = {}
+            for filepath, digest in entries:
+                if other_entries is None and digest in first_by_digest:
+                    exact_duplicates.append((first_by_digest[digest], filepath))
+                else:
+                    first_by_digest.setdefault(digest, filepath)
+            for filepath, digest in other_entries or []:
+                if digest in first_by_digest:
+                    exact_duplicates.append((first_by_digest[digest], filepath))
+        print(f"Found {len(exact_duplicates)} pixel-identical pairs among low-information images.")
+        return exact_duplicates
+
+    def _get_scan_directories(self) -> List[str]:
+        """Returns the directories to walk: the input directory, plus the new images directory if it lies outside it."""
+        directories = [self.input_dir]
+        if self.comparison_scope == 'new_vs_existing' and self.new_images_dir and \
+           not self._is_within_directory(self.new_images_dir, self.input_dir):
+            directories.append(self.new_images_dir)
+        return directories
+
+    @staticmethod
+    def _is_within_directory(path: str, directory: str) -> bool:
+        """Returns True if path is the directory itself or lies somewhere beneath it."""
+        abs_path = os.path.abspath(path)
+        abs_directory = os.path.abspath(directory)
+        return abs_path == abs_directory or abs_path.startswith(abs_directory.rstrip(os.sep) + os.sep)
+
+    def _get_action_target_path(self, filepath: str) -> str:
+        """
+        Returns where a moved or copied duplicate goes in the action directory, keeping its path below
+        the scan directory that contains it. With more than one scan directory each gets its own
+        subfolder named after it, so an outside new images directory never resolves to '../'.
+        Files outside every scan directory keep their absolute path below the action directory.
+        """
+        scan_dirs = self._get_scan_directories()
+        relative_path = None
+        for index, scan_dir in enumerate(scan_dirs):
+            if self._is_within_directory(filepath, scan_dir):
+                relative_path = os.path.relpath(filepath, scan_dir)
+                if len(scan_dirs) > 1:
+                    root_name = os.path.basename(os.path.abspath(scan_dir)) or f"root{index}"
+                    if any(os.path.basename(os.path.abspath(other)) == root_name for other in scan_dirs[:index]):
+                        root_name = f"{root_name}_{index}" # Two scan directories with the same name
+                    relative_path = os.path.join(root_name, relative_path)
+                break
+        if relative_path is None:
+            relative_path = os.path.splitdrive(os.path.abspath(filepath))[1].lstrip(os.sep)
+        target_path = os.path.join(self.duplicate_action_directory, relative_path)
+        if not self._is_within_directory(target_path, self.duplicate_action_directory) or \
+           os.path.abspath(target_path) == os.path.abspath(self.duplicate_action_directory):
+            raise ValueError(f"target '{target_path}' is not inside the action directory")
+        return target_path
+
+    def _get_root_folder(self, filepath: str) -> str:
+        """Returns the top-level folder of filepath below the input directory ('.' for files directly in it)."""
+        relative_parts = os.path.relpath(filepath, self.input_dir).split(os.sep)
+        return relative_parts[0] if len(relative_parts) > 1 else os.curdir
+
+    def _build_comparison_jobs(self, file_hashes: List[Tuple[str, imagehash.ImageHash]]) \
+            -> List[Tuple[List[Tuple[str, imagehash.ImageHash]], Optional[List[Tuple[str, imagehash.ImageHash]]]]]:
+        """
+        Partitions the hashes according to comparison_scope. Each job is (entries, other_entries):
+        when other_entries is None the entries are compared among themselves, otherwise only
+        pairs with one entry from each list are compared.
+          global          - every image against every other image.
+          per_directory   - only images in the same folder.
+          cross_root      - only images in different top-level folders of the input directory.
+          new_vs_existing - only images in the new images directory against all other images.
+        """
+        scope = self.comparison_scope
+        if scope == 'per_directory':
+            groups: Dict[str, List[Tuple[str, imagehash.ImageHash]]] = {}
+            for entry in file_hashes:
+                groups.setdefault(os.path.dirname(entry[0]), []).append(entry)
+            jobs = [(entries, None) for entries in groups.values() if len(entries) > 1]
+        elif scope == 'cross_root':
+            groups = {}
+            for entry in file_hashes:
+                groups.setdefault(self._get_root_folder(entry[0]), []).append(entry)
+            group_list = list(groups.values())
+            jobs = [(group_list[i], group_list[j])
+                    for i in range(len(group_list)) for j in range(i + 1, len(group_list))]
+        elif scope == 'new_vs_existing':
+            if not self.new_images_dir:
+                print("Warning: 'new_vs_existing' scope selected but new_images_directory is not set. Using 'global'.")
+                return [(file_hashes, None)]
+            new_entries = [e for e in file_hashes if self._is_within_directory(e[0], self.new_images_dir)]
+            existing_entries = [e for e in file_hashes if not self._is_within_directory(e[0], self.new_images_dir)]
+            # Existing images come first in each pair so actions target the new copy
+            jobs = [(existing_entries, new_entries)]
+        else:
+            if scope != 'global':
+                print(f"Warning: Unknown comparison scope '{scope}'. Using 'global'.")
+            jobs = [(file_hashes, None)]
+        return jobs
+
+    def _compare_file_hashes(self, file_hashes: List[Tuple[str, imagehash.ImageHash]],
+                             dimensions: Dict[str, Tuple[int, int]],
+                             other_hashes: Optional[List[Tuple[str, imagehash.ImageHash]]] = None,
+                             max_distance: Optional[int] = None) -> Tuple[List[Tuple[str, str, int]], int]:
+        """
+        Compares candidate pairs of (filepath, hash) entries and returns (filepath1, filepath2, distance)
+        for pairs whose Hamming distance is within max_distance (default: the hash threshold),
+        along with the number of comparisons made.
+        If other_hashes is given, each pair holds one entry from file_hashes (first) and one from other_hashes.
+        With aspect ratio blocking enabled, only images whose aspect ratios are within
+        ASPECT_RATIO_TOLERANCE of each other are considered candidates.
+        """
+        if max_distance is None:
+            max_distance = self.hash_threshold
+        if self.hash_type == 'crop_resistant':
+            # Crops change the aspect ratio, so aspect ratio blocking does not apply here
+            return self._compare_crop_resistant(file_hashes, other_hashes, max_distance)
+        if self.enable_aspect_ratio_blocking:
+            return self._compare_aspect_ratio_blocked(file_hashes, dimensions, other_hashes, max_distance)
+
+        found_duplicates: List[Tuple[str, str, int]] = []
+        compared_count = 0
+        for i in range(len(file_hashes)):
+            filepath1, hash1 = file_hashes[i]
+            candidates = file_hashes[i + 1:] if other_hashes is None else other_hashes
+            variants1 = self._hash_variants.get(filepath1)
+            for filepath2, hash2 in candidates:
+                compared_count += 1
+                # Identical hashes have distance 0; near-duplicates fall within the threshold
+                distance = hash1 - hash2 if variants1 is None else min(variant - hash2 for variant in variants1)
+                if distance <= max_distance:
+                    found_duplicates.append((filepath1, filepath2, distance))
+        return found_duplicates, compared_count
+
+    @staticmethod
+    def _segment_ints(multi_hash: imagehash.ImageMultiHash) -> List[int]:
+        """Returns the segment hashes of a multi-hash as integers, for fast XOR/popcount distances."""
+        return [int(str(segment), 16) for segment in multi_hash.segment_hashes]
+
+    def _segment_match_distance(self, segments1: List[int], segments2: List[int]) -> Optional[int]:
+        """
+        Pair distance for crop-resistant hashes: each segment is matched to its closest segment in the
+        other image, and the distance is the K-th smallest of those (K = crop_min_matching_segments).
+        So 'distance <= hash_threshold' means at least K segments match within the threshold.
+        Returns None if either image has fewer than K segments.
+        """
+        k = self.crop_min_matching_segments
+        if len(segments1) < k or len(segments2) < k:
+            return None
+        best1 = sorted(min((a ^ b).bit_count() for b in segments2) for a in segments1)
+        best2 = sorted(min((a ^ b).bit_count() for a in segments1) for b in segments2)
+        return min(best1[k - 1], best2[k - 1])
+
+    @staticmethod
+    def _segment_band_layout(segment_bits: int, max_distance: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Splits segment hashes of segment_bits bits into max_distance + 1 bands, as (shift, width) pairs.
+        By the pigeonhole principle two segments within max_distance bits of each other then agree on
+        at least one whole band. Returns None if the bands would be narrower than CROP_MIN_BAND_BITS.
+        """
+        band_count = max_distance + 1
+        if segment_bits // band_count < CROP_MIN_BAND_BITS:
+            return None
+        layout = []
+        shift = 0
+        for band in range(band_count):
+            width = segment_bits // band_count + (1 if band < segment_bits % band_count else 0)
+            layout.append((shift, width))
+            shift += width
+        return layout
+
+    @staticmethod
+    def _segment_bands(segment: int, layout: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Returns the (band, value) inverted index keys of a segment hash for a _segment_band_layout."""
+        return [(band, (segment >> shift) & ((1 << width) - 1)) for band, (shift, width) in enumerate(layout)]
+
+    def _compare_crop_resistant(self, file_hashes: List[Tuple[str, imagehash.ImageMultiHash]],
+                                other_hashes: Optional[List[Tuple[str, imagehash.ImageMultiHash]]],
+                                max_distance: int) -> Tuple[List[Tuple[str, str, int]], int]:
+        """
+        Compares crop-resistant multi-hashes through an inverted index from segment hash bands to images.
+        Only images sharing at least crop_min_matching_segments indexed segments become candidates,
+        and the full multi-hash comparison runs on those candidates only. The bands are sized from the
+        segment length and max_distance so no pair within max_distance is missed; when that would
+        make them too narrow to prune anything, every pair is compared instead.
+        """
+        left = [(filepath, self._segment_ints(img_hash)) for filepath, img_hash in file_hashes]
+        right = left if other_hashes is None else [(filepath, self._segment_ints(img_hash)) for filepath, img_hash in other_hashes]
+
+        layout = self._segment_band_layout(self.hash_size * self.hash_size, max_distance)
+        if layout is None:
+            print(f"Crop-resistant comparison: distance {max_distance} is too large to index {self.hash_size * self.hash_size}-bit "
+                  f"segments in bands of at least {CROP_MIN_BAND_BITS} bits. Comparing all pairs.")
+            return self._compare_crop_resistant_all_pairs(left, right if other_hashes is not None else None, max_distance)
+
+        segment_index: Dict[Tuple[int, int], List[int]] = {}
+        for i, (_, segments) in enumerate(left):
+            for segment in set(segments):
+                for band_key in self._segment_bands(segment, layout):
+                    segment_index.setdefault(band_key, []).append(i)
+
+        found_duplicates: List[Tuple[str, str, int]] = []
+        compared_count = 0
+        for j, (filepath2, segments2) in enumerate(right):
+            # Count, per candidate image, how many of this image's segments hit it in the index
+            shared_segments: Counter = Counter()
+            for segment in set(segments2):
+                hit_images = set()
+                for band_key in self._segment_bands(segment, layout):
+                    hit_images.update(segment_index.get(band_key, ()))
+                shared_segments.update(hit_images)
+            for i, shared_count in shared_segments.items():
+                if shared_count < self.crop_min_matching_segments:
+                    continue
+                if other_hashes is None and i >= j:
+                    continue # Within one list, visit each unordered pair once
+                compared_count += 1
+                filepath1, segments1 = left[i]
+                distance = self._segment_match_distance(segments1, segments2)
+                if distance is not None and distance <= max_distance:
+                    found_duplicates.append((filepath1, filepath2, distance))
+        return found_duplicates, compared_count
+
+    def _compare_crop_resistant_all_pairs(self, left: List[Tuple[str, List[int]]], right: Optional[List[Tuple[str, List[int]]]],
+                                          max_distance: int) -> Tuple[List[Tuple[str, str, int]], int]:
+        """Compares every pair of crop-resistant segment lists (within left, or left against right)."""
+        found_duplicates: List[Tuple[str, str, int]] = []
+        compared_count = 0
+        for i, (filepath1, segments1) in enumerate(left):
+            for filepath2, segments2 in (left[i + 1:] if right is None else right):
+                compared_count += 1
+                distance = self._segment_match_distance(segments1, segments2)
+                if distance is not None and distance <= max_distance:
+                    found_duplicates.append((filepath1, filepath2, distance))
+        return found_duplicates, compared_count
+
+    def _compare_aspect_ratio_blocked(self, file_hashes: List[Tuple[str, imagehash.ImageHash]],
+                                      dimensions: Dict[str, Tuple[int, int]],
+                                      other_hashes: Optional[List[Tuple[str, imagehash.ImageHash]]] = None,
+                                      max_distance: Optional[int] = None) -> Tuple[List[Tuple[str, str, int]], int]:
+        """
+        Sorted sweep over aspect ratios: entries are ordered by width/height and each one is
+        only compared with the following entries until the ratio gap exceeds ASPECT_RATIO_TOLERANCE.
+        Entries with unknown dimensions are compared against everything, so nothing is missed.
+        Flip matching works here too, but 90-degree rotations change the aspect ratio and are
+        only found between (near-)square images.
+        Returns the found (filepath1, filepath2, distance) pairs and the number of comparisons made.
+        """
+        if max_distance is None:
+            max_distance = self.hash_threshold
+        bipartite = other_hashes is not None
+        sides = [(0, file_hashes)] + ([(1, other_hashes)] if bipartite else [])
+        keyed_entries = []
+        unknown_entries = []
+        for side, entries in sides:
+            for filepath, img_hash in entries:
+                width, height = dimensions.get(filepath, (0, 0))
+                if width and height:
+                    keyed_entries.append((width / height, side, filepath, img_hash))
+                else:
+                    unknown_entries.append((side, filepath, img_hash))
+        keyed_entries.sort(key=lambda entry: entry[0])
+
+        found_duplicates: List[Tuple[str, str, int]] = []
+        compared_count = 0
+
+        def compare(side1, filepath1, hash1, side2, filepath2, hash2):
+            nonlocal compared_count
+            if bipartite and side1 == side2:
+                return
+            compared_count += 1
+            variants1 = self._hash_variants.get(filepath1)
+            distance = hash1 - hash2 if variants1 is None else min(variant - hash2 for variant in variants1)
+            if distance <= max_distance:
+                # Keep entries from file_hashes first, matching the unblocked comparison
+                found_duplicates.append((filepath1, filepath2, distance) if side1 <= side2 else (filepath2, filepath1, distance))
+
+        for i in range(len(keyed_entries)):
+            ratio1, side1, filepath1, hash1 = keyed_entries[i]
+            for j in range(i + 1, len(keyed_entries)):
+                ratio2, side2, filepath2, hash2 = keyed_entries[j]
+                if ratio2 - ratio1 > ASPECT_RATIO_TOLERANCE:
+                    break # Sorted order: no later entry can be within tolerance either
+                compare(side1, filepath1, hash1, side2, filepath2, hash2)
+
+        if unknown_entries:
+            print(f"  {len(unknown_entries)} images have unknown dimensions and are compared against all images.")
+            known_entries = [(side, filepath, img_hash) for _, side, filepath, img_hash in keyed_entries]
+            for i, (side1, filepath1, hash1) in enumerate(unknown_entries):
+                for side2, filepath2, hash2 in unknown_entries[i + 1:] + known_entries:
+                    compare(side1, filepath1, hash1, side2, filepath2, hash2)
+
+        return found_duplicates, compared_count
+
+    def _write_duplicate_report(self, duplicates: List[Tuple[str, str]], low_information_images: Optional[List[str]] = None):
+        """Writes the detected duplicate pairs (and any low-information images) to a report file."""
         print(f"Writing duplicate report to: {os.path.abspath(self.duplicate_report_file)}")
         try:
             with open(self.duplicate_report_file, 'w') as f:
@@ -203,10 +1120,132 @@ class DuplicateFinder:
                     f.write(f"Duplicate and Near-Duplicate Image Report (Threshold: {self.hash_threshold}, Type: {self.hash_type}):\n\n")
                     for pair in duplicates:
                         f.write(f"- {pair[0]}\n- {pair[1]}\n\n")
+                if low_information_images:
+                    f.write(f"\nLow-Information Images ({len(low_information_images)}, blank or near-solid; "
+                            f"matched by exact pixel content only):\n\n")
+                    for filepath in low_information_images:
+                        f.write(f"- {filepath}\n")
             print("Duplicate report written.")
         except IOError as e:
             print(f"Error writing duplicate report file '{self.duplicate_report_file}': {e}.")
 
+    def _write_action_plan(self, duplicates: List[Tuple[str, str]], dimensions: Dict[str, Tuple[int, int]]) -> None:
+        """
+        Groups the duplicate pairs into clusters and saves, per cluster, the file to keep and the
+        files to act on, with their size, mtime and fingerprint for validation at apply time.
+        The keeper is the file with the most pixels, then the largest file, then the first path;
+        in new_vs_existing mode a file outside the new images directory is always kept.
+        Only files matched directly with the keeper are acted on. Clusters chain pairs (A~B, B~C),
+        and A and C may be further apart than the threshold, so the rest are left for review.
+        """
+        def keeper_rank(entry: PlanEntry):
+            width, height = dimensions.get(entry.path, (0, 0))
+            # Pairs are (existing, new) in this mode: the library copy stays and the incoming copy is acted on
+            is_new = self.comparison_scope == 'new_vs_existing' and bool(self.new_images_dir) and \
+                self._is_within_directory(entry.path, self.new_images_dir)
+            return (is_new, -width * height, -entry.size, entry.path)
+
+        direct_matches: Dict[str, Set[str]] = {}
+        for filepath1, filepath2 in duplicates:
+            direct_matches.setdefault(filepath1, set()).add(filepath2)
+            direct_matches.setdefault(filepath2, set()).add(filepath1)
+
+        clusters: List[PlanCluster] = []
+        indirect_count = 0
+        for members in build_clusters(duplicates):
+            entries: List[PlanEntry] = []
+            for filepath in members:
+                fingerprint = self._get_fingerprint(filepath)
+                if fingerprint is None:
+                    continue # Unreadable here (e.g. a path from another shard machine): never planned
+                try:
+                    stat = os.stat(filepath)
+                except OSError as e:
+                    print(f"Error reading {filepath}: {e}. Leaving it out of the action plan.")
+                    continue
+                entries.append(PlanEntry(filepath, fingerprint, stat.st_size, stat.st_mtime))
+            if len(entries) < 2:
+                continue
+            entries.sort(key=keeper_rank)
+            keeper = entries[0]
+            victims = [entry for entry in entries[1:] if entry.path in direct_matches[keeper.path]]
+            indirect_count += len(entries) - 1 - len(victims)
+            if victims:
+                clusters.append(PlanCluster(keeper, victims))
+        if indirect_count:
+            print(f"{indirect_count} files only similar to the kept file through other files were left out of the action plan "
+                  f"(see the duplicate report).")
+        ActionPlan(clusters).save(self.action_plan_file)
+
+    def load_action_plan(self) -> Optional[ActionPlan]:
+        """Returns the action plan saved by the last detection run, or None."""
+        return ActionPlan.load(self.action_plan_file)
+
+    def _apply_action_to_file(self, filepath: str, action_type: str) -> bool:
+        """Deletes, moves or copies one planned file. Returns True on success."""
+        try:
+            if action_type == 'delete':
+                os.remove(filepath)
+                print(f"DELETED: '{filepath}'")
+                return True
+            target_path = self._get_action_target_path(filepath)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            if action_type == 'move':
+                shutil.move(filepath, target_path)
+                print(f"Moved: '{filepath}' to '{target_path}'")
+            else:
+                shutil.copy2(filepath, target_path)
+                print(f"Copied: '{filepath}' to '{target_path}'")
+            return True
+        except Exception as e:
+            print(f"Error performing '{action_type}' on '{filepath}': {e}")
+            return False
+
+    def apply_action_plan(self, action_type: str) -> int:
+        """
+        Applies an action ('delete', 'move' or 'copy') to the files the saved plan marks for removal.
+        A cluster is skipped if its keeper is missing or changed, and a file is skipped if it changed
+        since detection (stat plus fingerprint check). Files run in parallel on action_workers threads.
+        Applied files are dropped from the plan; skipped ones stay for review.
+        Returns the number of files acted on.
+        """
+        if action_type not in ['delete', 'move', 'copy']:
+            print(f"Invalid action type: '{action_type}'. Must be 'delete', 'move' or 'copy'.")
+            return 0
+        plan = self.load_action_plan()
+        if plan is None or not plan.clusters:
+            print("No action plan found. Run duplicate detection first.")
+            return 0
+
+        print(f"\nApplying '{action_type}' to {plan.victim_count()} planned files ({len(plan.clusters)} clusters).")
+        if action_type == 'delete':
+            print("THIS IS IRREVERSIBLE!")
+        else:
+            os.makedirs(self.duplicate_action_directory, exist_ok=True)
+
+        def validate_cluster(cluster: PlanCluster) -> List[PlanEntry]:
+            if not entry_is_unchanged(cluster.keeper):
+                print(f"Skipping cluster of '{cluster.keeper.path}': the file to keep is missing or changed.")
+                return []
+            valid = []
+            for victim in cluster.victims:
+                if entry_is_unchanged(victim):
+                    valid.append(victim)
+                else:
+                    print(f"Skipping '{victim.path}': missing or changed since detection.")
+            return valid
+
+        with ThreadPoolExecutor(max_workers=self.action_workers) as executor:
+            valid_victims = [victim for victims in executor.map(validate_cluster, plan.clusters) for victim in victims]
+            results = list(executor.map(lambda victim: self._apply_action_to_file(victim.path, action_type), valid_victims))
+
+        applied_paths = {victim.path for victim, applied in zip(valid_victims, results) if applied}
+        remaining = [PlanCluster(cluster.keeper, [victim for victim in cluster.victims if victim.path not in applied_paths])
+                     for cluster in plan.clusters]
+        ActionPlan([cluster for cluster in remaining if cluster.victims]).save(self.action_plan_file)
+        print(f"Completed '{action_type}' for {len(applied_paths)} files.")
+        return len(applied_paths)
+
     def perform_duplicate_action(self, duplicates: List[Tuple[str, str]], action_type: str) -> int:
         """
         Performs the specified action (move/copy) on one file from each duplicate pair.
@@ -229,8 +1268,7 @@ class DuplicateFinder:
 
             try:
                 # Construct target path, preserving relative directory structure if possible
-                relative_path = os.path.relpath(duplicate_path, self.input_dir)
-                target_path = os.path.join(action_dir, relative_path)
+                target_path = self._get_action_target_path(duplicate_path)
 
                 os.makedirs(os.path.dirname(target_path), exist_ok=True)
 
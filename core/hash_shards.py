@@ -0,0 +1,127 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It reads and writes hash shards:
+# portable files holding the image hashes one machine computed for its part of the
+# library, so several machines can hash in parallel and one of them compares globally.
+
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+SHARD_EXTENSION = '.shard'
+
+class ShardRecord(NamedTuple):
+    size: int
+    mtime: float
+    hash_str: str # As written by DuplicateFinder._hash_to_string
+    width: int
+    height: int
+    from_thumbnail: bool
+
+class HashShard:
+    """
+    One machine's hashes, keyed by absolute path on that machine.
+
+    File layout (plain text, tab separated):
+        shard<TAB><name>
+        host<TAB><host name>         - missing in older shards; the shard name stands in for it
+        hash_type<TAB><hash type>
+        hash_size<TAB><hash size>    - missing in shards from before hash_size was configurable (8)
+        written<TAB><unix time>
+        images<TAB><count>           - followed by one line per image:
+        <path><TAB><size><TAB><mtime><TAB><hash><TAB><width><TAB><height><TAB><0|1 thumbnail hash>
+    """
+    def __init__(self, name: str, host: str, hash_type: str, hash_size: int, records: Dict[str, ShardRecord],
+                 written: Optional[float] = None):
+        self.name = name
+        self.host = host
+        self.hash_type = hash_type
+        self.hash_size = hash_size
+        self.records = records
+        self.written = written if written is not None else time.time()
+
+    def save(self, shard_path: str) -> None:
+        """Writes the shard. A temporary file is renamed into place so readers never see a partial shard."""
+        temp_path = shard_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(shard_path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(f"shard\t{self.name}\n")
+                f.write(f"host\t{self.host}\n")
+                f.write(f"hash_type\t{self.hash_type}\n")
+                f.write(f"hash_size\t{self.hash_size}\n")
+                f.write(f"written\t{self.written}\n")
+                f.write(f"images\t{len(self.records)}\n")
+                for filepath, record in self.records.items():
+                    f.write(f"{filepath}\t{record.size}\t{record.mtime}\t{record.hash_str}\t{record.width}\t{record.height}\t{int(record.from_thumbnail)}\n")
+            os.replace(temp_path, shard_path)
+            print(f"Saved hash shard '{self.name}' with {len(self.records)} images to: {os.path.abspath(shard_path)}")
+        except IOError as e:
+            print(f"Error saving hash shard '{shard_path}': {e}.")
+
+    @classmethod
+    def load(cls, shard_path: str) -> Optional['HashShard']:
+        """Reads a shard. Returns None if it is unreadable."""
+        try:
+            with open(shard_path, 'r', encoding='utf-8') as f:
+                header: Dict[str, str] = {}
+                while 'images' not in header: # Header lines run up to the image count
+                    key, value = f.readline().rstrip('\n').split('\t', 1)
+                    header[key] = value
+                name, hash_type = header['shard'], header['hash_type']
+                host = header.get('host', name)
+                hash_size = int(header.get('hash_size', 8))
+                written = float(header['written'])
+                image_count = int(header['images'])
+                records: Dict[str, ShardRecord] = {}
+                for _ in range(image_count):
+                    # rsplit keeps tabs inside paths intact
+                    filepath, size, mtime, hash_str, width, height, from_thumbnail = f.readline().rstrip('\n').rsplit('\t', 6)
+                    records[filepath] = ShardRecord(int(size), float(mtime), hash_str, int(width), int(height), from_thumbnail == '1')
+            return cls(name, host, hash_type, hash_size, records, written)
+        except (IOError, ValueError, IndexError, KeyError) as e:
+            print(f"Warning: Could not read hash shard '{shard_path}': {e}. Skipping it.")
+            return None
+
+def list_shard_files(shard_directory: str) -> List[str]:
+    """Returns the shard files in a directory, sorted by name."""
+    if not os.path.isdir(shard_directory):
+        return []
+    return sorted(os.path.join(shard_directory, filename) for filename in os.listdir(shard_directory)
+                  if filename.endswith(SHARD_EXTENSION))
+
+def merge_shards(shards: List[HashShard]) -> Dict[Tuple[str, str], ShardRecord]:
+    """
+    Combines the records of several shards, keyed by (host, path): the same path on two
+    machines is two different files. Only a file present in more than one shard from the same
+    host (e.g. a renamed shard) is reconciled: the record with the newer file modification time
+    is kept; on a tie, the record from the most recently written shard wins.
+    """
+    merged: Dict[Tuple[str, str], ShardRecord] = {}
+    merged_written: Dict[Tuple[str, str], float] = {}
+    overlap_count = 0
+    for shard in shards:
+        for filepath, record in shard.records.items():
+            source = (shard.host, filepath)
+            if source in merged:
+                overlap_count += 1
+                current = merged[source]
+                if (record.mtime, shard.written) <= (current.mtime, merged_written[source]):
+                    continue
+            merged[source] = record
+            merged_written[source] = shard.written
+    if overlap_count:
+        print(f"Reconciled {overlap_count} files present in more than one shard from the same host (newer records kept).")
+    return merged
@@ -13,20 +13,193 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+import random
+import hashlib
+import time
+import tempfile
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from PIL import Image
-from typing import Tuple, Dict, List
+from typing import Callable, Tuple, Dict, List, NamedTuple, Optional
 import importlib.util # Used for dynamic import
 
 # Import from our core modules
 from core.config_manager import ConfigManager
+from core.processing_manifest import MANIFEST_FILE_NAME, ManifestEntry, ProcessingManifest
+from core.processing_journal import JOURNAL_FILE_NAME, JournalItem, ProcessingJournal
+from core.output_naming import OutputNamer
+from core.adaptive_encoding import ADAPTIVE_FORMATS, AdaptiveTarget, search_quality
 from core.image_utils import (
-    get_random_name,
+    get_content_digest,
+    link_or_copy_file,
+    load_names,
     get_simplified_ratio_string,
     ASPECT_RATIO_TOLERANCE,
 )
 # The import for COMMON_RESOLUTIONS_DEFINITIONS has been removed from here
 # and will be handled dynamically within the __init__ method below.
 
+
+class RenderOutput(NamedTuple):
+    """One file to produce from a source image."""
+    name_tail: str # Rendition suffix and extension, appended to the task's output stem
+    target_size: Tuple[int, int]
+    save_format: Optional[str] # None lets Pillow pick the format from the output extension
+    encode_params: str # Encoder options from the active encode profile, e.g. 'quality=75 optimize=true'
+    passthrough: str # '' to encode; else the source already matches and is copied as-is ('reflink', 'hardlink' or 'copy')
+    adaptive: str # '' or an AdaptiveTarget string: search the quality for a byte budget or SSIM floor
+
+class RenderTask(NamedTuple):
+    """Everything a worker needs to render one image; decided up front from the image header."""
+    input_path: str
+    output_stem: str # Output path without rendition suffix and extension
+    outputs: Tuple[RenderOutput, ...] # Largest first; each smaller size is resized from the previous one
+    pixel_count: int # Source size, used to schedule the largest images first
+    reduce_guard: float # 0 disables reduce-on-load; see _reduce_towards_target
+    copy_from: str = '' # Output stem of a byte-identical source; its outputs are copied instead of this source
+
+class Rendition(NamedTuple):
+    """A [Renditions] entry: outputs fitted inside max_size, in each of the listed extensions."""
+    name: str
+    max_size: Tuple[int, int]
+    extensions: Tuple[str, ...]
+
+class Calibration(NamedTuple):
+    """Costs measured by rendering a sample of a planned batch; see ImageProcessor._calibrate."""
+    seconds_per_pixel: float # Render time per source plus encoded output pixel
+    bytes_per_pixel: Dict[str, float] # Output bytes per output pixel, by output format
+    image_count: int
+
+class EncodeStat(NamedTuple):
+    save_format: str
+    seconds: float
+    output_bytes: int
+    search_iterations: int = 0 # Encodes an adaptive quality search needed; 0 without a search
+    target_met: bool = True
+
+def parse_encode_params(encode_params: str) -> Dict[str, object]:
+    """Turns 'quality=75 optimize=true' into Pillow save() keyword arguments."""
+    params: Dict[str, object] = {}
+    for token in encode_params.split():
+        key, _, value = token.partition('=')
+        if value.lower() in ('true', 'yes'):
+            params[key] = True
+        elif value.lower() in ('false', 'no'):
+            params[key] = False
+        else:
+            try:
+                params[key] = int(value)
+            except ValueError:
+                try:
+                    params[key] = float(value)
+                except ValueError:
+                    params[key] = value
+    return params
+
+def _reduce_towards_target(img: Image.Image, target_size: Tuple[int, int], guard: float) -> Image.Image:
+    """
+    Shrinks a freshly opened image cheaply before the final LANCZOS resize: JPEG DCT scaling
+    while decoding (Image.draft), then integer box reduction (Image.reduce). At least
+    guard x the target size is kept on each axis, so LANCZOS still does the last step.
+    """
+    keep_width = max(1, int(target_size[0] * guard))
+    keep_height = max(1, int(target_size[1] * guard))
+    img.draft(None, (keep_width, keep_height)) # Only JPEG supports this; a no-op for other formats
+    factor_x = max(1, img.width // keep_width)
+    factor_y = max(1, img.height // keep_height)
+    if (factor_x > 1 or factor_y > 1) and img.mode not in ('1', 'P'): # reduce() has no palette support
+        img = img.reduce((factor_x, factor_y))
+    return img
+
+def render_image(task: RenderTask) -> Tuple[bool, str, List[EncodeStat]]:
+    """
+    Decodes a source once, then resizes and saves each of its outputs, largest first, every
+    size resized from the previous one. Returns (success, log message, encode time and size per output).
+    Module-level so that process pools can pickle it.
+    """
+    encode_stats = []
+    try:
+        saved_names = []
+        # Outputs the source already matches, or an identical source already has, are copied without decoding
+        encoded_outputs = []
+        for output in task.outputs:
+            if not output.passthrough:
+                encoded_outputs.append(output)
+                continue
+            output_path = task.output_stem + output.name_tail
+            copy_source = task.copy_from + output.name_tail if task.copy_from else task.input_path
+            copy_start = time.perf_counter()
+            method_used = link_or_copy_file(copy_source, output_path, output.passthrough)
+            encode_stats.append(EncodeStat(f"{output.save_format} ({method_used})", time.perf_counter() - copy_start,
+                                           os.path.getsize(output_path)))
+            copy_note = f" of {os.path.basename(copy_source)}" if task.copy_from else ""
+            saved_names.append(f"{os.path.basename(output_path)} ({method_used}{copy_note})")
+        if not encoded_outputs:
+            return True, f"  Saved: {', '.join(saved_names)}", encode_stats
+
+        with Image.open(task.input_path) as img:
+            if task.reduce_guard:
+                img = _reduce_towards_target(img, encoded_outputs[0].target_size, task.reduce_guard)
+            for output in encoded_outputs:
+                if img.size != output.target_size:
+                    img = img.resize(output.target_size, Image.LANCZOS)
+
+                # Handle potential alpha channel issues (e.g., PNG to JPG)
+                output_img = img
+                if output.save_format == 'JPEG' and img.mode in ('RGBA', 'P'):
+                    output_img = img.convert('RGB')
+                elif output.save_format == 'BMP' and img.mode == 'RGBA':
+                    output_img = img.convert('RGB')
+
+                output_path = task.output_stem + output.name_tail
+                if os.path.exists(output_path) and os.stat(output_path).st_nlink > 1:
+                    os.remove(output_path) # A hardlinked passthrough from an earlier run; never write through to its source
+                encode_start = time.perf_counter()
+                adaptive_target = AdaptiveTarget.from_string(output.adaptive)
+                if adaptive_target:
+                    result = search_quality(output_img, output.save_format, parse_encode_params(output.encode_params), adaptive_target)
+                    with open(output_path, 'wb') as f:
+                        f.write(result.data)
+                    encode_stats.append(EncodeStat(output.save_format, time.perf_counter() - encode_start, len(result.data),
+                                                   result.iterations, result.target_met))
+                    ssim_note = f", SSIM {result.ssim:.4f}" if result.ssim is not None else ""
+                    missed_note = "" if result.target_met else ", target not met"
+                    saved_names.append(f"{os.path.basename(output_path)} (quality {result.quality}, {result.iterations} encodes, "
+                                       f"{len(result.data) / 1024:.0f} KB{ssim_note}{missed_note})")
+                    continue
+                output_img.save(output_path, format=output.save_format, **parse_encode_params(output.encode_params))
+                encode_stats.append(EncodeStat(output.save_format or os.path.splitext(output_path)[1].lstrip('.').upper(),
+                                               time.perf_counter() - encode_start, os.path.getsize(output_path)))
+                saved_names.append(os.path.basename(output_path))
+        return True, f"  Saved: {', '.join(saved_names)}", encode_stats
+    except Exception as e:
+        return False, f"Error processing {os.path.basename(task.input_path)}: {e}", encode_stats
+
+def settings_fingerprint(task: RenderTask) -> str:
+    """The effective settings the outputs were rendered with; if they change, the outputs are rebuilt."""
+    outputs = ','.join(f"{output.target_size[0]}x{output.target_size[1]}:{output.save_format}:{output.encode_params}:"
+                       f"{output.passthrough}:{output.adaptive}:{output.name_tail}" for output in task.outputs)
+    return f"{outputs};lanczos;reduce={task.reduce_guard}"
+
+def _format_label(output: RenderOutput) -> str:
+    return output.save_format or output.name_tail.rsplit('.', 1)[-1].upper()
+
+def _render_pixels(task: RenderTask) -> int:
+    """Pixels a task decodes and encodes; render time is estimated in proportion to it. Copies count as free."""
+    encoded_pixels = sum(output.target_size[0] * output.target_size[1] for output in task.outputs if not output.passthrough)
+    return task.pixel_count + encoded_pixels if encoded_pixels else 0
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+def _fit_within(size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Scales size to fit inside max_size, keeping its aspect ratio."""
+    scale = min(max_size[0] / size[0], max_size[1] / size[1])
+    return max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+
 class ImageProcessor:
     """
     Handles the processing (resizing, format conversion, renaming) of image files
@@ -36,14 +209,52 @@ class ImageProcessor:
         self.config_manager = config_manager
         self.input_dir = self.config_manager.get('Paths', 'input_directory')
         self.output_dir = self.config_manager.get('Paths', 'output_directory')
+        # Per-image plan of a dry run (plan_processing); kept out of the output tree, which a dry run never touches
+        self.processing_plan_file = self.config_manager.get('Paths', 'processing_plan_file', fallback='./scan_reports/processing_plan.txt')
         self.output_extension = self.config_manager.get('ImageSettings', 'output_extension').lower()
         self.enable_random_rename = self.config_manager.getboolean('Renaming', 'enable_random_rename')
         self.names_file = self.config_manager.get('Paths', 'names_file')
+        # Seed for the random-name permutation; empty picks a new seed for every batch, a fixed seed makes names reproducible
+        name_seed_str = self.config_manager.get('Renaming', 'name_seed', fallback='').strip()
+        self.name_seed = int(name_seed_str) if name_seed_str else random.SystemRandom().randrange(2**32)
+        # Parallel rendering: 0 workers means one per CPU core; 'thread' or 'process' pool
+        self.workers = self.config_manager.getint('ImageProcessor', 'workers', fallback=0) or os.cpu_count() or 1
+        self.worker_mode = self.config_manager.get('ImageProcessor', 'worker_mode', fallback='thread').lower()
+        # Reduce-on-load for big downscales: keep at least this multiple of the target size for LANCZOS
+        self.enable_reduce_on_load = self.config_manager.getboolean('ImageProcessor', 'enable_reduce_on_load', fallback=False)
+        self.reduce_on_load_guard = max(1.0, self.config_manager.getfloat('ImageProcessor', 'reduce_on_load_guard', fallback=2.0))
+        # Skip sources whose output (per the manifest in the output directory) is still current
+        self.enable_incremental_processing = self.config_manager.getboolean('ImageProcessor', 'enable_incremental_processing', fallback=False)
 
         self.override_custom = self.config_manager.getboolean('ImageSettings', 'override_to_custom_resolution')
         self.custom_width = self.config_manager.getint('ImageSettings', 'custom_width')
         self.custom_height = self.config_manager.getint('ImageSettings', 'custom_height')
 
+        # Sources already at the target size and format are copied instead of re-encoded
+        self.enable_passthrough = self.config_manager.getboolean('ImageProcessor', 'enable_passthrough', fallback=False)
+        self.passthrough_method = self.config_manager.get('ImageProcessor', 'passthrough_method', fallback='reflink').strip().lower()
+        if self.passthrough_method not in ('reflink', 'hardlink', 'copy'):
+            print(f"Warning: Unknown passthrough_method '{self.passthrough_method}'. Using 'copy'.")
+            self.passthrough_method = 'copy'
+        # Output layout: 'flat' (all in output_directory), 'mirror' (the input subfolders) or 'shard' (ab/cd/ subfolders by name hash)
+        self.output_layout = self.config_manager.get('ImageProcessor', 'output_layout', fallback='flat').strip().lower()
+        if self.output_layout not in ('flat', 'mirror', 'shard'):
+            print(f"Warning: Unknown output_layout '{self.output_layout}'. Using 'flat'.")
+            self.output_layout = 'flat'
+        # Images rendered by a dry run (plan_processing) to estimate encode time and output size
+        self.plan_calibration_images = self.config_manager.getint('ImageProcessor', 'plan_calibration_images', fallback=8)
+        # Byte-identical sources are rendered once; the others get copies (passthrough_method) of those outputs
+        self.enable_content_dedup = self.config_manager.getboolean('ImageProcessor', 'enable_content_dedup', fallback=False)
+
+        # Encoder options per output format come from the active [EncodeProfiles] profile
+        self.encode_profile = self.config_manager.get('EncodeProfiles', 'active_profile', fallback='balanced').strip().lower()
+        self._encode_params_cache: Dict[str, str] = {}
+        # Adaptive quality: per image, search JPEG/WebP quality for a byte budget ('bytes') or an SSIM floor ('ssim')
+        self.adaptive_target = self._load_adaptive_target()
+
+        # Optional renditions: several sizes/formats per source, decoded once
+        self.renditions = self._load_renditions()
+
         # Define image extensions here as an instance variable
         self.image_extensions = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp')
 
@@ -93,14 +304,25 @@ class ImageProcessor:
         # Sort by decimal value for potentially faster lookup or consistency (optional)
         self.ar_decimal_key_map.sort()
 
-
-        # Ensure output directory exists
-        os.makedirs(self.output_dir, exist_ok=True)
         print(f"Image Processor Initialized:")
         print(f"  Input Directory: {os.path.abspath(self.input_dir)}")
         print(f"  Output Directory: {os.path.abspath(self.output_dir)}")
         print(f"  Output Extension: {self.output_extension}")
-        print(f"  Random Renaming Enabled: {self.enable_random_rename}")
+        print(f"  Random Renaming Enabled: {self.enable_random_rename} (name seed {self.name_seed})")
+        print(f"  Workers: {self.workers} ({self.worker_mode})")
+        print(f"  Reduce-on-Load: {self.enable_reduce_on_load} (guard {self.reduce_on_load_guard}x)")
+        print(f"  Incremental Processing: {self.enable_incremental_processing}")
+        print(f"  Encode Profile: {self.encode_profile}")
+        print(f"  Passthrough: {self.enable_passthrough} ({self.passthrough_method})")
+        print(f"  Identical Source Dedup: {self.enable_content_dedup}")
+        print(f"  Output Layout: {self.output_layout}")
+        if self.adaptive_target:
+            target = self.adaptive_target
+            goal = f"at most {target.max_bytes} bytes" if target.kind == 'bytes' else f"SSIM at least {target.min_ssim}"
+            print(f"  Adaptive Quality: {goal}, quality {target.min_quality}-{target.max_quality}, up to {target.max_iterations} encodes")
+        if self.renditions:
+            rendition_list = ', '.join(f"{r.name} {r.max_size[0]}x{r.max_size[1]} ({'/'.join(r.extensions)})" for r in self.renditions)
+            print(f"  Renditions: {rendition_list}")
         print(f"  Override to Custom Resolution Enabled: {self.override_custom}")
         if self.override_custom:
             print(f"    All images will be resized to: {self.custom_width}x{self.custom_height}")
@@ -126,15 +348,46 @@ class ImageProcessor:
             print(f"Warning: Invalid fallback_resolution_goal '{size_str}'. Defaulting to 1080p.")
             return resolutions['1080p']
 
-    def process_images(self) -> int:
+    def _load_adaptive_target(self) -> Optional[AdaptiveTarget]:
+        """Reads the adaptive_* options of [EncodeProfiles]. Returns None if adaptive_target is 'none'."""
+        kind = self.config_manager.get('EncodeProfiles', 'adaptive_target', fallback='none').strip().lower()
+        if kind == 'none':
+            return None
+        if kind not in ('bytes', 'ssim'):
+            print(f"Warning: Unknown adaptive_target '{kind}' (expected none, bytes or ssim). Adaptive quality is off.")
+            return None
+        min_quality = max(1, self.config_manager.getint('EncodeProfiles', 'adaptive_min_quality', fallback=30))
+        max_quality = min(100, self.config_manager.getint('EncodeProfiles', 'adaptive_max_quality', fallback=95))
+        return AdaptiveTarget(kind,
+                              self.config_manager.getint('EncodeProfiles', 'adaptive_max_bytes', fallback=500000),
+                              self.config_manager.getfloat('EncodeProfiles', 'adaptive_min_ssim', fallback=0.95),
+                              min_quality, max(min_quality, max_quality),
+                              max(1, self.config_manager.getint('EncodeProfiles', 'adaptive_max_iterations', fallback=7)))
+
+    def _load_renditions(self) -> List[Rendition]:
         """
-        Scans, processes (resizes, converts, renames), and saves images.
-        Returns the count of successfully processed images.
+        Reads the [Renditions] section of image_settings.ini: 'name = <width>x<height> <extension> ...'.
+        Returns an empty list (single output per the normal settings) unless enable_renditions is set.
         """
-        print(f"\nStarting image processing in: {os.path.abspath(self.input_dir)}")
-        processed_count = 0
+        if not self.config_manager.getboolean('Renditions', 'enable_renditions', fallback=False):
+            return []
+        renditions = []
+        for name, value in self.config_manager.get_section_as_dict('Renditions').items():
+            if name == 'enable_renditions':
+                continue
+            try:
+                size_str, *extensions = value.lower().split()
+                max_width, max_height = (int(part) for part in size_str.split('x'))
+                if max_width <= 0 or max_height <= 0 or not extensions or any(char in name for char in '/\\,'):
+                    raise ValueError
+                renditions.append(Rendition(name, (max_width, max_height), tuple(extensions)))
+            except ValueError:
+                print(f"Warning: Invalid rendition '{name} = {value}' (expected '<width>x<height> <extension> ...'). Skipping it.")
+        renditions.sort(key=lambda rendition: rendition.max_size[0] * rendition.max_size[1], reverse=True)
+        return renditions
 
-        # Get all aspect ratio specific targets from config
+    def _get_ar_specific_targets(self) -> Dict[str, str]:
+        """Returns the configured target level per aspect ratio key (e.g. {'16:9': '4K UHD'})."""
         ar_specific_targets = {}
         image_settings_dict = self.config_manager.get_section_as_dict('ImageSettings')
         for key, value in image_settings_dict.items():
@@ -143,93 +396,557 @@ class ImageProcessor:
                 # Replace the first underscore for X_Y, then any subsequent for X.Y_Z
                 ar_str_key = key.replace('target_resolution_', '', 1).replace('_', ':')
                 ar_specific_targets[ar_str_key] = value
+        return ar_specific_targets
 
-        for root, _, files in os.walk(self.input_dir):
-            for filename in files:
+    def _collect_input_files(self) -> List[str]:
+        """Returns the image files below the input directory in a stable (sorted) order."""
+        input_files = []
+        for root, dirs, files in os.walk(self.input_dir):
+            dirs.sort() # Walk subdirectories in a stable order too
+            for filename in sorted(files):
                 if filename.lower().endswith(self.image_extensions): # Use self.image_extensions
-                    filepath = os.path.join(root, filename)
-                    try:
-                        with Image.open(filepath) as img:
-                            print(f"\nProcessing: {filename} (Original: {img.width}x{img.height})")
-
-                            target_width, target_height = 0, 0
-                            chosen_method = "unknown"
-
-                            if self.override_custom:
-                                # If override is true, always use custom dimensions
-                                target_width, target_height = self.custom_width, self.custom_height
-                                chosen_method = "Custom Override (Direct Resize)"
-                            else:
-                                current_img_aspect = img.width / img.height if img.height != 0 else float('inf')
-                                matched_ar_key = None
-
-                                # Find the closest matching aspect ratio key based on decimal value
-                                min_diff = float('inf')
-                                for def_ar_decimal, def_ar_key in self.ar_decimal_key_map:
-                                    diff = abs(current_img_aspect - def_ar_decimal)
-                                    if diff < min_diff and diff <= ASPECT_RATIO_TOLERANCE:
-                                        min_diff = diff
-                                        matched_ar_key = def_ar_key # This is the string key like '16:9' or '2.35:1'
-
-                                if matched_ar_key:
-                                    # Found a matching aspect ratio in definitions
-                                    # Now, check if there's a specific target level for it in config.ini
-                                    target_level_str = ar_specific_targets.get(matched_ar_key) # Get level from config
-
-                                    if target_level_str and matched_ar_key in self._common_resolutions_definitions and target_level_str in self._common_resolutions_definitions[matched_ar_key]:
-                                        # Use the dimensions from the _common_resolutions_definitions
-                                        target_width, target_height = self._common_resolutions_definitions[matched_ar_key][target_level_str]
-                                        chosen_method = f"Aspect Ratio Match ({matched_ar_key}) to {target_level_str}"
-                                    else:
-                                        # No specific target level set in config for this aspect ratio, or level not found in definitions.
-                                        # Fall back to direct resize.
-                                        print(f"  Warning: No specific target level ('{target_level_str}') found in definitions for AR '{matched_ar_key}'. Falling back to general goal.")
-                                        target_width, target_height = self.fallback_target_width, self.fallback_target_height
-                                        chosen_method = "Fallback (Direct Resize)"
-                                else:
-                                    # No close aspect ratio match found in predefined ARs at all, use fallback
-                                    print(f"  No close aspect ratio match found for original ({img.width}x{img.height}, AR {current_img_aspect:.2f}). Using fallback.")
-                                    target_width, target_height = self.fallback_target_width, self.fallback_target_height
-                                    chosen_method = "Fallback (Direct Resize)"
-
-                            # Perform the resize
-                            print(f"  Chosen Method: {chosen_method}. Resizing to: {target_width}x{target_height}")
-                            img = img.resize((target_width, target_height), Image.LANCZOS)
-
-                            # Determine output filename and path
-                            base_name = os.path.splitext(filename)[0]
-                            if self.enable_random_rename:
-                                new_name = get_random_name(self.names_file) + f"_{processed_count:04d}" # Add a counter for uniqueness
-                            else:
-                                new_name = base_name
-
-                            if self.output_extension == 'original':
-                                final_ext = os.path.splitext(filename)[1].lower()
-                                if final_ext == '.jpeg':
-                                    final_ext = '.jpg'
-                                output_filepath = os.path.join(self.output_dir, f"{new_name}{final_ext}")
-                            else:
-                                output_filepath = os.path.join(self.output_dir, f"{new_name}.{self.output_extension}")
-
-                            # Save the image
-                            save_format = self.output_extension.upper() if self.output_extension != 'original' else img.format
-                            if save_format == 'JPG':
-                                save_format = 'JPEG'
-                            elif save_format == 'TIF':
-                                save_format = 'TIFF'
-
-                            # Handle potential alpha channel issues (e.g., PNG to JPG)
-                            if save_format == 'JPEG' and img.mode in ('RGBA', 'P'):
-                                img = img.convert('RGB')
-                            elif save_format == 'BMP' and img.mode == 'RGBA':
-                                img = img.convert('RGB')
-
-                            img.save(output_filepath, format=save_format)
-                            print(f"  Saved: {os.path.basename(output_filepath)}")
-                            processed_count += 1
-
-                    except Exception as e:
-                        print(f"Error processing {filename}: {e}")
+                    input_files.append(os.path.join(root, filename))
+        return input_files
+
+    def _choose_target_size(self, width: int, height: int, ar_specific_targets: Dict[str, str]) -> Tuple[Tuple[int, int], str]:
+        """Returns ((target_width, target_height), chosen method description) for an image size."""
+        if self.override_custom:
+            # If override is true, always use custom dimensions
+            return (self.custom_width, self.custom_height), "Custom Override (Direct Resize)"
+
+        current_img_aspect = width / height if height != 0 else float('inf')
+        matched_ar_key = None
+
+        # Find the closest matching aspect ratio key based on decimal value
+        min_diff = float('inf')
+        for def_ar_decimal, def_ar_key in self.ar_decimal_key_map:
+            diff = abs(current_img_aspect - def_ar_decimal)
+            if diff < min_diff and diff <= ASPECT_RATIO_TOLERANCE:
+                min_diff = diff
+                matched_ar_key = def_ar_key # This is the string key like '16:9' or '2.35:1'
+
+        if matched_ar_key:
+            # Found a matching aspect ratio in definitions
+            # Now, check if there's a specific target level for it in config.ini
+            target_level_str = ar_specific_targets.get(matched_ar_key) # Get level from config
+
+            if target_level_str and matched_ar_key in self._common_resolutions_definitions and target_level_str in self._common_resolutions_definitions[matched_ar_key]:
+                # Use the dimensions from the _common_resolutions_definitions
+                return (tuple(self._common_resolutions_definitions[matched_ar_key][target_level_str]),
+                        f"Aspect Ratio Match ({matched_ar_key}) to {target_level_str}")
+            # No specific target level set in config for this aspect ratio, or level not found in definitions.
+            # Fall back to direct resize.
+            return ((self.fallback_target_width, self.fallback_target_height),
+                    f"Fallback (Direct Resize); no target level ('{target_level_str}') found in definitions for AR '{matched_ar_key}'")
+        # No close aspect ratio match found in predefined ARs at all, use fallback
+        return ((self.fallback_target_width, self.fallback_target_height),
+                f"Fallback (Direct Resize); no close aspect ratio match (AR {current_img_aspect:.2f})")
+
+    def _read_sources(self, input_files: List[str], manifest: ProcessingManifest) -> List[Optional[Tuple[os.stat_result, int, int, str]]]:
+        """_read_source for every input file, in order. Header reads mostly wait on the disk, so they run on worker threads."""
+        def read(filepath: str) -> Optional[Tuple[os.stat_result, int, int, str]]:
+            return self._read_source(filepath, manifest.entries.get(filepath))
+        if self.workers == 1 or len(input_files) <= 1:
+            return [read(filepath) for filepath in input_files]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(read, input_files))
+
+    def _read_source(self, filepath: str, previous: Optional[ManifestEntry]) -> Optional[Tuple[os.stat_result, int, int, str]]:
+        """
+        Returns (stat, width, height, format) for a source image. Sources the manifest already
+        knows unchanged are answered from the manifest; others have their header read.
+        """
+        try:
+            stat_result = os.stat(filepath)
+            if previous and previous.matches_source(stat_result):
+                return stat_result, previous.width, previous.height, previous.source_format
+            with Image.open(filepath) as img: # Only the header is read here
+                return stat_result, img.width, img.height, img.format
+        except Exception as e:
+            print(f"Error processing {os.path.basename(filepath)}: {e}")
+            return None
+
+    def _plan_image(self, filepath: str, width: int, height: int, source_format: str,
+                    ar_specific_targets: Dict[str, str]) -> Tuple[RenderTask, str]:
+        """
+        Decides target size and format for one image. Returns (task, chosen method).
+        The task's output path keeps the source's base name until _name_output assigns the final one.
+        """
+        filename = os.path.basename(filepath)
+        if self.renditions:
+            outputs = []
+            for rendition in self.renditions:
+                rendition_size = _fit_within((width, height), rendition.max_size)
+                for output_extension in rendition.extensions:
+                    final_ext, save_format = self._output_extension_and_format(filename, source_format, output_extension)
+                    outputs.append(RenderOutput(f"_{rendition.name}{final_ext}", rendition_size, save_format,
+                                                self._encode_params_for(save_format),
+                                                self._passthrough_for((width, height), source_format, rendition_size, save_format),
+                                                self._adaptive_for(save_format)))
+            outputs.sort(key=lambda output: output.target_size[0] * output.target_size[1], reverse=True)
+            chosen_method = "Renditions (" + ", ".join(f"{output.name_tail.lstrip('_')} {output.target_size[0]}x{output.target_size[1]}"
+                                                       for output in outputs) + ")"
+            # Renditions fit their own boxes, but an image the aspect ratio targets cannot place is still a fallback
+            _, match_method = self._choose_target_size(width, height, ar_specific_targets)
+            if match_method.startswith("Fallback"):
+                chosen_method += f". Fallback: {match_method.split('; ', 1)[-1]}"
+        else:
+            target_size, chosen_method = self._choose_target_size(width, height, ar_specific_targets)
+            final_ext, save_format = self._output_extension_and_format(filename, source_format, self.output_extension)
+            passthrough = self._passthrough_for((width, height), source_format, target_size, save_format)
+            outputs = [RenderOutput(final_ext, target_size, save_format, self._encode_params_for(save_format), passthrough,
+                                    self._adaptive_for(save_format))]
+            chosen_method += f". Resizing to: {target_size[0]}x{target_size[1]}" if not passthrough else \
+                f". Already {target_size[0]}x{target_size[1]} {save_format}: passthrough ({self.passthrough_method})"
+
+        # The stem is the source's base name until _name_output assigns the final one
+        output_stem = os.path.join(self.output_dir, os.path.splitext(filename)[0])
+        reduce_guard = self.reduce_on_load_guard if self.enable_reduce_on_load else 0.0
+        return RenderTask(filepath, output_stem, tuple(outputs), width * height, reduce_guard), chosen_method
+
+    def _output_extension_and_format(self, filename: str, source_format: str, output_extension: str) -> Tuple[str, Optional[str]]:
+        """Returns (file extension, Pillow save format) for an output extension setting such as 'jpg' or 'original'."""
+        if output_extension == 'original':
+            final_ext = os.path.splitext(filename)[1].lower()
+            if final_ext == '.jpeg':
+                final_ext = '.jpg'
+        else:
+            final_ext = f".{output_extension}"
+
+        save_format = output_extension.upper() if output_extension != 'original' else source_format
+        if save_format == 'JPG':
+            save_format = 'JPEG'
+        elif save_format == 'TIF':
+            save_format = 'TIFF'
+        return final_ext, save_format
+
+    def _passthrough_for(self, source_size: Tuple[int, int], source_format: str,
+                         target_size: Tuple[int, int], save_format: Optional[str]) -> str:
+        """Returns the passthrough method if the source already is the wanted size and format, else ''."""
+        if self.enable_passthrough and source_format and tuple(source_size) == tuple(target_size) and save_format == source_format:
+            # The source file might be over the byte budget; it has to go through the quality search
+            if self.adaptive_target and self.adaptive_target.kind == 'bytes' and save_format in ADAPTIVE_FORMATS:
+                return ''
+            return self.passthrough_method
+        return ''
+
+    def _adaptive_for(self, save_format: Optional[str]) -> str:
+        """Returns the adaptive quality target for outputs of this format, or '' to encode with the profile as-is."""
+        if self.adaptive_target and save_format in ADAPTIVE_FORMATS:
+            return self.adaptive_target.to_string()
+        return ''
+
+    def _encode_params_for(self, save_format: Optional[str]) -> str:
+        """Returns the active profile's encoder options for a format ([EncodeProfiles] <format>_<profile>), or ''."""
+        if not save_format:
+            return ''
+        if save_format not in self._encode_params_cache:
+            option = f"{save_format.lower()}_{self.encode_profile}"
+            encode_params = self.config_manager.get('EncodeProfiles', option, fallback='').strip()
+            if any(char in encode_params for char in ',/\t'):
+                print(f"Warning: Encode profile option '{option}' may not contain ',' or '/'. Using encoder defaults.")
+                encode_params = ''
+            self._encode_params_cache[save_format] = encode_params
+        return self._encode_params_cache[save_format]
+
+    def _name_output(self, task: RenderTask, index: int, namer: OutputNamer) -> RenderTask:
+        """
+        Gives a planned task its final, collision-free output stem. index is the image's position in
+        the sorted input list, so random-rename suffixes do not depend on which worker finishes first.
+        """
+        stem = namer.random_stem(index) if self.enable_random_rename else os.path.basename(task.output_stem)
+        directory = self._output_subdir(task.input_path, stem)
+        # Stems compare without extension, so only the rendition suffixes matter for collisions
+        suffixes = tuple(sorted({output.name_tail.rsplit('.', 1)[0] for output in task.outputs}))
+        new_name = namer.claim(stem, suffixes, directory)
+        return task._replace(output_stem=os.path.join(self.output_dir, directory, new_name))
+
+    def _output_subdir(self, filepath: str, stem: str) -> str:
+        """Returns the directory, relative to the output directory, that a source's outputs go to."""
+        if self.output_layout == 'mirror':
+            subdir = os.path.relpath(os.path.dirname(filepath), self.input_dir)
+            return '' if subdir == os.curdir else subdir
+        if self.output_layout == 'shard':
+            # Spreads outputs over 65536 directories, so none grows huge; the same name always lands in the same shard
+            name_hash = hashlib.blake2b(stem.lower().encode('utf-8'), digest_size=2).hexdigest()
+            return os.path.join(name_hash[:2], name_hash[2:])
+        return ''
+
+    def _fingerprint(self, task: RenderTask) -> str:
+        """The settings fingerprint recorded in the manifest; a different output layout also rebuilds the outputs."""
+        return f"{settings_fingerprint(task)};layout={self.output_layout}"
+
+    def _create_executor(self):
+        """Creates the worker pool. Process workers are spawned, which is safe from the GUI's threads."""
+        if self.worker_mode == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+        if self.worker_mode != 'thread':
+            print(f"Warning: Unknown worker_mode '{self.worker_mode}'. Using 'thread'.")
+        return ThreadPoolExecutor(max_workers=self.workers)
+
+    def _render_tasks(self, tasks: List[RenderTask], on_rendered: Callable[[RenderTask], None]) -> List[RenderTask]:
+        """
+        Renders the planned images, largest first for better load balance. on_rendered is called
+        in this thread for every image that succeeded. Returns the tasks that succeeded.
+        Copies of identical sources run last, once the outputs they copy exist.
+        """
+        tasks = sorted(tasks, key=lambda task: task.pixel_count, reverse=True)
+        copy_tasks = [task for task in tasks if task.copy_from]
+        tasks = [task for task in tasks if not task.copy_from]
+        rendered = []
+        encode_stats: List[EncodeStat] = []
+
+        def collect(task: RenderTask, result: Tuple[bool, str, List[EncodeStat]]) -> None:
+            success, message, task_encode_stats = result
+            print(message)
+            encode_stats.extend(task_encode_stats)
+            if success:
+                rendered.append(task)
+                on_rendered(task)
+
+        if self.workers == 1 or len(tasks) <= 1:
+            for task in tasks:
+                collect(task, render_image(task))
+        else:
+            print(f"\nRendering {len(tasks)} images on {self.workers} {self.worker_mode} workers (largest first)...")
+            with self._create_executor() as executor:
+                futures = {executor.submit(render_image, task): task for task in tasks}
+                for future in as_completed(futures):
+                    collect(futures[future], future.result())
+        for task in copy_tasks: # File copies only; not worth a worker
+            collect(task, render_image(task))
+        self._print_encode_report(encode_stats)
+        return rendered
+
+    def _print_encode_report(self, encode_stats: List[EncodeStat]) -> None:
+        """Prints encode time and output bytes per format for the active encode profile."""
+        if not encode_stats:
+            return
+        print(f"\nEncode report (profile '{self.encode_profile}'):")
+        for save_format in sorted({stat.save_format for stat in encode_stats}):
+            format_stats = [stat for stat in encode_stats if stat.save_format == save_format]
+            total_seconds = sum(stat.seconds for stat in format_stats)
+            total_bytes = sum(stat.output_bytes for stat in format_stats)
+            print(f"  {save_format}: {len(format_stats)} files, {total_seconds:.2f} s encoding "
+                  f"({total_seconds / len(format_stats) * 1000:.0f} ms each), {total_bytes / 1024**2:.2f} MB "
+                  f"({total_bytes / len(format_stats) / 1024:.0f} KB each)")
+            searched = [stat for stat in format_stats if stat.search_iterations]
+            if searched:
+                missed_count = sum(1 for stat in searched if not stat.target_met)
+                print(f"    Adaptive quality: {len(searched)} searches, {sum(stat.search_iterations for stat in searched) / len(searched):.1f} "
+                      f"encodes each on average, {missed_count} missed the target")
+
+    def _task_from_journal_item(self, item: JournalItem) -> RenderTask:
+        outputs = tuple(RenderOutput(name_tail, (int(target_width), int(target_height)), save_format or None, encode_params, passthrough, adaptive)
+                        for target_width, target_height, save_format, encode_params, passthrough, adaptive, name_tail in item.outputs)
+        copy_from = os.path.join(self.output_dir, item.copy_from_stem) if item.copy_from_stem else ''
+        return RenderTask(item.source_path, os.path.join(self.output_dir, item.output_stem), outputs,
+                          item.entry.width * item.entry.height, item.reduce_guard, copy_from)
+
+    def _journal_item_from_task(self, task: RenderTask, entry: ManifestEntry) -> JournalItem:
+        outputs = tuple((str(output.target_size[0]), str(output.target_size[1]), output.save_format or '',
+                         output.encode_params, output.passthrough, output.adaptive, output.name_tail) for output in task.outputs)
+        copy_from_stem = os.path.relpath(task.copy_from, self.output_dir) if task.copy_from else ''
+        return JournalItem(task.input_path, entry, os.path.relpath(task.output_stem, self.output_dir), copy_from_stem,
+                           outputs, task.reduce_guard)
+
+    def _share_identical_sources(self, planned: List[Tuple[RenderTask, ManifestEntry]],
+                                 unchanged: Dict[str, ManifestEntry]) -> List[Tuple[RenderTask, ManifestEntry]]:
+        """
+        Finds byte-identical sources (same content digest and settings fingerprint). The first one is
+        rendered; the others copy its outputs, or the outputs an unchanged source already has from an
+        earlier batch. Only sources sharing their file size with another source are hashed, and digests
+        stay in the manifest. Returns the planned tasks with digests and copy sources filled in;
+        unchanged entries that had to be hashed are updated in place.
+        """
+        planned_sizes = Counter(entry.size for _, entry in planned)
+        unchanged_sizes = {entry.size for entry in unchanged.values()}
+
+        def content_digest(source_path: str, entry: ManifestEntry, may_have_twin: bool) -> str:
+            if entry.content_digest or not may_have_twin:
+                return entry.content_digest
+            return get_content_digest(source_path) or ''
+
+        first_outputs: Dict[Tuple[str, str], str] = {} # (content digest, fingerprint) -> path of a rendered first output
+        for source_path, entry in sorted(unchanged.items()):
+            digest = content_digest(source_path, entry, entry.size in planned_sizes)
+            if digest:
+                unchanged[source_path] = entry._replace(content_digest=digest)
+                first_outputs.setdefault((digest, entry.fingerprint), entry.output_paths(self.output_dir)[0])
+
+        shared = []
+        copy_count = 0
+        for task, entry in planned:
+            entry = entry._replace(content_digest=content_digest(
+                task.input_path, entry, planned_sizes[entry.size] > 1 or entry.size in unchanged_sizes))
+            key = (entry.content_digest, entry.fingerprint)
+            if entry.content_digest and key in first_outputs:
+                # Equal fingerprints mean equal output name tails, so the tails map output to output
+                first_output = first_outputs[key]
+                copy_from = first_output[:len(first_output) - len(task.outputs[0].name_tail)]
+                task = task._replace(copy_from=copy_from,
+                                     outputs=tuple(output._replace(passthrough=self.passthrough_method) for output in task.outputs))
+                copy_count += 1
+            elif entry.content_digest:
+                first_outputs[key] = task.output_stem + task.outputs[0].name_tail
+            shared.append((task, entry))
+        if copy_count:
+            print(f"\nFound {copy_count} sources identical to another source; their outputs are copied ({self.passthrough_method}).")
+        return shared
+
+    def _run_journaled_batch(self, journal: ProcessingJournal, manifest: ProcessingManifest,
+                             updated_manifest: ProcessingManifest) -> int:
+        """
+        Renders the journal's unfinished items, checkpointing each one, then records every finished
+        item in the manifest and removes the journal. Returns the number of images rendered now.
+        """
+        tasks = [self._task_from_journal_item(item) for item in journal.remaining_items()]
+        for directory in sorted({os.path.dirname(task.output_stem) for task in tasks}):
+            os.makedirs(directory, exist_ok=True) # Once per output directory, not per file
+        rendered = self._render_tasks(tasks, on_rendered=lambda task: journal.mark_done(task.input_path))
+
+        finished_items = [item for item in journal.items if item.source_path in journal.done]
+        produced_paths = {output_path for item in finished_items for output_path in item.entry.output_paths(self.output_dir)}
+        emptied_directories = set()
+        for item in finished_items:
+            updated_manifest.entries[item.source_path] = item.entry
+            # A rebuilt source may have new output paths (other extension, renditions, renaming or layout changed); drop superseded files
+            previous = manifest.entries.get(item.source_path)
+            for stale_output in (previous.output_paths(self.output_dir) if previous else ()):
+                if stale_output not in produced_paths and os.path.exists(stale_output):
+                    os.remove(stale_output)
+                    print(f"  Removed superseded output: {os.path.relpath(stale_output, self.output_dir)}")
+                    emptied_directories.add(os.path.dirname(stale_output))
+        self._prune_empty_directories(emptied_directories)
+        updated_manifest.save(os.path.join(self.output_dir, MANIFEST_FILE_NAME))
+        journal.finish()
+        return len(rendered)
+
+    def _prune_empty_directories(self, directories) -> None:
+        """
+        Removes the given output subdirectories, and their parents up to the output directory, once
+        they are empty; after a layout switch the old mirror or shard directories would be left behind.
+        """
+        output_root = os.path.abspath(self.output_dir)
+        for directory in sorted(directories, key=len, reverse=True): # Deepest first, so parents are emptied before they are checked
+            directory = os.path.abspath(directory)
+            while directory != output_root and directory.startswith(output_root + os.sep):
+                try:
+                    os.rmdir(directory) # Only succeeds on an empty directory
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+
+    def process_images(self) -> int:
+        """
+        Scans, processes (resizes, converts, renames), and saves images.
+        Every image is planned from its header first and the plan is written to a checkpoint journal;
+        decoding, resizing and encoding then run on the worker pool. Sources the manifest in the output
+        directory shows as already rendered with the current settings are skipped.
+        Returns the count of successfully processed images.
+        """
+        print(f"\nStarting image processing in: {os.path.abspath(self.input_dir)}")
+        # Ensure output directory exists (only when processing; a dry run must not create it)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        journal_path = os.path.join(self.output_dir, JOURNAL_FILE_NAME)
+        if os.path.exists(journal_path):
+            print("Warning: An interrupted processing batch was found. Starting a new batch discards it "
+                  "(resume it instead to finish it with the same output names).")
+
+        manifest = ProcessingManifest.load(os.path.join(self.output_dir, MANIFEST_FILE_NAME))
+        updated_manifest = ProcessingManifest()
+        planned, skipped_count = self._plan_batch(manifest, updated_manifest)
+        for task, entry, chosen_method in planned:
+            print(f"\nProcessing: {os.path.basename(task.input_path)} (Original: {entry.width}x{entry.height})")
+            print(f"  Chosen Method: {chosen_method}")
+
+        if skipped_count:
+            print(f"\nSkipped {skipped_count} unchanged images already processed with the current settings.")
+        shared = [(task, entry) for task, entry, _ in planned]
+        if self.enable_content_dedup:
+            shared = self._share_identical_sources(shared, updated_manifest.entries)
+        items = [self._journal_item_from_task(task, entry) for task, entry in shared]
+
+        journal = ProcessingJournal.start(journal_path, items)
+        processed_count = self._run_journaled_batch(journal, manifest, updated_manifest)
 
         print(f"\nImage processing complete. Successfully processed {processed_count} images.")
         return processed_count
+
+    def _plan_batch(self, manifest: ProcessingManifest,
+                    updated_manifest: ProcessingManifest) -> Tuple[List[Tuple[RenderTask, ManifestEntry, str]], int]:
+        """
+        Plans every input image from its header (or its manifest entry): target size, format and final
+        output name. Sources still current with the current settings are put in updated_manifest instead.
+        Returns ([(task, manifest entry, chosen method)], skipped count). Nothing is written.
+        """
+        # Get all aspect ratio specific targets from config
+        ar_specific_targets = self._get_ar_specific_targets()
+        # One scan per output directory; names are then checked in memory
+        namer = OutputNamer(self.output_dir, load_names(self.names_file) if self.enable_random_rename else None, self.name_seed)
+
+        input_files = self._collect_input_files()
+        planned = []
+        skipped_count = 0
+        for index, (filepath, source) in enumerate(zip(input_files, self._read_sources(input_files, manifest))):
+            previous = manifest.entries.get(filepath)
+            if not source:
+                continue
+            stat_result, width, height, source_format = source
+            task, chosen_method = self._plan_image(filepath, width, height, source_format, ar_specific_targets)
+            fingerprint = self._fingerprint(task)
+
+            if (self.enable_incremental_processing and previous and previous.matches_source(stat_result)
+                    and previous.fingerprint == fingerprint
+                    and all(os.path.exists(output_path) for output_path in previous.output_paths(self.output_dir))):
+                updated_manifest.entries[filepath] = previous
+                skipped_count += 1
+                continue
+
+            for previous_name in (previous.output_names if previous else ()):
+                namer.release(previous_name, previous.output_subdir) # The source's own earlier outputs may be replaced
+            task = self._name_output(task, index, namer)
+
+            output_names = tuple(os.path.basename(task.output_stem) + output.name_tail for output in task.outputs)
+            known_digest = previous.content_digest if previous and previous.matches_source(stat_result) else ''
+            output_subdir = os.path.dirname(os.path.relpath(task.output_stem, self.output_dir))
+            entry = ManifestEntry(stat_result.st_size, stat_result.st_mtime, width, height,
+                                  source_format or '', fingerprint, output_names, known_digest, output_subdir)
+            planned.append((task, entry, chosen_method))
+        return planned, skipped_count
+
+    def _calibrate(self, tasks: List[RenderTask], image_count: int) -> Optional[Calibration]:
+        """
+        Renders up to image_count planned images, one at a time, into a temporary directory and measures
+        render time per pixel and output bytes per pixel of each format. The sample takes one image of every
+        combination of output formats first, then images spread evenly over the batch.
+        """
+        candidates = [task for task in tasks if _render_pixels(task)]
+        if not candidates or image_count <= 0:
+            return None
+        sample: List[RenderTask] = []
+        seen_formats = set()
+        for task in candidates:
+            formats = tuple(_format_label(output) for output in task.outputs)
+            if formats not in seen_formats:
+                seen_formats.add(formats)
+                sample.append(task)
+        for task in candidates[::max(1, len(candidates) // image_count)]:
+            if task not in sample:
+                sample.append(task)
+        sample = sample[:image_count]
+
+        print(f"\nCalibrating: rendering {len(sample)} sample images...")
+        total_seconds = 0.0
+        total_pixels = 0
+        format_bytes: Dict[str, int] = Counter()
+        format_pixels: Dict[str, int] = Counter()
+        with tempfile.TemporaryDirectory(prefix='image_toolkit_calibration_') as calibration_dir:
+            for number, task in enumerate(sample):
+                task = task._replace(output_stem=os.path.join(calibration_dir, f"sample_{number}"))
+                render_start = time.perf_counter()
+                success, message, _ = render_image(task)
+                if not success:
+                    print(message)
+                    continue
+                total_seconds += time.perf_counter() - render_start
+                total_pixels += _render_pixels(task)
+                for output in task.outputs:
+                    if not output.passthrough:
+                        format_bytes[_format_label(output)] += os.path.getsize(task.output_stem + output.name_tail)
+                        format_pixels[_format_label(output)] += output.target_size[0] * output.target_size[1]
+        if not total_pixels:
+            return None
+        return Calibration(total_seconds / total_pixels,
+                           {label: format_bytes[label] / format_pixels[label] for label in format_pixels}, len(sample))
+
+    def _write_plan(self, plan_path: str, planned: List[Tuple[RenderTask, ManifestEntry, str]]) -> None:
+        """Writes the per-image plan (chosen method and every output path) as a readable text file."""
+        temp_path = plan_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(plan_path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for task, entry, chosen_method in planned:
+                    f.write(f"{task.input_path} ({entry.width}x{entry.height} {entry.source_format or '?'})\n")
+                    f.write(f"  {chosen_method}\n")
+                    for output in task.outputs:
+                        copy_note = f", passthrough ({output.passthrough})" if output.passthrough else ""
+                        f.write(f"  -> {os.path.relpath(task.output_stem + output.name_tail, self.output_dir)} "
+                                f"({output.target_size[0]}x{output.target_size[1]} {_format_label(output)}{copy_note})\n")
+            os.replace(temp_path, plan_path)
+            print(f"Saved processing plan ({len(planned)} images) to: {os.path.abspath(plan_path)}")
+        except (IOError, OSError) as e:
+            print(f"Error saving processing plan '{plan_path}': {e}.")
+
+    def plan_processing(self) -> int:
+        """
+        Dry run of process_images: plans the batch the same way, from image headers only (aspect ratio
+        match, target level, output path), and writes nothing to the output directory. The per-image
+        plan goes to processing_plan_file; the totals, predicted output bytes per format,
+        the images that fall back, and an estimated wall time are printed. Sizes and times come from
+        rendering plan_calibration_images sample images. Identical sources are not looked for, since
+        that needs every candidate file read in full, so copies count as renders here.
+        Returns the number of images a run would process.
+        """
+        print(f"\nPlanning image processing (dry run) for: {os.path.abspath(self.input_dir)}")
+        planning_start = time.perf_counter()
+        manifest = ProcessingManifest.load(os.path.join(self.output_dir, MANIFEST_FILE_NAME))
+        planned, skipped_count = self._plan_batch(manifest, ProcessingManifest())
+        planning_seconds = time.perf_counter() - planning_start
+        self._write_plan(self.processing_plan_file, planned)
+
+        tasks = [task for task, _, _ in planned]
+        calibration = self._calibrate(tasks, self.plan_calibration_images)
+
+        output_counts: Dict[str, int] = Counter()
+        predicted_bytes: Dict[str, float] = Counter()
+        for task, entry, _ in planned:
+            for output in task.outputs:
+                label = _format_label(output)
+                if output.passthrough:
+                    label += f" ({output.passthrough})"
+                    predicted_bytes[label] += entry.size
+                elif calibration and label in calibration.bytes_per_pixel:
+                    predicted_bytes[label] += calibration.bytes_per_pixel[label] * output.target_size[0] * output.target_size[1]
+                output_counts[label] += 1
+        fallbacks = [(task, chosen_method) for task, _, chosen_method in planned if "Fallback" in chosen_method]
+
+        print(f"\nProcessing plan ({planning_seconds:.1f} s to plan):")
+        print(f"  Images to process: {len(planned)} (skipping {skipped_count} unchanged)")
+        print(f"  Input: {sum(entry.width * entry.height for _, entry, _ in planned) / 1e6:.1f} megapixels")
+        print(f"  Output: {sum(output.target_size[0] * output.target_size[1] for task in tasks for output in task.outputs) / 1e6:.1f} "
+              f"megapixels in {sum(output_counts.values())} files")
+        for label in sorted(output_counts):
+            size_note = f"{predicted_bytes[label] / 1024**2:.1f} MB predicted" if label in predicted_bytes else "size unknown (not in the calibration sample)"
+            print(f"    {label}: {output_counts[label]} files, {size_note}")
+        print(f"  Fallback resolution: {len(fallbacks)} images")
+        for task, chosen_method in fallbacks[:10]:
+            print(f"    {os.path.basename(task.input_path)}: {chosen_method}")
+        if len(fallbacks) > 10:
+            print(f"    ... and {len(fallbacks) - 10} more (see {os.path.abspath(self.processing_plan_file)})")
+        if calibration:
+            serial_seconds = calibration.seconds_per_pixel * sum(_render_pixels(task) for task in tasks)
+            parallel_workers = min(self.workers, max(1, len(tasks)))
+            print(f"  Estimated render time: {_format_duration(serial_seconds / parallel_workers)} on {parallel_workers} "
+                  f"{self.worker_mode} workers ({_format_duration(serial_seconds)} on one), "
+                  f"from {calibration.image_count} calibration images")
+        return len(planned)
+
+    def resume_processing(self) -> int:
+        """
+        Finishes a batch that was interrupted, from its journal in the output directory. Finished images
+        are not opened again and the remaining ones get the output names planned originally.
+        Returns the count of images processed by the resumed run.
+        """
+        journal = ProcessingJournal.load(os.path.join(self.output_dir, JOURNAL_FILE_NAME))
+        if not journal:
+            print(f"No interrupted processing batch to resume in: {os.path.abspath(self.output_dir)}")
+            return 0
+        print(f"\nResuming processing batch: {len(journal.done)} of {len(journal.items)} images were already finished.")
+
+        manifest = ProcessingManifest.load(os.path.join(self.output_dir, MANIFEST_FILE_NAME))
+        processed_count = self._run_journaled_batch(journal, manifest, ProcessingManifest(dict(manifest.entries)))
+
+        print(f"\nResumed processing complete. Successfully processed {processed_count} images.")
+        return processed_count
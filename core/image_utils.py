@@ -14,6 +14,9 @@
 
 import os
 import math
+import shutil
+import hashlib
+from typing import List, Optional
 
 # Aspect Ratio Tolerance: How close a calculated aspect ratio needs to be
 # to a common aspect ratio (e.g., 1.777... for 16:9) to be considered a match.
@@ -58,23 +61,86 @@ def is_portrait_ratio(ar_string: str) -> bool:
         print(f"Warning: Could not parse aspect ratio string for orientation: '{ar_string}'. Assuming landscape.")
         return False # Default to false if parsing fails
 
-def get_random_name(names_file_path: str) -> str:
-    """Reads a random name from the specified names file."""
+def load_names(names_file_path: str) -> List[str]:
+    """Reads the names pool for random renaming (one name per line). Returns an empty list if unavailable."""
     if not os.path.exists(names_file_path):
         print(f"Warning: Names file '{names_file_path}' not found. Using default name.")
-        return "random_image"
+        return []
 
     try:
         with open(names_file_path, 'r', encoding='utf-8') as f:
             names = [line.strip() for line in f if line.strip()]
-        if names:
-            return names[os.urandom(1)[0] % len(names)] # Cryptographically strong random index
-        else:
+        if not names:
             print(f"Warning: Names file '{names_file_path}' is empty. Using default name.")
-            return "random_image"
+        return names
     except Exception as e:
         print(f"Error reading names file '{names_file_path}': {e}. Using default name.")
-        return "random_image"
+        return []
 
+def get_file_fingerprint(filepath: str, sample_size: int = 65536) -> Optional[str]:
+    """
+    Returns a quick content fingerprint that does not depend on the file's name or location:
+    the file size plus a BLAKE2b digest of its first and last sample_size bytes.
+    Returns None if the file cannot be read.
+    """
+    try:
+        file_size = os.path.getsize(filepath)
+        digest = hashlib.blake2b(str(file_size).encode(), digest_size=16)
+        with open(filepath, 'rb') as f:
+            digest.update(f.read(sample_size))
+            if file_size > sample_size:
+                f.seek(max(sample_size, file_size - sample_size))
+                digest.update(f.read(sample_size))
+        return f"{file_size}-{digest.hexdigest()}"
+    except OSError as e:
+        print(f"Warning: Could not fingerprint '{filepath}': {e}.")
+        return None
 
+def get_content_digest(filepath: str, chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """
+    Returns a BLAKE2b digest of the whole file, so equal digests mean byte-identical files
+    (unlike get_file_fingerprint, which only samples). Returns None if the file cannot be read.
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(filepath, 'rb') as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError as e:
+        print(f"Warning: Could not hash '{filepath}': {e}.")
+        return None
 
+FICLONE = 0x40049409 # Linux ioctl that makes dst share src's blocks (btrfs, XFS, ...)
+
+def _reflink_file(src: str, dst: str) -> bool:
+    """Clones src to dst copy-on-write. Returns False where the platform or filesystem cannot."""
+    try:
+        import fcntl
+    except ImportError: # Windows
+        return False
+    try:
+        with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        return False
+
+def link_or_copy_file(src: str, dst: str, method: str) -> str:
+    """
+    Puts an exact copy of src at dst without decoding anything. method is 'reflink' (copy-on-write
+    clone), 'hardlink' (dst shares src's inode, so it must never be written in place) or 'copy';
+    reflinks and hardlinks fall back to a plain copy where unsupported. Returns the method used.
+    """
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if method == 'reflink' and _reflink_file(src, dst):
+        return 'reflink'
+    if method == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except OSError:
+            pass # Other filesystem, or links unsupported
+    shutil.copyfile(src, dst)
+    return 'copy'
@@ -0,0 +1,76 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It hands out output file names for image
+# processing that never collide with each other or with files already in the output directory.
+
+import os
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_NAME = "random_image"
+
+class OutputNamer:
+    """
+    Output name allocator for one processing batch.
+
+    Each output directory (relative to the output root; '' is the root itself) is scanned once,
+    the first time a name is claimed in it; every name handed out is then checked in memory.
+    Names compare by stem, case-insensitively, so 'Echo_0001.jpg' also blocks 'echo_0001.png'.
+    Random names take their word from a seeded permutation of the names pool, so the same seed and
+    inputs give the same names.
+    """
+    def __init__(self, output_dir: str, names: Optional[List[str]] = None, seed: int = 0):
+        self.output_dir = output_dir
+        self._taken: Dict[str, Set[str]] = {} # Directory -> names in use there
+        self._words = list(names) if names else [DEFAULT_NAME]
+        random.Random(seed).shuffle(self._words)
+
+    @staticmethod
+    def _key(filename: str) -> str:
+        return os.path.splitext(filename)[0].lower()
+
+    def _taken_in(self, directory: str) -> Set[str]:
+        if directory not in self._taken:
+            taken = set()
+            path = os.path.join(self.output_dir, directory)
+            if os.path.isdir(path):
+                with os.scandir(path) as entries:
+                    for dir_entry in entries:
+                        taken.add(self._key(dir_entry.name))
+            self._taken[directory] = taken
+        return self._taken[directory]
+
+    def release(self, filename: str, directory: str = '') -> None:
+        """Makes an existing output's name available again (its source is about to be rebuilt)."""
+        self._taken_in(directory).discard(self._key(filename))
+
+    def claim(self, stem: str, suffixes: Tuple[str, ...] = ('',), directory: str = '') -> str:
+        """
+        Returns stem, or stem_2, stem_3, ... if taken in directory, and reserves it. With suffixes (one
+        output per rendition), the stem is only free if stem + suffix is free for every suffix.
+        """
+        taken = self._taken_in(directory)
+        candidate = stem
+        counter = 2
+        while any((candidate + suffix).lower() in taken for suffix in suffixes):
+            candidate = f"{stem}_{counter}"
+            counter += 1
+        for suffix in suffixes:
+            taken.add((candidate + suffix).lower())
+        return candidate
+
+    def random_stem(self, index: int) -> str:
+        """The random-looking name for the index-th input image, before collision suffixes: '<word>_<index>'."""
+        return f"{self._words[index % len(self._words)]}_{index:04d}"
@@ -0,0 +1,83 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It remembers review decisions about
+# image pairs (confirmed duplicate / not a duplicate) so later duplicate detection runs
+# can apply them without verifying or reporting the same pairs again.
+
+import os
+from typing import Dict, Optional, Tuple
+
+DECISION_DUPLICATE = 'duplicate'
+DECISION_NOT_DUPLICATE = 'not_duplicate'
+
+class PairDecisionStore:
+    """
+    Persisted pair decisions keyed by content fingerprints (see get_file_fingerprint), so a
+    decision still applies after files are renamed or moved.
+
+    File layout (plain text, tab separated, one decision per line):
+        <decision><TAB><fingerprint1><TAB><fingerprint2><TAB><path1><TAB><path2>
+    The paths are only there to make the file readable; they are not used for lookups.
+    """
+    def __init__(self, decisions_file: str):
+        self.decisions_file = decisions_file
+        self.decisions: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
+        self._load()
+
+    @staticmethod
+    def _key(fingerprint1: str, fingerprint2: str) -> Tuple[str, str]:
+        """Pairs are unordered, so the key is the sorted fingerprint pair."""
+        return (fingerprint1, fingerprint2) if fingerprint1 <= fingerprint2 else (fingerprint2, fingerprint1)
+
+    def _load(self) -> None:
+        """Loads decisions from the decisions file, if it exists."""
+        if not os.path.exists(self.decisions_file):
+            return
+        try:
+            with open(self.decisions_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) < 3 or parts[0] not in (DECISION_DUPLICATE, DECISION_NOT_DUPLICATE):
+                        if line.strip():
+                            print(f"Warning: Invalid line in pair decisions file: '{line.strip()}'. Skipping.")
+                        continue
+                    path1 = parts[3] if len(parts) > 3 else ''
+                    path2 = parts[4] if len(parts) > 4 else ''
+                    self.decisions[self._key(parts[1], parts[2])] = (parts[0], path1, path2)
+            print(f"Loaded {len(self.decisions)} remembered pair decisions.")
+        except IOError as e:
+            print(f"Error reading pair decisions file '{self.decisions_file}': {e}. Starting without decisions.")
+
+    def get(self, fingerprint1: str, fingerprint2: str) -> Optional[str]:
+        """Returns the remembered decision for a pair, or None."""
+        decision = self.decisions.get(self._key(fingerprint1, fingerprint2))
+        return decision[0] if decision else None
+
+    def set(self, fingerprint1: str, fingerprint2: str, decision: str, path1: str = '', path2: str = '') -> None:
+        """Records a decision in memory. Call save() to persist it."""
+        if decision not in (DECISION_DUPLICATE, DECISION_NOT_DUPLICATE):
+            raise ValueError(f"Invalid pair decision '{decision}'.")
+        self.decisions[self._key(fingerprint1, fingerprint2)] = (decision, path1, path2)
+
+    def save(self) -> None:
+        """Writes all decisions to the decisions file."""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.decisions_file)), exist_ok=True)
+            with open(self.decisions_file, 'w', encoding='utf-8') as f:
+                for (fingerprint1, fingerprint2), (decision, path1, path2) in self.decisions.items():
+                    f.write(f"{decision}\t{fingerprint1}\t{fingerprint2}\t{path1}\t{path2}\n")
+            print(f"Saved {len(self.decisions)} pair decisions to: {os.path.abspath(self.decisions_file)}")
+        except IOError as e:
+            print(f"Error saving pair decisions file '{self.decisions_file}': {e}.")
@@ -0,0 +1,89 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It persists every compared image pair
+# up to a maximum Hamming distance, sorted by distance, so any threshold at or below
+# that maximum can be answered without comparing hashes again.
+
+import os
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+class PairDistanceStore:
+    """
+    Distance-ranked list of image pairs.
+
+    File layout (plain text, tab separated):
+        signature<TAB><hex>          - fingerprint of the hashes and settings the pairs came from
+        max_distance<TAB><n>         - largest distance recorded
+        paths<TAB><count>            - followed by one path per line
+        pairs<TAB><count>            - followed by '<distance><TAB><index1><TAB><index2>' lines,
+                                       sorted by distance
+    Paths are stored once and referenced by index to keep the file compact.
+    """
+    def __init__(self, signature: str, max_distance: int, pairs: List[Tuple[str, str, int]]):
+        self.signature = signature
+        self.max_distance = max_distance
+        self.pairs = sorted(pairs, key=lambda pair: pair[2])
+        self.distances = [pair[2] for pair in self.pairs]
+
+    def pairs_within(self, threshold: int) -> List[Tuple[str, str, int]]:
+        """Returns all pairs with distance <= threshold (a range read on the sorted list)."""
+        return self.pairs[:bisect_right(self.distances, threshold)]
+
+    def threshold_counts(self) -> Dict[int, int]:
+        """Returns how many pairs each threshold from 0 to max_distance would yield."""
+        return {threshold: bisect_right(self.distances, threshold) for threshold in range(self.max_distance + 1)}
+
+    def save(self, store_path: str) -> None:
+        """Writes the store to disk."""
+        print(f"Saving {len(self.pairs)} ranked pairs (max distance {self.max_distance}) to: {os.path.abspath(store_path)}")
+        path_index: Dict[str, int] = {}
+        for filepath1, filepath2, _ in self.pairs:
+            path_index.setdefault(filepath1, len(path_index))
+            path_index.setdefault(filepath2, len(path_index))
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+            with open(store_path, 'w', encoding='utf-8') as f:
+                f.write(f"signature\t{self.signature}\n")
+                f.write(f"max_distance\t{self.max_distance}\n")
+                f.write(f"paths\t{len(path_index)}\n")
+                for filepath in path_index: # dicts keep insertion order, matching the indexes
+                    f.write(f"{filepath}\n")
+                f.write(f"pairs\t{len(self.pairs)}\n")
+                for filepath1, filepath2, distance in self.pairs:
+                    f.write(f"{distance}\t{path_index[filepath1]}\t{path_index[filepath2]}\n")
+        except IOError as e:
+            print(f"Error saving pair distance store '{store_path}': {e}.")
+
+    @classmethod
+    def load(cls, store_path: str) -> Optional['PairDistanceStore']:
+        """Reads a store from disk. Returns None if it is missing or unreadable."""
+        if not os.path.exists(store_path):
+            return None
+        try:
+            with open(store_path, 'r', encoding='utf-8') as f:
+                signature = f.readline().rstrip('\n').split('\t', 1)[1]
+                max_distance = int(f.readline().rstrip('\n').split('\t', 1)[1])
+                path_count = int(f.readline().rstrip('\n').split('\t', 1)[1])
+                paths = [f.readline().rstrip('\n') for _ in range(path_count)]
+                pair_count = int(f.readline().rstrip('\n').split('\t', 1)[1])
+                pairs = []
+                for _ in range(pair_count):
+                    distance, index1, index2 = f.readline().split('\t')
+                    pairs.append((paths[int(index1)], paths[int(index2)], int(distance)))
+            return cls(signature, max_distance, pairs)
+        except (IOError, ValueError, IndexError) as e:
+            print(f"Warning: Could not read pair distance store '{store_path}': {e}. Ignoring it.")
+            return None
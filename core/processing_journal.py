@@ -0,0 +1,131 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It keeps a checkpoint journal of a running
+# image processing batch (the full plan, including every output name, and the items finished
+# so far), so a batch that was interrupted can be resumed exactly where it stopped.
+
+import os
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+from core.processing_manifest import ManifestEntry
+
+JOURNAL_FILE_NAME = 'processing_journal.txt'
+
+class JournalItem(NamedTuple):
+    source_path: str
+    entry: ManifestEntry # What the manifest records once the item is rendered, including the output names
+    output_stem: str # Output path relative to the output directory, without rendition suffix and extension
+    copy_from_stem: str # '' to render; else the (relative) output stem of an identical source whose outputs are copied
+    outputs: Tuple[Tuple[str, ...], ...] # Each output's fields as strings, as written by the image processor
+    reduce_guard: float
+
+class ProcessingJournal:
+    """
+    Append-only checkpoint file of one batch.
+
+    File layout (plain text, tab separated; source paths come last so they may contain anything):
+        journal<TAB>1
+        item<TAB><reduce guard><TAB><outputs><TAB><output stem><TAB><copy from stem><TAB><size><TAB><mtime>
+            <TAB><width><TAB><height><TAB><format><TAB><fingerprint><TAB><content digest><TAB><output subdirectory>
+            <TAB><output names><TAB><source path>
+        planned<TAB><item count>     - written once the whole plan is on disk
+        done<TAB><source path>       - appended (and synced) as each item finishes
+    <outputs> is the '/'-joined outputs, each its ','-joined fields; output names are '/'-joined.
+    """
+    def __init__(self, journal_path: str, items: List[JournalItem], done: Set[str]):
+        self.journal_path = journal_path
+        self.items = items
+        self.done = done
+        self._file = None
+
+    @classmethod
+    def start(cls, journal_path: str, items: List[JournalItem]) -> 'ProcessingJournal':
+        """Writes the plan of a new batch, replacing any previous journal."""
+        journal = cls(journal_path, items, set())
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        journal._file = open(journal_path, 'w', encoding='utf-8')
+        journal._file.write("journal\t1\n")
+        for item in items:
+            entry = item.entry
+            outputs = '/'.join(','.join(fields) for fields in item.outputs)
+            journal._file.write(f"item\t{item.reduce_guard}\t{outputs}\t{item.output_stem}\t{item.copy_from_stem}\t"
+                                f"{entry.size}\t{entry.mtime}\t{entry.width}\t{entry.height}\t{entry.source_format}\t"
+                                f"{entry.fingerprint}\t{entry.content_digest}\t{entry.output_subdir}\t{'/'.join(entry.output_names)}\t{item.source_path}\n")
+        journal._file.write(f"planned\t{len(items)}\n")
+        journal._sync()
+        return journal
+
+    @classmethod
+    def load(cls, journal_path: str) -> Optional['ProcessingJournal']:
+        """
+        Reads the journal of an interrupted batch and reopens it for appending. Returns None if there
+        is none, or if the batch died before its plan was complete (nothing was rendered then).
+        """
+        if not os.path.exists(journal_path):
+            return None
+        items: List[JournalItem] = []
+        done: Set[str] = set()
+        planned = False
+        try:
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break # Torn last line from a crash mid-write
+                    kind, rest = line.rstrip('\n').split('\t', 1)
+                    if kind == 'item':
+                        (reduce_guard, outputs, output_stem, copy_from_stem, size, mtime, width, height,
+                         source_format, fingerprint, content_digest, output_subdir, output_names, source_path) = rest.split('\t', 13)
+                        entry = ManifestEntry(int(size), float(mtime), int(width), int(height), source_format,
+                                              fingerprint, tuple(output_names.split('/')), content_digest, output_subdir)
+                        parsed_outputs = tuple(tuple(output.split(',')) for output in outputs.split('/'))
+                        items.append(JournalItem(source_path, entry, output_stem, copy_from_stem, parsed_outputs, float(reduce_guard)))
+                    elif kind == 'planned':
+                        planned = True
+                    elif kind == 'done':
+                        done.add(rest)
+        except (IOError, ValueError) as e:
+            print(f"Warning: Could not read processing journal '{journal_path}': {e}.")
+            return None
+        if not planned:
+            return None
+        journal = cls(journal_path, items, done)
+        journal._file = open(journal_path, 'a', encoding='utf-8')
+        return journal
+
+    def mark_done(self, source_path: str) -> None:
+        """Records a finished item. Synced to disk, so a crash right after still counts it as done."""
+        self.done.add(source_path)
+        self._file.write(f"done\t{source_path}\n")
+        self._sync()
+
+    def remaining_items(self) -> List[JournalItem]:
+        return [item for item in self.items if item.source_path not in self.done]
+
+    def finish(self) -> None:
+        """Closes and removes the journal once the batch is complete."""
+        self.close()
+        try:
+            os.remove(self.journal_path)
+        except OSError as e:
+            print(f"Warning: Could not remove processing journal '{self.journal_path}': {e}.")
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
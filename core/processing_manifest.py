@@ -0,0 +1,89 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It records which output each source image
+# produced, and with which settings, so image processing can skip sources that are unchanged.
+
+import os
+from typing import Dict, NamedTuple, Optional, Tuple
+
+MANIFEST_FILE_NAME = 'processing_manifest.txt'
+MANIFEST_VERSION = 3
+
+class ManifestEntry(NamedTuple):
+    size: int
+    mtime: float
+    width: int
+    height: int
+    source_format: str
+    fingerprint: str # Effective settings the output was rendered with
+    output_names: Tuple[str, ...] # File names inside output_subdir (one per rendition and format)
+    content_digest: str = '' # Whole-file digest; only computed for sources that share their size with another source
+    output_subdir: str = '' # Directory of the outputs, relative to the output directory ('' for the output directory itself)
+
+    def output_paths(self, output_dir: str) -> Tuple[str, ...]:
+        return tuple(os.path.join(output_dir, self.output_subdir, output_name) for output_name in self.output_names)
+
+    def matches_source(self, stat_result: os.stat_result) -> bool:
+        """True if the source file still has the size and modification time seen when rendering."""
+        return self.size == stat_result.st_size and self.mtime == stat_result.st_mtime
+
+class ProcessingManifest:
+    """
+    Source image -> produced output.
+
+    File layout (plain text, tab separated; the source path comes last so it may contain anything):
+        manifest<TAB>3
+        <size><TAB><mtime><TAB><width><TAB><height><TAB><format><TAB><fingerprint><TAB><content digest>
+            <TAB><output subdirectory><TAB><output names><TAB><source path>
+    Output names are joined with '/', which no file name can contain.
+    """
+    def __init__(self, entries: Optional[Dict[str, ManifestEntry]] = None):
+        self.entries: Dict[str, ManifestEntry] = entries if entries is not None else {}
+
+    def save(self, manifest_path: str) -> None:
+        """Writes the manifest. A temporary file is renamed into place so a crash never leaves half a manifest."""
+        temp_path = manifest_path + '.tmp'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(f"manifest\t{MANIFEST_VERSION}\n")
+                for source_path, entry in sorted(self.entries.items()):
+                    f.write(f"{entry.size}\t{entry.mtime}\t{entry.width}\t{entry.height}\t{entry.source_format}\t"
+                            f"{entry.fingerprint}\t{entry.content_digest}\t{entry.output_subdir}\t{'/'.join(entry.output_names)}\t{source_path}\n")
+            os.replace(temp_path, manifest_path)
+            print(f"Saved processing manifest ({len(self.entries)} sources) to: {os.path.abspath(manifest_path)}")
+        except (IOError, OSError) as e:
+            print(f"Error saving processing manifest '{manifest_path}': {e}.")
+
+    @classmethod
+    def load(cls, manifest_path: str) -> 'ProcessingManifest':
+        """Reads a manifest. A missing or unreadable manifest gives an empty one (everything is processed)."""
+        entries: Dict[str, ManifestEntry] = {}
+        if not os.path.exists(manifest_path):
+            return cls(entries)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                if f.readline().rstrip('\n') != f"manifest\t{MANIFEST_VERSION}":
+                    print(f"Processing manifest '{manifest_path}' is from an older version. Processing all images.")
+                    return cls(entries)
+                for line in f:
+                    (size, mtime, width, height, source_format, fingerprint, content_digest,
+                     output_subdir, output_names, source_path) = line.rstrip('\n').split('\t', 9)
+                    entries[source_path] = ManifestEntry(int(size), float(mtime), int(width), int(height), source_format,
+                                                         fingerprint, tuple(output_names.split('/')), content_digest, output_subdir)
+        except (IOError, ValueError) as e:
+            print(f"Warning: Could not read processing manifest '{manifest_path}': {e}. Processing all images.")
+            entries = {}
+        return cls(entries)
@@ -0,0 +1,141 @@
+# Copyright (C) 2025 whitevamp
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This code is part of the Image Toolkit project. It keeps compact DCT feature vectors
+# for every image and a random-projection index over them, so "most similar images"
+# queries only score the images that land in the same buckets as the query.
+
+import os
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+class SimilarityIndex:
+    """
+    Approximate nearest-neighbour index over L2-normalised float16 feature vectors.
+
+    Each of table_count hash tables signs the vector against bits_per_table random
+    hyperplanes; vectors with a small angle between them usually get the same bucket key
+    in at least one table. Queries also probe the buckets one bit away (multi-probe),
+    then rank the collected candidates by cosine similarity. If the buckets hold fewer than
+    top_k candidates, every vector is ranked instead.
+
+    The index is saved as a single .npz file holding the paths, the vectors and the
+    projection planes. Buckets are rebuilt from the vectors on load.
+    """
+    def __init__(self, dimensions: int, table_count: int = 8, bits_per_table: int = 12, seed: int = 0):
+        self.dimensions = dimensions
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((table_count, bits_per_table, dimensions)).astype(np.float32)
+        self.paths: List[Optional[str]] = [] # None marks a removed row, dropped on save
+        self.vectors = np.zeros((0, dimensions), dtype=np.float16)
+        self._row_of_path: Dict[str, int] = {}
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(table_count)]
+        self._bit_weights = 1 << np.arange(bits_per_table, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._row_of_path)
+
+    def __contains__(self, filepath: str) -> bool:
+        return filepath in self._row_of_path
+
+    def _bucket_keys(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns the bucket key of each vector in each table, shape (tables, vectors)."""
+        signs = np.einsum('tbd,nd->tnb', self.planes, vectors.astype(np.float32)) > 0
+        return signs.astype(np.int64) @ self._bit_weights
+
+    def _index_rows(self, first_row: int) -> None:
+        """Adds the rows from first_row onwards to the buckets."""
+        keys = self._bucket_keys(self.vectors[first_row:])
+        for table, buckets in enumerate(self._buckets):
+            for offset, key in enumerate(keys[table].tolist()):
+                buckets.setdefault(key, []).append(first_row + offset)
+
+    def add(self, items: List[Tuple[str, np.ndarray]]) -> None:
+        """Adds or replaces the vectors of the given paths (incremental: only the new rows are bucketed)."""
+        if not items:
+            return
+        self.remove([filepath for filepath, _ in items if filepath in self._row_of_path])
+        first_row = len(self.paths)
+        for offset, (filepath, _) in enumerate(items):
+            self.paths.append(filepath)
+            self._row_of_path[filepath] = first_row + offset
+        new_vectors = np.stack([vector for _, vector in items]).astype(np.float16)
+        self.vectors = np.concatenate([self.vectors, new_vectors])
+        self._index_rows(first_row)
+
+    def remove(self, filepaths: List[str]) -> None:
+        """Removes paths from the index. Their rows stay in the buckets until saved, but are skipped by queries."""
+        for filepath in filepaths:
+            row = self._row_of_path.pop(filepath, None)
+            if row is not None:
+                self.paths[row] = None
+
+    def get_vector(self, filepath: str) -> Optional[np.ndarray]:
+        """Returns the stored vector of a path, or None."""
+        row = self._row_of_path.get(filepath)
+        return None if row is None else self.vectors[row]
+
+    def query(self, vector: np.ndarray, top_k: int, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Returns up to top_k (path, cosine similarity) pairs, most similar first."""
+        keys = self._bucket_keys(vector[np.newaxis, :])[:, 0].tolist()
+        candidates = set()
+        for table, buckets in enumerate(self._buckets):
+            key = keys[table]
+            candidates.update(buckets.get(key, ()))
+            for bit_weight in self._bit_weights.tolist(): # Multi-probe: neighbouring buckets
+                candidates.update(buckets.get(key ^ bit_weight, ()))
+        rows = [row for row in candidates if self.paths[row] is not None and self.paths[row] != exclude]
+        if len(rows) < top_k:
+            # Too few neighbours in the probed buckets (small or sparse library): rank everything instead
+            rows = [row for row in self._row_of_path.values() if self.paths[row] != exclude]
+        if not rows:
+            return []
+        similarities = self.vectors[rows].astype(np.float32) @ vector.astype(np.float32)
+        best = np.argsort(-similarities)[:top_k]
+        return [(self.paths[rows[i]], float(similarities[i])) for i in best]
+
+    def save(self, index_path: str) -> None:
+        """Writes the index (without removed rows) to disk."""
+        live_rows = [row for row, filepath in enumerate(self.paths) if filepath is not None]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+            with open(index_path, 'wb') as f: # A file object stops numpy from appending '.npz'
+                np.savez(f, paths=np.array([self.paths[row] for row in live_rows], dtype=str),
+                         vectors=self.vectors[live_rows], planes=self.planes)
+            print(f"Saved similarity index with {len(live_rows)} images to: {os.path.abspath(index_path)}")
+        except (IOError, OSError) as e:
+            print(f"Error saving similarity index '{index_path}': {e}.")
+
+    @classmethod
+    def load(cls, index_path: str, dimensions: int) -> Optional['SimilarityIndex']:
+        """Reads an index from disk. Returns None if it is missing, unreadable or has other dimensions."""
+        if not os.path.exists(index_path):
+            return None
+        try:
+            with np.load(index_path, allow_pickle=False) as data:
+                planes = data['planes']
+                if planes.shape[2] != dimensions:
+                    print(f"Warning: Similarity index '{index_path}' has {planes.shape[2]}-dimensional vectors, expected {dimensions}. Rebuilding it.")
+                    return None
+                index = cls(dimensions, table_count=planes.shape[0], bits_per_table=planes.shape[1])
+                index.planes = planes
+                index.paths = [str(filepath) for filepath in data['paths']]
+                index.vectors = data['vectors'].astype(np.float16)
+            index._row_of_path = {filepath: row for row, filepath in enumerate(index.paths)}
+            index._index_rows(0)
+            print(f"Loaded similarity index with {len(index)} images.")
+            return index
+        except (IOError, OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read similarity index '{index_path}': {e}. Rebuilding it.")
+            return None
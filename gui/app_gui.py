@@ -58,8 +58,8 @@ Key Features:
 - **Image Scanning:** Analyze your image library, generate reports on dimensions,
   and identify resolutions that are not yet defined in the master definitions.
 - **Duplicate Finder:** Detects duplicate and near-duplicate images using
-  advanced perceptual hashing (aHash, pHash, dHash, wHash) with configurable
-  thresholds. Includes options to move, copy, or permanently delete flagged duplicates.
+  advanced perceptual hashing (aHash, pHash, dHash, wHash, crop-resistant) with
+  configurable thresholds. Includes options to move, copy, or permanently delete flagged duplicates.
 - **Configurable Settings:** All paths, processing options, and duplicate
   finder parameters are easily configurable via a user-friendly GUI and config.ini.
 
@@ -163,6 +163,40 @@ a tidy and organized image library.
         self.rename_checkbox = ctk.CTkCheckBox(self.tabview.tab("Image Processing"), text="Enable Random Renaming", variable=self.rename_var, command=lambda: self._update_config_setting('Renaming', 'enable_random_rename', self.rename_var.get()))
         self.rename_checkbox.grid(row=3, column=0, padx=20, pady=10, sticky="w")
 
+        self.workers_label = ctk.CTkLabel(self.tabview.tab("Image Processing"), text="Workers (0 = one per CPU core, 1 = serial):")
+        self.workers_label.grid(row=4, column=0, padx=20, pady=(10,0), sticky="w")
+        self.workers_entry = ctk.CTkEntry(self.tabview.tab("Image Processing"), width=100)
+        self.workers_entry.grid(row=5, column=0, padx=20, pady=(0,10), sticky="w")
+        self.workers_entry.insert(0, str(self.config_manager.getint('ImageProcessor', 'workers', fallback=0)))
+
+        self.worker_mode_label = ctk.CTkLabel(self.tabview.tab("Image Processing"), text="Worker Mode:")
+        self.worker_mode_label.grid(row=6, column=0, padx=20, pady=(10,0), sticky="w")
+        self.worker_mode_var = ctk.StringVar(value=self.config_manager.get('ImageProcessor', 'worker_mode', fallback='thread'))
+        self.worker_mode_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Image Processing"), values=['thread', 'process'], variable=self.worker_mode_var, command=lambda val: self._update_config_setting('ImageProcessor', 'worker_mode', val))
+        self.worker_mode_dropdown.grid(row=7, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.resume_process_button = ctk.CTkButton(self.tabview.tab("Image Processing"), text="Resume Interrupted Processing", command=self._start_resume_processing_thread)
+        self.resume_process_button.grid(row=8, column=0, padx=20, pady=10)
+
+        self.renditions_var = ctk.BooleanVar(value=self.config_manager.getboolean('Renditions', 'enable_renditions', fallback=False))
+        self.renditions_checkbox = ctk.CTkCheckBox(self.tabview.tab("Image Processing"), text="Output All Renditions (sizes/formats from [Renditions] in image_settings.ini)", variable=self.renditions_var, command=lambda: self._update_config_setting('Renditions', 'enable_renditions', self.renditions_var.get()))
+        self.renditions_checkbox.grid(row=9, column=0, padx=20, pady=10, sticky="w")
+
+        self.encode_profile_label = ctk.CTkLabel(self.tabview.tab("Image Processing"), text="Encode Profile (fast = quickest, smallest = least disk space):")
+        self.encode_profile_label.grid(row=10, column=0, padx=20, pady=(10,0), sticky="w")
+        self.encode_profile_var = ctk.StringVar(value=self.config_manager.get('EncodeProfiles', 'active_profile', fallback='balanced'))
+        self.encode_profile_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Image Processing"), values=['fast', 'balanced', 'smallest'], variable=self.encode_profile_var, command=lambda val: self._update_config_setting('EncodeProfiles', 'active_profile', val))
+        self.encode_profile_dropdown.grid(row=11, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.output_layout_label = ctk.CTkLabel(self.tabview.tab("Image Processing"), text="Output Layout (mirror = input subfolders, shard = ab/cd/ subfolders):")
+        self.output_layout_label.grid(row=12, column=0, padx=20, pady=(10,0), sticky="w")
+        self.output_layout_var = ctk.StringVar(value=self.config_manager.get('ImageProcessor', 'output_layout', fallback='flat'))
+        self.output_layout_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Image Processing"), values=['flat', 'mirror', 'shard'], variable=self.output_layout_var, command=lambda val: self._update_config_setting('ImageProcessor', 'output_layout', val))
+        self.output_layout_dropdown.grid(row=13, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.plan_process_button = ctk.CTkButton(self.tabview.tab("Image Processing"), text="Plan Processing (Dry Run)", command=self._start_plan_processing_thread)
+        self.plan_process_button.grid(row=14, column=0, padx=20, pady=10)
+
         # --- Image Scanning Tab ---
         self.tabview.tab("Image Scanning").grid_columnconfigure(0, weight=1)
         self.scan_button = ctk.CTkButton(self.tabview.tab("Image Scanning"), text="Start Image Scan & Generate Reports", command=self._start_image_scanning_thread)
@@ -198,68 +232,123 @@ a tidy and organized image library.
         self.tabview.tab("Duplicate Finder").grid_columnconfigure(1, weight=1) # Second column for browse buttons
 
         self.duplicate_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Find Duplicate Images", command=self._start_duplicate_finder_thread)
-        self.duplicate_button.grid(row=0, column=0, padx=20, pady=20, columnspan=2) # Spanning two columns
+        self.duplicate_button.grid(row=0, column=0, padx=20, pady=20)
+
+        self.pair_counts_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Show Pair Counts per Threshold", command=self._show_threshold_pair_counts)
+        self.pair_counts_button.grid(row=0, column=1, padx=20, pady=20)
 
         self.enable_duplicate_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_duplicate_detection'))
         self.enable_duplicate_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Enable Duplicate Detection", variable=self.enable_duplicate_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_duplicate_detection', self.enable_duplicate_var.get()))
-        self.enable_duplicate_checkbox.grid(row=1, column=0, padx=20, pady=10, sticky="w", columnspan=2)
+        self.enable_duplicate_checkbox.grid(row=1, column=0, padx=20, pady=10, sticky="w")
+
+        self.low_entropy_guard_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_low_entropy_guard'))
+        self.low_entropy_guard_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Match Blank/Solid Images Exactly", variable=self.low_entropy_guard_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_low_entropy_guard', self.low_entropy_guard_var.get()))
+        self.low_entropy_guard_checkbox.grid(row=1, column=1, padx=20, pady=10, sticky="w")
 
         self.hash_type_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Hash Type:")
         self.hash_type_label.grid(row=2, column=0, padx=20, pady=(10,0), sticky="w")
-        self.hash_type_options = ['dhash', 'ahash', 'phash', 'whash']
+        self.hash_type_options = ['dhash', 'ahash', 'phash', 'whash', 'crop_resistant']
         self.hash_type_var = ctk.StringVar(value=self.config_manager.get('DuplicateFinder', 'hash_type'))
         self.hash_type_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Duplicate Finder"), values=self.hash_type_options, variable=self.hash_type_var, command=lambda val: self._update_config_setting('DuplicateFinder', 'hash_type', val))
-        self.hash_type_dropdown.grid(row=3, column=0, padx=20, pady=(0,10), sticky="ew", columnspan=2)
+        self.hash_type_dropdown.grid(row=3, column=0, padx=20, pady=(0,10), sticky="ew")
+
+        self.comparison_scope_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Comparison Scope:")
+        self.comparison_scope_label.grid(row=2, column=1, padx=20, pady=(10,0), sticky="w")
+        self.comparison_scope_options = ['global', 'per_directory', 'cross_root', 'new_vs_existing']
+        self.comparison_scope_var = ctk.StringVar(value=self.config_manager.get('DuplicateFinder', 'comparison_scope', fallback='global'))
+        self.comparison_scope_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Duplicate Finder"), values=self.comparison_scope_options, variable=self.comparison_scope_var, command=lambda val: self._update_config_setting('DuplicateFinder', 'comparison_scope', val))
+        self.comparison_scope_dropdown.grid(row=3, column=1, padx=20, pady=(0,10), sticky="ew")
 
         self.hash_threshold_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Hash Threshold (0-255, lower is stricter):") # Clarified range
-        self.hash_threshold_label.grid(row=4, column=0, padx=20, pady=(10,0), sticky="w", columnspan=2)
+        self.hash_threshold_label.grid(row=4, column=0, padx=20, pady=(10,0), sticky="w")
+
+        self.flip_matching_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_flip_matching'))
+        self.flip_matching_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Match Mirrored/Rotated Copies (aHash/dHash)", variable=self.flip_matching_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_flip_matching', self.flip_matching_var.get()))
+        self.flip_matching_checkbox.grid(row=4, column=1, padx=20, pady=(10,0), sticky="w")
         self.hash_threshold_entry = ctk.CTkEntry(self.tabview.tab("Duplicate Finder"), width=100)
-        self.hash_threshold_entry.grid(row=5, column=0, padx=20, pady=(0,10), sticky="w", columnspan=2)
+        self.hash_threshold_entry.grid(row=5, column=0, padx=20, pady=(0,10), sticky="w")
+
+        self.exif_thumbnail_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_exif_thumbnail_hashing'))
+        self.exif_thumbnail_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Fast Hash from EXIF Thumbnails", variable=self.exif_thumbnail_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_exif_thumbnail_hashing', self.exif_thumbnail_var.get()))
+        self.exif_thumbnail_checkbox.grid(row=5, column=1, padx=20, pady=(0,10), sticky="w")
         self.hash_threshold_entry.insert(0, str(self.config_manager.getint('DuplicateFinder', 'hash_threshold')))
 
         self.rebuild_cache_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'rebuild_hash_cache'))
         self.rebuild_cache_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Rebuild Hash Cache", variable=self.rebuild_cache_var, command=lambda: self._update_config_setting('DuplicateFinder', 'rebuild_hash_cache', self.rebuild_cache_var.get()))
-        self.rebuild_cache_checkbox.grid(row=6, column=0, padx=20, pady=10, sticky="w", columnspan=2)
+        self.rebuild_cache_checkbox.grid(row=6, column=0, padx=20, pady=10, sticky="w")
+
+        self.ar_blocking_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_aspect_ratio_blocking'))
+        self.ar_blocking_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Only Compare Similar Aspect Ratios", variable=self.ar_blocking_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_aspect_ratio_blocking', self.ar_blocking_var.get()))
+        self.ar_blocking_checkbox.grid(row=6, column=1, padx=20, pady=10, sticky="w")
+
+        self.new_images_dir_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="New Images Directory (for 'new_vs_existing' scope):")
+        self.new_images_dir_label.grid(row=7, column=0, padx=20, pady=(10,0), sticky="w")
+        self.new_images_dir_entry = ctk.CTkEntry(self.tabview.tab("Duplicate Finder"), width=250, placeholder_text="Select folder of newly added images")
+        self.new_images_dir_entry.grid(row=8, column=0, padx=20, pady=(0,10), sticky="ew")
+        self.new_images_dir_entry.insert(0, self.config_manager.get('Paths', 'new_images_directory', fallback=''))
+        self.new_images_dir_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Browse", command=lambda: self._browse_directory(self.new_images_dir_entry, 'Paths', 'new_images_directory'))
+        self.new_images_dir_button.grid(row=8, column=1, padx=20, pady=(0,10))
 
         self.hashes_cache_file_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Hashes Cache File:")
-        self.hashes_cache_file_label.grid(row=7, column=0, padx=20, pady=(10,0), sticky="w")
+        self.hashes_cache_file_label.grid(row=9, column=0, padx=20, pady=(10,0), sticky="w")
         self.hashes_cache_file_entry = ctk.CTkEntry(self.tabview.tab("Duplicate Finder"), width=250, placeholder_text="Path to hashes.txt")
-        self.hashes_cache_file_entry.grid(row=8, column=0, padx=20, pady=(0,10), sticky="ew")
+        self.hashes_cache_file_entry.grid(row=10, column=0, padx=20, pady=(0,10), sticky="ew")
         self.hashes_cache_file_entry.insert(0, self.config_manager.get('Paths', 'image_hashes_cache_file'))
         self.hashes_cache_file_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Browse", command=lambda: self._browse_file(self.hashes_cache_file_entry, 'Paths', 'image_hashes_cache_file'))
-        self.hashes_cache_file_button.grid(row=8, column=1, padx=20, pady=(0,10))
+        self.hashes_cache_file_button.grid(row=10, column=1, padx=20, pady=(0,10))
 
         self.duplicate_report_file_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Duplicate Report File:")
-        self.duplicate_report_file_label.grid(row=9, column=0, padx=20, pady=(10,0), sticky="w")
+        self.duplicate_report_file_label.grid(row=11, column=0, padx=20, pady=(10,0), sticky="w")
         self.duplicate_report_file_entry = ctk.CTkEntry(self.tabview.tab("Duplicate Finder"), width=250, placeholder_text="Path to duplicate_images.txt")
-        self.duplicate_report_file_entry.grid(row=10, column=0, padx=20, pady=(0,10), sticky="ew")
+        self.duplicate_report_file_entry.grid(row=12, column=0, padx=20, pady=(0,10), sticky="ew")
         self.duplicate_report_file_entry.insert(0, self.config_manager.get('Paths', 'duplicate_report_file'))
         self.duplicate_report_file_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Browse", command=lambda: self._browse_file(self.duplicate_report_file_entry, 'Paths', 'duplicate_report_file'))
-        self.duplicate_report_file_button.grid(row=10, column=1, padx=20, pady=(0,10))
+        self.duplicate_report_file_button.grid(row=12, column=1, padx=20, pady=(0,10))
 
         # --- Duplicate Action Settings ---
         self.enable_duplicate_actions_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_duplicate_actions'))
         self.enable_duplicate_actions_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Enable Automatic Duplicate Actions (Move/Copy)", variable=self.enable_duplicate_actions_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_duplicate_actions', self.enable_duplicate_actions_var.get()))
-        self.enable_duplicate_actions_checkbox.grid(row=11, column=0, padx=20, pady=(10,5), sticky="w", columnspan=2)
+        self.enable_duplicate_actions_checkbox.grid(row=13, column=0, padx=20, pady=(10,5), sticky="w", columnspan=2)
 
         self.duplicate_action_type_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Action for Duplicates:")
-        self.duplicate_action_type_label.grid(row=12, column=0, padx=20, pady=(5,0), sticky="w")
+        self.duplicate_action_type_label.grid(row=14, column=0, padx=20, pady=(5,0), sticky="w")
         self.duplicate_action_type_options = ['none', 'move', 'copy']
         self.duplicate_action_type_var = ctk.StringVar(value=self.config_manager.get('DuplicateFinder', 'duplicate_action_type'))
         self.duplicate_action_type_dropdown = ctk.CTkOptionMenu(self.tabview.tab("Duplicate Finder"), values=self.duplicate_action_type_options, variable=self.duplicate_action_type_var, command=lambda val: self._update_config_setting('DuplicateFinder', 'duplicate_action_type', val))
-        self.duplicate_action_type_dropdown.grid(row=13, column=0, padx=20, pady=(0,10), sticky="ew", columnspan=2)
+        self.duplicate_action_type_dropdown.grid(row=15, column=0, padx=20, pady=(0,10), sticky="ew", columnspan=2)
 
         self.duplicate_action_dir_label = ctk.CTkLabel(self.tabview.tab("Duplicate Finder"), text="Duplicate Action Directory:")
-        self.duplicate_action_dir_label.grid(row=14, column=0, padx=20, pady=(10,0), sticky="w")
+        self.duplicate_action_dir_label.grid(row=16, column=0, padx=20, pady=(10,0), sticky="w")
         self.duplicate_action_dir_entry = ctk.CTkEntry(self.tabview.tab("Duplicate Finder"), width=250, placeholder_text="Select folder for moved/copied duplicates")
-        self.duplicate_action_dir_entry.grid(row=15, column=0, padx=20, pady=(0,10), sticky="ew")
+        self.duplicate_action_dir_entry.grid(row=17, column=0, padx=20, pady=(0,10), sticky="ew")
         self.duplicate_action_dir_entry.insert(0, self.config_manager.get('Paths', 'duplicate_action_directory'))
         self.duplicate_action_dir_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Browse", command=lambda: self._browse_directory(self.duplicate_action_dir_entry, 'Paths', 'duplicate_action_directory'))
-        self.duplicate_action_dir_button.grid(row=15, column=1, padx=20, pady=(0,10))
+        self.duplicate_action_dir_button.grid(row=17, column=1, padx=20, pady=(0,10))
 
         # --- Delete Button (Separate for Safety) ---
         self.delete_duplicates_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="DELETE ALL FLAGGED DUPLICATES (IRREVERSIBLE)", fg_color="red", hover_color="darkred", command=self._start_duplicate_deletion_thread)
-        self.delete_duplicates_button.grid(row=16, column=0, padx=20, pady=20, columnspan=2)
+        self.delete_duplicates_button.grid(row=18, column=0, padx=20, pady=20, columnspan=2)
+
+        # --- Review Decisions (remembered across runs) ---
+        self.remember_not_duplicates_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Remember Found Pairs as NOT Duplicates", command=lambda: self._start_pair_decision_thread('not_duplicate'))
+        self.remember_not_duplicates_button.grid(row=19, column=0, padx=20, pady=(0,20))
+        self.remember_duplicates_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Remember Found Pairs as Duplicates", command=lambda: self._start_pair_decision_thread('duplicate'))
+        self.remember_duplicates_button.grid(row=19, column=1, padx=20, pady=(0,20))
+        self.review_pairs_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Review Found Pairs One by One...", command=self._open_pair_review_window)
+        self.review_pairs_button.grid(row=22, column=0, padx=20, pady=(0,20), columnspan=2)
+
+        # --- Similarity Search (DCT feature index) ---
+        self.similarity_index_var = ctk.BooleanVar(value=self.config_manager.getboolean('DuplicateFinder', 'enable_similarity_index'))
+        self.similarity_index_checkbox = ctk.CTkCheckBox(self.tabview.tab("Duplicate Finder"), text="Build Similarity Index During Detection", variable=self.similarity_index_var, command=lambda: self._update_config_setting('DuplicateFinder', 'enable_similarity_index', self.similarity_index_var.get()))
+        self.similarity_index_checkbox.grid(row=20, column=0, padx=20, pady=(0,20), sticky="w")
+        self.find_similar_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Find Most Similar Images...", command=self._start_similar_images_thread)
+        self.find_similar_button.grid(row=20, column=1, padx=20, pady=(0,20))
+
+        # --- Shard Mode (several machines hash, one compares) ---
+        self.write_shard_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Write Hash Shard for This Machine", command=self._start_write_shard_thread)
+        self.write_shard_button.grid(row=21, column=0, padx=20, pady=(0,20))
+        self.merge_shards_button = ctk.CTkButton(self.tabview.tab("Duplicate Finder"), text="Merge Shards and Find Duplicates", command=self._start_merge_shards_thread)
+        self.merge_shards_button.grid(row=21, column=1, padx=20, pady=(0,20))
 
 
         # --- Tools & Settings Tab (for editing target_resolution_X_Y) ---
@@ -387,6 +476,7 @@ a tidy and organized image library.
             self._update_config_setting('Paths', 'image_hashes_cache_file', self.hashes_cache_file_entry.get())
             self._update_config_setting('Paths', 'duplicate_report_file', self.duplicate_report_file_entry.get())
             self._update_config_setting('Paths', 'duplicate_action_directory', self.duplicate_action_dir_entry.get())
+            self._update_config_setting('Paths', 'new_images_directory', self.new_images_dir_entry.get())
 
             # ImageSettings
             self._update_config_setting('ImageSettings', 'override_to_custom_resolution', self.override_custom_var.get())
@@ -398,6 +488,13 @@ a tidy and organized image library.
             # Renaming
             self._update_config_setting('Renaming', 'enable_random_rename', self.rename_var.get())
 
+            # ImageProcessor
+            self._update_config_setting('ImageProcessor', 'workers', self.workers_entry.get())
+            self._update_config_setting('ImageProcessor', 'worker_mode', self.worker_mode_var.get())
+            self._update_config_setting('ImageProcessor', 'output_layout', self.output_layout_var.get())
+            self._update_config_setting('Renditions', 'enable_renditions', self.renditions_var.get())
+            self._update_config_setting('EncodeProfiles', 'active_profile', self.encode_profile_var.get())
+
             # Scanner
             self._update_config_setting('Scanner', 'enable_exclusion_reference', self.exclusion_var.get())
             self._update_config_setting('Scanner', 'merge_to_master_definitions', self.merge_master_var.get())
@@ -407,6 +504,12 @@ a tidy and organized image library.
             self._update_config_setting('DuplicateFinder', 'hash_type', self.hash_type_var.get())
             self._update_config_setting('DuplicateFinder', 'hash_threshold', self.hash_threshold_entry.get())
             self._update_config_setting('DuplicateFinder', 'rebuild_hash_cache', self.rebuild_cache_var.get())
+            self._update_config_setting('DuplicateFinder', 'enable_aspect_ratio_blocking', self.ar_blocking_var.get())
+            self._update_config_setting('DuplicateFinder', 'comparison_scope', self.comparison_scope_var.get())
+            self._update_config_setting('DuplicateFinder', 'enable_low_entropy_guard', self.low_entropy_guard_var.get())
+            self._update_config_setting('DuplicateFinder', 'enable_exif_thumbnail_hashing', self.exif_thumbnail_var.get())
+            self._update_config_setting('DuplicateFinder', 'enable_flip_matching', self.flip_matching_var.get())
+            self._update_config_setting('DuplicateFinder', 'enable_similarity_index', self.similarity_index_var.get())
             self._update_config_setting('DuplicateFinder', 'duplicate_action_type', self.duplicate_action_type_var.get())
             self._update_config_setting('DuplicateFinder', 'enable_duplicate_actions', self.enable_duplicate_actions_var.get())
 
@@ -503,9 +606,18 @@ a tidy and organized image library.
     def _set_all_buttons_state(self, state: str):
         """Helper to set the state of main operation buttons."""
         self.process_button.configure(state=state)
+        self.resume_process_button.configure(state=state)
+        self.plan_process_button.configure(state=state)
         self.scan_button.configure(state=state)
         self.duplicate_button.configure(state=state)
+        self.pair_counts_button.configure(state=state)
         self.delete_duplicates_button.configure(state=state)
+        self.remember_not_duplicates_button.configure(state=state)
+        self.remember_duplicates_button.configure(state=state)
+        self.review_pairs_button.configure(state=state)
+        self.find_similar_button.configure(state=state)
+        self.write_shard_button.configure(state=state)
+        self.merge_shards_button.configure(state=state)
 
     def _start_image_processing_thread(self):
         """Starts image processing in a separate thread to keep GUI responsive."""
@@ -519,10 +631,46 @@ a tidy and organized image library.
 
         threading.Thread(target=self._run_processing_task, args=(processor,)).start()
 
-    def _run_processing_task(self, processor: ImageProcessor):
-        """Task to run image processing."""
+    def _start_resume_processing_thread(self):
+        """Resumes an interrupted processing batch in a separate thread to keep GUI responsive."""
+        self._log_message("Resuming interrupted image processing...")
+        self._save_all_settings()
+
+        latest_config_manager = ConfigManager()
+        processor = ImageProcessor(latest_config_manager)
+
+        self._set_all_buttons_state("disabled")
+
+        threading.Thread(target=self._run_processing_task, args=(processor, True)).start()
+
+    def _start_plan_processing_thread(self):
+        """Plans image processing without writing outputs (dry run) in a separate thread to keep GUI responsive."""
+        self._log_message("Planning image processing (dry run)...")
+        self._save_all_settings()
+
+        latest_config_manager = ConfigManager()
+        processor = ImageProcessor(latest_config_manager)
+
+        self._set_all_buttons_state("disabled")
+
+        threading.Thread(target=self._run_plan_task, args=(processor,)).start()
+
+    def _run_plan_task(self, processor: ImageProcessor):
+        """Task to plan image processing; the totals and time estimate go to the log."""
         try:
-            processed_count = processor.process_images()
+            planned_count = processor.plan_processing()
+            self.after(0, lambda: messagebox.showinfo("Plan Complete", f"{planned_count} images would be processed. See the log for totals and the estimated time."))
+            self._log_message(f"Processing plan finished. {planned_count} images would be processed.")
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Planning Error", f"An error occurred while planning image processing: {e}"))
+            self._log_message(f"ERROR during processing plan: {e}")
+        finally:
+            self.after(0, lambda: self._set_all_buttons_state("normal"))
+
+    def _run_processing_task(self, processor: ImageProcessor, resume: bool = False):
+        """Task to run image processing, or to resume an interrupted batch."""
+        try:
+            processed_count = processor.resume_processing() if resume else processor.process_images()
             self.after(0, lambda: messagebox.showinfo("Processing Complete", f"Successfully processed {processed_count} images."))
             self._log_message(f"Image processing finished. Processed {processed_count} images.")
         except Exception as e:
@@ -590,7 +738,7 @@ a tidy and organized image library.
             # Perform action (move/copy) if enabled and configured
             if finder.enable_duplicate_actions and finder.duplicate_action_type != 'none':
                 action_type = finder.duplicate_action_type
-                action_count = finder.perform_duplicate_action(duplicates_found, action_type)
+                action_count = finder.apply_action_plan(action_type)
                 self.after(0, lambda: messagebox.showinfo("Duplicate Action Complete",
                                                           f"Finished finding duplicates. Also, {action_count} files were {action_type}d to {os.path.abspath(finder.duplicate_action_directory)}. Report saved to {os.path.abspath(finder.duplicate_report_file)}"))
                 self._log_message(f"Duplicate action '{action_type}' performed on {action_count} files.")
@@ -603,24 +751,170 @@ a tidy and organized image library.
         finally:
             self.after(0, lambda: self._set_all_buttons_state("normal"))
 
-    def _start_duplicate_deletion_thread(self):
-        """Initiates the deletion process for detected duplicates after confirmation."""
+    def _show_threshold_pair_counts(self):
+        """Shows how many pairs each hash threshold yields, read from the pair distance store without re-running detection."""
+        finder = DuplicateFinder(ConfigManager())
+        counts = finder.get_threshold_pair_counts()
+        if counts is None:
+            messagebox.showwarning("No Pair Distance Store", "Enable the pair distance store and run 'Find Duplicate Images' once to record pair distances.")
+            self._log_message("Pair counts unavailable: no pair distance store found.")
+            return
+
+        lines = [f"Threshold {threshold}: {count} pairs" for threshold, count in counts.items()]
+        self._log_message("Pairs per hash threshold (from last detection run):\n" + "\n".join(lines))
+        messagebox.showinfo("Pairs per Threshold", "\n".join(lines))
+
+    def _start_pair_decision_thread(self, decision: str):
+        """Remembers a review decision for every pair found by the last scan, so later scans apply it."""
         if not self._found_duplicate_pairs:
-            messagebox.showwarning("No Duplicates to Delete", "Please run 'Find Duplicate Images' first to identify duplicates.")
-            self._log_message("Deletion skipped: No duplicates found from last scan.")
+            messagebox.showwarning("No Pairs to Remember", "Please run 'Find Duplicate Images' first to identify duplicate pairs.")
+            self._log_message("Pair decisions skipped: No duplicate pairs found from last scan.")
+            return
+
+        label = "NOT duplicates" if decision == 'not_duplicate' else "duplicates"
+        confirm = messagebox.askyesno(
+            "Confirm Pair Decisions",
+            f"Remember all {len(self._found_duplicate_pairs)} pairs from the last scan as {label}?\n\n"
+            "Future scans will apply this decision without reporting or re-verifying these pairs."
+        )
+        if not confirm:
+            self._log_message("Pair decisions cancelled by user.")
             return
 
-        # Prepare a list of files to delete (all second files from the pairs)
-        files_to_delete = [pair[1] for pair in self._found_duplicate_pairs]
-        if not files_to_delete:
-            messagebox.showwarning("No Duplicates to Delete", "No duplicate files were identified for deletion from the last scan.")
-            self._log_message("Deletion skipped: No duplicate files identified for deletion.")
+        self._set_all_buttons_state("disabled")
+        finder = DuplicateFinder(ConfigManager())
+        threading.Thread(target=self._run_pair_decision_task, args=(finder, list(self._found_duplicate_pairs), decision)).start()
+
+    def _run_pair_decision_task(self, finder: DuplicateFinder, pairs: List[Tuple[str, str]], decision: str):
+        """Task to fingerprint and record pair decisions."""
+        try:
+            recorded_count = finder.remember_pair_decisions(pairs, decision)
+            self.after(0, lambda: messagebox.showinfo("Pair Decisions Saved", f"Remembered {recorded_count} pairs as '{decision}'."))
+            self._log_message(f"Remembered {recorded_count} pairs as '{decision}'.")
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Pair Decision Error", f"An error occurred while saving pair decisions: {e}"))
+            self._log_message(f"ERROR while saving pair decisions: {e}")
+        finally:
+            self.after(0, lambda: self._set_all_buttons_state("normal"))
+
+    def _open_pair_review_window(self):
+        """Lists the pairs found by the last scan, each with its own Duplicate / Not Duplicate decision."""
+        if not self._found_duplicate_pairs:
+            messagebox.showwarning("No Pairs to Review", "Please run 'Find Duplicate Images' first to identify duplicate pairs.")
+            self._log_message("Pair review skipped: No duplicate pairs found from last scan.")
+            return
+
+        finder = DuplicateFinder(ConfigManager())
+        review_window = ctk.CTkToplevel(self)
+        review_window.title("Review Found Pairs")
+        review_window.geometry("900x500")
+        review_window.grid_columnconfigure(0, weight=1)
+        review_window.grid_rowconfigure(0, weight=1)
+        pair_list = ctk.CTkScrollableFrame(review_window, label_text=f"{len(self._found_duplicate_pairs)} pairs from the last scan")
+        pair_list.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
+        pair_list.grid_columnconfigure(0, weight=1)
+
+        def remember(pair: Tuple[str, str], decision: str, chosen_button, other_button):
+            # Two files are fingerprinted per click, which is quick enough for the GUI thread
+            if finder.remember_pair_decisions([pair], decision):
+                chosen_button.configure(state="disabled")
+                other_button.configure(state="normal")
+                self._log_message(f"Remembered '{pair[0]}' and '{pair[1]}' as '{decision}'.")
+            else:
+                messagebox.showwarning("Pair Not Remembered", f"Could not read '{pair[0]}' or '{pair[1]}'.")
+
+        for row, pair in enumerate(self._found_duplicate_pairs):
+            pair_label = ctk.CTkLabel(pair_list, text=f"{pair[0]}\n{pair[1]}", justify="left", anchor="w")
+            pair_label.grid(row=row, column=0, padx=10, pady=5, sticky="w")
+            duplicate_button = ctk.CTkButton(pair_list, text="Duplicate", width=110)
+            duplicate_button.grid(row=row, column=1, padx=5, pady=5)
+            not_duplicate_button = ctk.CTkButton(pair_list, text="Not Duplicate", width=110)
+            not_duplicate_button.grid(row=row, column=2, padx=5, pady=5)
+            duplicate_button.configure(command=lambda p=pair, b1=duplicate_button, b2=not_duplicate_button: remember(p, 'duplicate', b1, b2))
+            not_duplicate_button.configure(command=lambda p=pair, b1=not_duplicate_button, b2=duplicate_button: remember(p, 'not_duplicate', b1, b2))
+
+    def _start_similar_images_thread(self):
+        """Asks for an image and lists the most similar indexed images, using the similarity index."""
+        filepath = filedialog.askopenfilename(filetypes=[("Images", "*.jpg *.jpeg *.png *.gif *.bmp *.tiff *.webp")])
+        if not filepath:
+            return
+        self._set_all_buttons_state("disabled")
+        finder = DuplicateFinder(ConfigManager())
+        threading.Thread(target=self._run_similar_images_task, args=(finder, filepath)).start()
+
+    def _run_similar_images_task(self, finder: DuplicateFinder, filepath: str):
+        """Task to query the similarity index and log the ranked results."""
+        try:
+            similar_images = finder.find_similar_images(filepath)
+            if not similar_images:
+                self.after(0, lambda: messagebox.showwarning("No Similar Images", "No similar images found. Make sure the similarity index is enabled and duplicate detection has run."))
+                return
+            lines = [f"{similarity:.3f}  {path}" for path, similarity in similar_images]
+            self.after(0, lambda: self._log_message(f"Most similar images to {filepath}:\n" + "\n".join(lines)))
+            self.after(0, lambda: messagebox.showinfo("Most Similar Images", "\n".join(lines)))
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Similarity Search Error", f"An error occurred during the similarity search: {e}"))
+            self._log_message(f"ERROR during similarity search: {e}")
+        finally:
+            self.after(0, lambda: self._set_all_buttons_state("normal"))
+
+    def _start_write_shard_thread(self):
+        """Hashes this machine's input directory into a shard file in the shard directory."""
+        self._save_all_settings()
+        self._set_all_buttons_state("disabled")
+        finder = DuplicateFinder(ConfigManager())
+        threading.Thread(target=self._run_write_shard_task, args=(finder,)).start()
+
+    def _run_write_shard_task(self, finder: DuplicateFinder):
+        """Task to hash the input directory and write its shard."""
+        try:
+            image_count = finder.write_hash_shard()
+            self.after(0, lambda: messagebox.showinfo("Hash Shard Written", f"Wrote shard '{finder.shard_name}' with {image_count} images to {os.path.abspath(finder.shard_directory)}"))
+            self._log_message(f"Hash shard '{finder.shard_name}' written with {image_count} images.")
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Hash Shard Error", f"An error occurred while writing the hash shard: {e}"))
+            self._log_message(f"ERROR while writing hash shard: {e}")
+        finally:
+            self.after(0, lambda: self._set_all_buttons_state("normal"))
+
+    def _start_merge_shards_thread(self):
+        """Merges all shards in the shard directory and finds duplicates across them."""
+        self._save_all_settings()
+        self._set_all_buttons_state("disabled")
+        finder = DuplicateFinder(ConfigManager())
+        threading.Thread(target=self._run_merge_shards_task, args=(finder,)).start()
+
+    def _run_merge_shards_task(self, finder: DuplicateFinder):
+        """Task to merge shards and run the global comparison."""
+        try:
+            duplicates_found = finder.merge_hash_shards()
+            self._found_duplicate_pairs = duplicates_found
+            self.after(0, lambda: messagebox.showinfo("Shard Merge Complete", f"Found {len(duplicates_found)} duplicate/near-duplicate image pairs across all shards. Report saved to {os.path.abspath(finder.duplicate_report_file)}"))
+            self._log_message(f"Merged shards: found {len(duplicates_found)} duplicate/near-duplicate image pairs.")
+        except Exception as e:
+            self.after(0, lambda: messagebox.showerror("Shard Merge Error", f"An error occurred while merging shards: {e}"))
+            self._log_message(f"ERROR while merging shards: {e}")
+        finally:
+            self.after(0, lambda: self._set_all_buttons_state("normal"))
+
+    def _start_duplicate_deletion_thread(self):
+        """Initiates deletion of the files marked for removal in the saved action plan, after confirmation."""
+        latest_config_manager = ConfigManager() # Get latest config
+        finder = DuplicateFinder(latest_config_manager) # Initialize finder with potentially updated paths
+
+        # The plan is saved by every detection run, so this also works after a restart
+        plan = finder.load_action_plan()
+        if plan is None or not plan.clusters:
+            messagebox.showwarning("No Duplicates to Delete", "Please run 'Find Duplicate Images' first to identify duplicates.")
+            self._log_message("Deletion skipped: No action plan from a previous scan.")
             return
 
         # Show a confirmation dialog
         confirm = messagebox.askyesno(
             "Confirm Permanent Deletion",
-            f"You are about to PERMANENTLY DELETE {len(files_to_delete)} duplicate image files from your input directory.\n\n"
+            f"You are about to PERMANENTLY DELETE {plan.victim_count()} duplicate image files from your input directory, "
+            f"keeping one file from each of {len(plan.clusters)} duplicate groups.\n\n"
+            f"The plan is listed in {os.path.abspath(finder.action_plan_file)}. Files changed since the scan are skipped.\n\n"
             "THIS ACTION IS IRREVERSIBLE!\n\n"
             "Do you wish to proceed?"
         )
@@ -628,16 +922,14 @@ a tidy and organized image library.
         if confirm:
             self._log_message("Starting permanent deletion of duplicates...")
             self._set_all_buttons_state("disabled")
-            latest_config_manager = ConfigManager() # Get latest config
-            finder = DuplicateFinder(latest_config_manager) # Initialize finder with potentially updated paths
-            threading.Thread(target=self._run_duplicate_deletion_task, args=(finder, files_to_delete)).start()
+            threading.Thread(target=self._run_duplicate_deletion_task, args=(finder,)).start()
         else:
             self._log_message("Deletion cancelled by user.")
 
-    def _run_duplicate_deletion_task(self, finder: DuplicateFinder, files_to_delete: List[str]):
-        """Task to perform actual deletion of duplicate files."""
+    def _run_duplicate_deletion_task(self, finder: DuplicateFinder):
+        """Task to delete the planned duplicate files."""
         try:
-            deleted_count = finder.delete_duplicates(files_to_delete)
+            deleted_count = finder.apply_action_plan('delete')
             self.after(0, lambda: messagebox.showinfo("Deletion Complete", f"Successfully DELETED {deleted_count} duplicate files."))
             self._log_message(f"Permanent deletion finished. DELETED {deleted_count} files.")
             # Clear the stored duplicates after deletion to prevent accidental re-deletion
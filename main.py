@@ -24,6 +24,7 @@
 # main.py - Main entry point for the Image Toolkit application
 import os
 import sys
+import argparse
 import configparser
 import shutil # For initial directory setup
 import ast # For safely evaluating strings from config
@@ -255,8 +256,39 @@ try:
 except Exception as e:
     print(f"[WARNING] Could not check for duplicate aspect ratios: {e}")
 
+def run_command(command: str, config_manager: ConfigManager, action_type: str = None):
+    """Runs a headless command (for machines without a desktop, e.g. shard workers)."""
+    from core.duplicate_finder import DuplicateFinder
+    from core.image_processor import ImageProcessor
+
+    if command == 'process':
+        ImageProcessor(config_manager).process_images()
+    elif command == 'plan':
+        ImageProcessor(config_manager).plan_processing()
+    elif command == 'resume':
+        ImageProcessor(config_manager).resume_processing()
+    elif command == 'shard':
+        DuplicateFinder(config_manager).write_hash_shard()
+    elif command == 'merge-shards':
+        DuplicateFinder(config_manager).merge_hash_shards()
+    elif command == 'apply':
+        finder = DuplicateFinder(config_manager)
+        finder.apply_action_plan(action_type or finder.duplicate_action_type)
+
 def main():
-    """Main function to initialize and run the GUI application."""
+    """Main function to initialize and run the GUI application, or a headless command."""
+    parser = argparse.ArgumentParser(description="Image Toolkit. Starts the GUI unless a command is given.")
+    parser.add_argument('command', nargs='?', choices=['process', 'plan', 'resume', 'shard', 'merge-shards', 'apply'],
+                        help="process: process the input directory's images; "
+                             "plan: dry run of 'process' that only reads image headers and prints the plan's totals and estimated time; "
+                             "resume: finish an interrupted processing batch with the same output names; "
+                             "shard: hash this machine's input directory into a shard file; "
+                             "merge-shards: merge all shard files and find duplicates across them; "
+                             "apply: run the saved duplicate action plan")
+    parser.add_argument('--action', choices=['delete', 'move', 'copy'],
+                        help="action for 'apply' (default: duplicate_action_type from config.ini)")
+    args = parser.parse_args()
+
     primary_config_file_path = 'config.ini'
     image_settings_config_file_path = 'image_settings.ini'
 
@@ -267,6 +299,10 @@ def main():
     config_manager = ConfigManager(primary_config_path=primary_config_file_path,
                                    image_settings_config_path=image_settings_config_file_path)
 
+    if args.command:
+        run_command(args.command, config_manager, args.action)
+        return
+
     # Now, run the GUI
     app = AppGUI(config_manager)
     app.mainloop()